@@ -0,0 +1,52 @@
+"""Hash verifier API keys
+
+Revision ID: 3c1d9a7e5b42
+Revises: 52fb60095da6
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1d9a7e5b42'
+down_revision: Union[str, Sequence[str], None] = '52fb60095da6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Step 1: Add the new columns, nullable until they are backfilled.
+    op.add_column('verifiers', sa.Column('api_key_hash', sa.String(), nullable=True))
+    op.add_column('verifiers', sa.Column('api_key_prefix', sa.String(), nullable=True))
+
+    # Step 2: Hash the existing keys in place, so current integrations keep working.
+    # This must match security.hash_api_key (hex SHA-256 of the UTF-8 key).
+    op.execute(
+        "UPDATE verifiers SET "
+        "api_key_hash = encode(sha256(convert_to(api_key, 'UTF8')), 'hex'), "
+        "api_key_prefix = left(api_key, 8)"
+    )
+
+    # Step 3: Lock the columns down and drop the plaintext key.
+    op.alter_column('verifiers', 'api_key_hash', nullable=False)
+    op.alter_column('verifiers', 'api_key_prefix', nullable=False)
+    op.create_index(op.f('ix_verifiers_api_key_hash'), 'verifiers', ['api_key_hash'], unique=True)
+    op.drop_constraint('verifiers_api_key_key', 'verifiers', type_='unique')
+    op.drop_column('verifiers', 'api_key')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The original keys cannot be recovered from their hashes, so every
+    # verifier gets a fresh random key and has to pick it up again.
+    op.add_column('verifiers', sa.Column('api_key', sa.String(), nullable=True))
+    op.execute("UPDATE verifiers SET api_key = md5(random()::text || id::text)")
+    op.alter_column('verifiers', 'api_key', nullable=False)
+    op.create_unique_constraint('verifiers_api_key_key', 'verifiers', ['api_key'])
+    op.drop_index(op.f('ix_verifiers_api_key_hash'), table_name='verifiers')
+    op.drop_column('verifiers', 'api_key_prefix')
+    op.drop_column('verifiers', 'api_key_hash')
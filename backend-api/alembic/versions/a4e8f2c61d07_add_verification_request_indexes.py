@@ -0,0 +1,48 @@
+"""Add verification request indexes and drop redundant id indexes
+
+Revision ID: a4e8f2c61d07
+Revises: 3c1d9a7e5b42
+Create Date: 2026-10-18 10:02:17.440913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4e8f2c61d07'
+down_revision: Union[str, Sequence[str], None] = '3c1d9a7e5b42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction, but it keeps
+    # the table writable while a large verification_requests gets indexed.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_verification_requests_user_id_pending', 'verification_requests', ['user_id'],
+            postgresql_where=sa.text("status = 'pending'"), postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_verification_requests_verifier_id_created_at', 'verification_requests',
+            ['verifier_id', sa.text('created_at DESC')], postgresql_concurrently=True,
+        )
+
+    # These duplicate the primary key indexes.
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_index(op.f('ix_verifiers_id'), table_name='verifiers')
+    op.drop_index(op.f('ix_credentials_id'), table_name='credentials')
+    op.drop_index(op.f('ix_verification_requests_id'), table_name='verification_requests')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_verification_requests_id'), 'verification_requests', ['id'], unique=False)
+    op.create_index(op.f('ix_credentials_id'), 'credentials', ['id'], unique=False)
+    op.create_index(op.f('ix_verifiers_id'), 'verifiers', ['id'], unique=False)
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.drop_index('ix_verification_requests_verifier_id_created_at', table_name='verification_requests')
+    op.drop_index('ix_verification_requests_user_id_pending', table_name='verification_requests')
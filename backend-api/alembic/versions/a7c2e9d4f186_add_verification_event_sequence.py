@@ -0,0 +1,28 @@
+"""Add the verification event ID sequence
+
+Revision ID: a7c2e9d4f186
+Revises: e6b3f1a8c925
+Create Date: 2026-10-18 21:04:37.519204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c2e9d4f186'
+down_revision: Union[str, Sequence[str], None] = 'e6b3f1a8c925'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(sa.schema.CreateSequence(sa.Sequence('verification_event_seq')))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(sa.schema.DropSequence(sa.Sequence('verification_event_seq')))
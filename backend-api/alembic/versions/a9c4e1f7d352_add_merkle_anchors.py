@@ -0,0 +1,46 @@
+"""Add Merkle anchors for verification results
+
+Revision ID: a9c4e1f7d352
+Revises: f3b9d2e6a418
+Create Date: 2026-10-18 15:26:09.418203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9c4e1f7d352'
+down_revision: Union[str, Sequence[str], None] = 'f3b9d2e6a418'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('anchors',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('merkle_root', sa.String(), nullable=False),
+    sa.Column('leaf_count', sa.Integer(), nullable=False),
+    sa.Column('tx_hash', sa.String(), nullable=True),
+    sa.Column('explorer_url', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('anchored_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.add_column('verification_requests', sa.Column('anchor_id', sa.Integer(), nullable=True))
+    op.add_column('verification_requests', sa.Column('merkle_proof', sa.String(), nullable=True))
+    op.create_foreign_key('verification_requests_anchor_id_fkey', 'verification_requests', 'anchors', ['anchor_id'], ['id'])
+    op.create_index('ix_verification_requests_unanchored', 'verification_requests', ['id'], unique=False,
+                    postgresql_where=sa.text("anchor_id IS NULL AND status IN ('completed', 'failed')"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_verification_requests_unanchored', table_name='verification_requests')
+    op.drop_constraint('verification_requests_anchor_id_fkey', 'verification_requests', type_='foreignkey')
+    op.drop_column('verification_requests', 'merkle_proof')
+    op.drop_column('verification_requests', 'anchor_id')
+    op.drop_table('anchors')
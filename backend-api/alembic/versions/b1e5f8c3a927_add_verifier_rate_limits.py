@@ -0,0 +1,32 @@
+"""Add per-verifier rate limits
+
+Revision ID: b1e5f8c3a927
+Revises: a9c4e1f7d352
+Create Date: 2026-10-18 15:51:37.662091
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b1e5f8c3a927'
+down_revision: Union[str, Sequence[str], None] = 'a9c4e1f7d352'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('verifiers', sa.Column('rate_limit_per_second', sa.Float(), nullable=True))
+    op.add_column('verifiers', sa.Column('rate_limit_burst', sa.Integer(), nullable=True))
+    op.add_column('verifiers', sa.Column('max_concurrent_requests', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('verifiers', 'max_concurrent_requests')
+    op.drop_column('verifiers', 'rate_limit_burst')
+    op.drop_column('verifiers', 'rate_limit_per_second')
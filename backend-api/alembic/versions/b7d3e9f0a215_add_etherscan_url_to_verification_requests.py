@@ -0,0 +1,28 @@
+"""Add etherscan_url to verification_requests
+
+Revision ID: b7d3e9f0a215
+Revises: a4e8f2c61d07
+Create Date: 2026-10-18 11:26:03.571842
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d3e9f0a215'
+down_revision: Union[str, Sequence[str], None] = 'a4e8f2c61d07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('verification_requests', sa.Column('etherscan_url', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('verification_requests', 'etherscan_url')
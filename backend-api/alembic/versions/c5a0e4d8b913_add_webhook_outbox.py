@@ -0,0 +1,48 @@
+"""Add webhook outbox and verifier webhook secrets
+
+Revision ID: c5a0e4d8b913
+Revises: b7d3e9f0a215
+Create Date: 2026-10-18 12:40:55.902377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5a0e4d8b913'
+down_revision: Union[str, Sequence[str], None] = 'b7d3e9f0a215'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('verifiers', sa.Column('webhook_secret', sa.String(), nullable=True))
+    op.create_table('webhook_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('verifier_id', sa.Integer(), nullable=False),
+    sa.Column('request_id', sa.Integer(), nullable=False),
+    sa.Column('event_type', sa.String(), nullable=False),
+    sa.Column('payload', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('delivered_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('failed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['request_id'], ['verification_requests.id'], ),
+    sa.ForeignKeyConstraint(['verifier_id'], ['verifiers.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_webhook_outbox_due', 'webhook_outbox', ['next_attempt_at'], unique=False,
+                    postgresql_where=sa.text('delivered_at IS NULL AND failed_at IS NULL'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_webhook_outbox_due', table_name='webhook_outbox')
+    op.drop_table('webhook_outbox')
+    op.drop_column('verifiers', 'webhook_secret')
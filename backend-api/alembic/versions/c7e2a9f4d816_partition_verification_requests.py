@@ -0,0 +1,147 @@
+"""Range-partition verification_requests by month of created_at
+
+Revision ID: c7e2a9f4d816
+Revises: b1e5f8c3a927
+Create Date: 2026-10-18 16:12:48.203517
+
+"""
+import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e2a9f4d816'
+down_revision: Union[str, Sequence[str], None] = 'b1e5f8c3a927'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Keep in step with archival.PARTITIONS_AHEAD's default; the archive worker
+# creates further partitions as time goes on.
+PARTITIONS_AHEAD = 3
+
+COLUMNS = (
+    "id, verifier_id, user_id, policy_to_check, status, result, etherscan_url, proof, "
+    "lease_expires_at, dispatch_attempts, anchor_id, merkle_proof, created_at, updated_at"
+)
+
+INDEXES = (
+    "CREATE INDEX ix_verification_requests_user_id_pending ON verification_requests (user_id) WHERE status = 'pending'",
+    "CREATE INDEX ix_verification_requests_verifier_id_created_at ON verification_requests (verifier_id, created_at DESC)",
+    "CREATE INDEX ix_verification_requests_dispatch ON verification_requests (lease_expires_at) "
+    "WHERE status = 'pending' AND proof IS NOT NULL",
+    "CREATE INDEX ix_verification_requests_unanchored ON verification_requests (id) "
+    "WHERE anchor_id IS NULL AND status IN ('completed', 'failed')",
+)
+INDEX_NAMES = (
+    "ix_verification_requests_user_id_pending",
+    "ix_verification_requests_verifier_id_created_at",
+    "ix_verification_requests_dispatch",
+    "ix_verification_requests_unanchored",
+)
+
+
+def _months(first: datetime.date, last: datetime.date):
+    month = first.replace(day=1)
+    while month <= last:
+        following = (month + datetime.timedelta(days=32)).replace(day=1)
+        yield month, following
+        month = following
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A partitioned table's primary key must include the partition key, and a
+    # foreign key needs a unique target, so the outbox keeps a plain request_id.
+    op.drop_constraint('webhook_outbox_request_id_fkey', 'webhook_outbox', type_='foreignkey')
+
+    for name in INDEX_NAMES:
+        op.drop_index(name, table_name='verification_requests')
+    op.execute("ALTER TABLE verification_requests RENAME TO verification_requests_unpartitioned")
+    op.execute("ALTER TABLE verification_requests_unpartitioned RENAME CONSTRAINT verification_requests_pkey TO verification_requests_unpartitioned_pkey")
+    # The id sequence outlives the old table and keeps numbering where it was.
+    op.execute("ALTER SEQUENCE verification_requests_id_seq OWNED BY NONE")
+
+    op.execute("""
+        CREATE TABLE verification_requests (
+            id integer NOT NULL DEFAULT nextval('verification_requests_id_seq'),
+            verifier_id integer REFERENCES verifiers (id),
+            user_id integer REFERENCES users (id),
+            policy_to_check varchar NOT NULL,
+            status varchar,
+            result varchar,
+            etherscan_url varchar,
+            proof varchar,
+            lease_expires_at timestamp with time zone,
+            dispatch_attempts integer NOT NULL DEFAULT 0,
+            anchor_id integer REFERENCES anchors (id),
+            merkle_proof varchar,
+            created_at timestamp with time zone NOT NULL DEFAULT now(),
+            updated_at timestamp with time zone,
+            CONSTRAINT verification_requests_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("ALTER SEQUENCE verification_requests_id_seq OWNED BY verification_requests.id")
+
+    # Monthly partitions from the oldest row to a few months ahead, plus a
+    # default partition so an insert never fails for want of one.
+    bind = op.get_bind()
+    oldest = bind.execute(sa.text("SELECT min(created_at) FROM verification_requests_unpartitioned")).scalar()
+    today = datetime.datetime.now(datetime.timezone.utc).date()
+    first = oldest.astimezone(datetime.timezone.utc).date() if oldest else today
+    last = today
+    for _ in range(PARTITIONS_AHEAD):
+        last = (last.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+    for start, end in _months(first, last):
+        op.execute(
+            f"CREATE TABLE verification_requests_p{start:%Y_%m} PARTITION OF verification_requests "
+            f"FOR VALUES FROM ('{start:%Y-%m-%d} 00:00:00+00') TO ('{end:%Y-%m-%d} 00:00:00+00')"
+        )
+    op.execute("CREATE TABLE verification_requests_default PARTITION OF verification_requests DEFAULT")
+
+    op.execute(
+        f"INSERT INTO verification_requests ({COLUMNS}) "
+        f"SELECT {COLUMNS.replace('created_at,', 'COALESCE(created_at, now()),')} FROM verification_requests_unpartitioned"
+    )
+    op.execute("DROP TABLE verification_requests_unpartitioned")
+    for statement in INDEXES:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Rows already moved to the archive stay there; only live partitions come back.
+    for name in INDEX_NAMES:
+        op.execute(f"DROP INDEX {name}")
+    op.execute("ALTER TABLE verification_requests RENAME TO verification_requests_partitioned")
+    op.execute("ALTER TABLE verification_requests_partitioned RENAME CONSTRAINT verification_requests_pkey TO verification_requests_partitioned_pkey")
+    op.execute("ALTER SEQUENCE verification_requests_id_seq OWNED BY NONE")
+    op.execute("""
+        CREATE TABLE verification_requests (
+            id integer NOT NULL DEFAULT nextval('verification_requests_id_seq'),
+            verifier_id integer REFERENCES verifiers (id),
+            user_id integer REFERENCES users (id),
+            policy_to_check varchar NOT NULL,
+            status varchar,
+            result varchar,
+            etherscan_url varchar,
+            proof varchar,
+            lease_expires_at timestamp with time zone,
+            dispatch_attempts integer NOT NULL DEFAULT 0,
+            anchor_id integer REFERENCES anchors (id),
+            merkle_proof varchar,
+            created_at timestamp with time zone DEFAULT now(),
+            updated_at timestamp with time zone,
+            CONSTRAINT verification_requests_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute("ALTER SEQUENCE verification_requests_id_seq OWNED BY verification_requests.id")
+    op.execute(f"INSERT INTO verification_requests ({COLUMNS}) SELECT {COLUMNS} FROM verification_requests_partitioned")
+    op.execute("DROP TABLE verification_requests_partitioned")
+    for statement in INDEXES:
+        op.execute(statement)
+    # Outbox rows may point at archived requests; drop them so the key can be restored.
+    op.execute("DELETE FROM webhook_outbox WHERE request_id NOT IN (SELECT id FROM verification_requests)")
+    op.create_foreign_key('webhook_outbox_request_id_fkey', 'webhook_outbox', 'verification_requests', ['request_id'], ['id'])
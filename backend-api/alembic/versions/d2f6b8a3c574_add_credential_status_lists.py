@@ -0,0 +1,43 @@
+"""Add credential status lists
+
+Revision ID: d2f6b8a3c574
+Revises: c5a0e4d8b913
+Create Date: 2026-10-18 14:05:31.264170
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f6b8a3c574'
+down_revision: Union[str, Sequence[str], None] = 'c5a0e4d8b913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('status_lists',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('issuer_did', sa.String(), nullable=False),
+    sa.Column('bits', sa.LargeBinary(), nullable=False),
+    sa.Column('next_index', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('version', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('issuer_did')
+    )
+    op.add_column('credentials', sa.Column('status_list_index', sa.Integer(), nullable=True))
+    op.add_column('credentials', sa.Column('revoked_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_unique_constraint('uq_credentials_status_list_index', 'credentials', ['issuer_did', 'status_list_index'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_credentials_status_list_index', 'credentials', type_='unique')
+    op.drop_column('credentials', 'revoked_at')
+    op.drop_column('credentials', 'status_list_index')
+    op.drop_table('status_lists')
@@ -0,0 +1,118 @@
+"""Store request status, result and policy as smallint codes
+
+Revision ID: d4f1b8e2a639
+Revises: c7e2a9f4d816
+Create Date: 2026-10-18 16:34:09.517284
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f1b8e2a639'
+down_revision: Union[str, Sequence[str], None] = 'c7e2a9f4d816'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copies of schemas.RequestStatus / schemas.VerificationResult: the
+# code is the position in the list.
+STATUSES = ['pending', 'completed', 'failed']
+RESULTS = ['No', 'Yes']
+DEFAULT_POLICIES = ['isOver18', 'isOver21', 'isResident']
+
+STATUS_INDEX_NAMES = (
+    "ix_verification_requests_user_id_pending",
+    "ix_verification_requests_dispatch",
+    "ix_verification_requests_unanchored",
+)
+
+
+def _status_indexes(pending: str, completed: str, failed: str):
+    return (
+        f"CREATE INDEX ix_verification_requests_user_id_pending ON verification_requests (user_id) WHERE status = {pending}",
+        "CREATE INDEX ix_verification_requests_dispatch ON verification_requests (lease_expires_at) "
+        f"WHERE status = {pending} AND proof IS NOT NULL",
+        "CREATE INDEX ix_verification_requests_unanchored ON verification_requests (id) "
+        f"WHERE anchor_id IS NULL AND status IN ({completed}, {failed})",
+    )
+
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _case(column: str, mapping) -> str:
+    """
+    CASE expression mapping each (from, to) pair; USING can't take a subquery.
+    """
+    whens = " ".join(f"WHEN {source} THEN {target}" for source, target in mapping)
+    return f"CASE {column} {whens} END"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    unknown = bind.execute(sa.text(
+        "SELECT DISTINCT 'status ' || status FROM verification_requests WHERE status <> ALL(:statuses) "
+        "UNION SELECT DISTINCT 'result ' || result FROM verification_requests WHERE result <> ALL(:results)"
+    ), {"statuses": STATUSES, "results": RESULTS}).scalars().all()
+    if unknown:
+        raise RuntimeError(f"verification_requests holds values with no code: {', '.join(unknown)}; fix them first")
+
+    op.create_table(
+        'policies',
+        sa.Column('id', sa.SmallInteger(), primary_key=True),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.UniqueConstraint('name', name='policies_name_key'),
+    )
+    existing = bind.execute(sa.text("SELECT DISTINCT policy_to_check FROM verification_requests ORDER BY 1")).scalars().all()
+    names = DEFAULT_POLICIES + [name for name in existing if name not in DEFAULT_POLICIES]
+    bind.execute(sa.text(
+        "INSERT INTO policies (name) SELECT name FROM unnest(CAST(:names AS varchar[])) WITH ORDINALITY AS p(name, n) ORDER BY n"
+    ), {"names": names})
+    policy_ids = bind.execute(sa.text("SELECT name, id FROM policies")).all()
+
+    for name in STATUS_INDEX_NAMES:
+        op.drop_index(name, table_name='verification_requests')
+    # One ALTER TABLE, so the partitions are rewritten once rather than per column.
+    op.execute(
+        "ALTER TABLE verification_requests "
+        f"ALTER COLUMN status TYPE smallint USING COALESCE({_case('status', ((_quote(s), i) for i, s in enumerate(STATUSES)))}, 0), "
+        f"ALTER COLUMN result TYPE smallint USING {_case('result', ((_quote(r), i) for i, r in enumerate(RESULTS)))}, "
+        f"ALTER COLUMN policy_to_check TYPE smallint USING {_case('policy_to_check', ((_quote(n), i) for n, i in policy_ids))}, "
+        "ALTER COLUMN status SET DEFAULT 0, "
+        "ALTER COLUMN status SET NOT NULL"
+    )
+    op.alter_column('verification_requests', 'policy_to_check', new_column_name='policy_id')
+    op.create_foreign_key('verification_requests_policy_id_fkey', 'verification_requests', 'policies', ['policy_id'], ['id'])
+    op.create_check_constraint('ck_verification_requests_status', 'verification_requests', f"status BETWEEN 0 AND {len(STATUSES) - 1}")
+    op.create_check_constraint('ck_verification_requests_result', 'verification_requests', f"result BETWEEN 0 AND {len(RESULTS) - 1}")
+    for statement in _status_indexes("0", "1", "2"):
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    policy_ids = bind.execute(sa.text("SELECT name, id FROM policies")).all()
+
+    for name in STATUS_INDEX_NAMES:
+        op.drop_index(name, table_name='verification_requests')
+    op.drop_constraint('ck_verification_requests_result', 'verification_requests', type_='check')
+    op.drop_constraint('ck_verification_requests_status', 'verification_requests', type_='check')
+    op.drop_constraint('verification_requests_policy_id_fkey', 'verification_requests', type_='foreignkey')
+    op.alter_column('verification_requests', 'policy_id', new_column_name='policy_to_check')
+    op.execute(
+        "ALTER TABLE verification_requests "
+        "ALTER COLUMN status DROP NOT NULL, "
+        "ALTER COLUMN status DROP DEFAULT, "
+        f"ALTER COLUMN status TYPE varchar USING {_case('status', ((i, _quote(s)) for i, s in enumerate(STATUSES)))}, "
+        f"ALTER COLUMN result TYPE varchar USING {_case('result', ((i, _quote(r)) for i, r in enumerate(RESULTS)))}, "
+        f"ALTER COLUMN policy_to_check TYPE varchar USING {_case('policy_to_check', ((i, _quote(n)) for n, i in policy_ids))}"
+    )
+    op.drop_table('policies')
+    for statement in _status_indexes("'pending'", "'completed'", "'failed'"):
+        op.execute(statement)
@@ -0,0 +1,36 @@
+"""Allow the expired request status
+
+Revision ID: e6b3f1a8c925
+Revises: d4f1b8e2a639
+Create Date: 2026-10-18 19:12:44.281930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6b3f1a8c925'
+down_revision: Union[str, Sequence[str], None] = 'd4f1b8e2a639'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# schemas.RequestStatus.expired, set by archival.py on requests abandoned
+# past the retention window.
+EXPIRED = 3
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_constraint('ck_verification_requests_status', 'verification_requests', type_='check')
+    op.create_check_constraint('ck_verification_requests_status', 'verification_requests', f"status BETWEEN 0 AND {EXPIRED}")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Expired requests were pending before; that is the closest older status.
+    op.execute(f"UPDATE verification_requests SET status = 0 WHERE status = {EXPIRED}")
+    op.drop_constraint('ck_verification_requests_status', 'verification_requests', type_='check')
+    op.create_check_constraint('ck_verification_requests_status', 'verification_requests', f"status BETWEEN 0 AND {EXPIRED - 1}")
@@ -0,0 +1,35 @@
+"""Add proof and dispatch lease columns to verification requests
+
+Revision ID: e8a1c7f4b260
+Revises: d2f6b8a3c574
+Create Date: 2026-10-18 14:32:17.530914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8a1c7f4b260'
+down_revision: Union[str, Sequence[str], None] = 'd2f6b8a3c574'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('verification_requests', sa.Column('proof', sa.String(), nullable=True))
+    op.add_column('verification_requests', sa.Column('lease_expires_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('verification_requests', sa.Column('dispatch_attempts', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    op.create_index('ix_verification_requests_dispatch', 'verification_requests', ['lease_expires_at'], unique=False,
+                    postgresql_where=sa.text("status = 'pending' AND proof IS NOT NULL"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_verification_requests_dispatch', table_name='verification_requests')
+    op.drop_column('verification_requests', 'dispatch_attempts')
+    op.drop_column('verification_requests', 'lease_expires_at')
+    op.drop_column('verification_requests', 'proof')
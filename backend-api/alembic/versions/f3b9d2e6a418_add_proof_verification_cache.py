@@ -0,0 +1,36 @@
+"""Add proof verification cache table
+
+Revision ID: f3b9d2e6a418
+Revises: e8a1c7f4b260
+Create Date: 2026-10-18 14:58:43.107625
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b9d2e6a418'
+down_revision: Union[str, Sequence[str], None] = 'e8a1c7f4b260'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('proof_verifications',
+    sa.Column('cache_key', sa.String(), nullable=False),
+    sa.Column('key_fingerprint', sa.String(), nullable=False),
+    sa.Column('is_valid', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('cache_key')
+    )
+    op.create_index(op.f('ix_proof_verifications_key_fingerprint'), 'proof_verifications', ['key_fingerprint'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_proof_verifications_key_fingerprint'), table_name='proof_verifications')
+    op.drop_table('proof_verifications')
@@ -0,0 +1,246 @@
+# backend-api/anchoring.py
+"""
+Anchors finished verification results on chain in batches. Instead of one
+transaction per KYC check, the worker collects results over a time or size
+window, builds a Merkle tree over them and submits only the root. Each
+request keeps its inclusion proof, so anyone can check a single result
+against the anchored root. Run it next to the API (one copy is enough, more
+are safe):
+
+    python anchoring.py
+"""
+import asyncio
+import datetime
+import hashlib
+import json
+import logging
+import os
+from typing import List, Optional, Tuple
+
+import httpx
+from sqlalchemy import func, select, update
+
+import models
+import schemas
+from database import AsyncSessionLocal
+
+logger = logging.getLogger("anchoring")
+
+# --- Anchoring Settings ---
+# A batch is anchored once it has ANCHOR_BATCH_SIZE results, or its oldest
+# result has waited ANCHOR_WINDOW_SECONDS, whichever comes first.
+ANCHOR_BATCH_SIZE = int(os.getenv("ANCHOR_BATCH_SIZE", "1024"))
+ANCHOR_WINDOW_SECONDS = float(os.getenv("ANCHOR_WINDOW_SECONDS", "60"))
+ANCHOR_POLL_INTERVAL = float(os.getenv("ANCHOR_POLL_INTERVAL", "5"))
+# Required: the URL of verifier-svc's POST /anchor-root (or another service
+# that accepts {"root": "<hex>"} and answers {"txHash": ..., "explorerUrl": ...}).
+# "memory" is a stand-in that makes up transaction hashes; it is refused
+# unless APP_ENV=development.
+ANCHOR_CHAIN = os.getenv("ANCHOR_CHAIN")
+# Sent as a bearer token; verifier-svc checks it against its ANCHOR_API_TOKEN.
+ANCHOR_CHAIN_TOKEN = os.getenv("ANCHOR_CHAIN_TOKEN")
+ANCHOR_TIMEOUT = float(os.getenv("ANCHOR_TIMEOUT", "120"))
+APP_ENV = os.getenv("APP_ENV", "production")
+
+# Results in these states are final and can be anchored.
+FINAL_STATUSES = schemas.FINAL_STATUSES
+
+
+# --- Merkle Tree ---
+# Leaves and inner nodes are hashed with different prefixes so an inner node
+# can never be passed off as a leaf. An odd node at the end of a level is
+# carried up unchanged rather than paired with itself.
+def leaf_data(request) -> dict:
+    return {
+        "id": request.id,
+        "verifier_id": request.verifier_id,
+        "user_id": request.user_id,
+        "policy": request.policy_to_check,
+        "status": request.status,
+        "result": request.result,
+    }
+
+
+def hash_leaf(data: dict) -> bytes:
+    return hashlib.sha256(b"\x00" + json.dumps(data, sort_keys=True, separators=(",", ":")).encode()).digest()
+
+
+def hash_node(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def build_tree(leaves: List[bytes]) -> List[List[bytes]]:
+    """
+    Returns every level of the tree, leaves first and the root last.
+    """
+    levels = [leaves]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [hash_node(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parents.append(level[-1])
+        levels.append(parents)
+    return levels
+
+
+def inclusion_proof(levels: List[List[bytes]], index: int) -> List[dict]:
+    """
+    The sibling hashes from leaf `index` up to the root, each tagged with
+    the side it sits on.
+    """
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append({"side": "left" if sibling < index else "right", "hash": level[sibling].hex()})
+        index //= 2
+    return proof
+
+
+def verify_inclusion(leaf: bytes, proof: List[dict], root: bytes) -> bool:
+    node = leaf
+    for step in proof:
+        sibling = bytes.fromhex(step["hash"])
+        node = hash_node(sibling, node) if step["side"] == "left" else hash_node(node, sibling)
+    return node == root
+
+
+# --- Chain Clients ---
+class InMemoryChain:
+    """
+    Stand-in chain for development and tests: records roots and makes up a
+    transaction hash for each.
+    """
+
+    def __init__(self):
+        self.roots: List[str] = []
+
+    async def submit_root(self, root: str) -> Tuple[str, Optional[str]]:
+        self.roots.append(root)
+        return "0x" + hashlib.sha256(f"{len(self.roots)}:{root}".encode()).hexdigest(), None
+
+
+class HttpChain:
+    """
+    Submits roots through an HTTP service that owns the wallet (verifier-svc's
+    POST /anchor-root), and waits for it to confirm the transaction.
+    """
+
+    def __init__(self, url: str, token: Optional[str] = None, client: Optional[httpx.AsyncClient] = None):
+        self.url = url
+        self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self.client = client or httpx.AsyncClient(timeout=ANCHOR_TIMEOUT)
+
+    async def submit_root(self, root: str) -> Tuple[str, Optional[str]]:
+        response = await self.client.post(self.url, json={"root": root}, headers=self.headers)
+        response.raise_for_status()
+        body = response.json()
+        return body["txHash"], body.get("explorerUrl")
+
+
+def get_chain():
+    """
+    The configured chain client. Raises ValueError, stopping the worker, if
+    ANCHOR_CHAIN is unset or is "memory" outside development: a fake
+    transaction hash must never be recorded as a real anchor.
+    """
+    if not ANCHOR_CHAIN:
+        raise ValueError("Set ANCHOR_CHAIN to verifier-svc's /anchor-root URL.")
+    if ANCHOR_CHAIN == "memory":
+        if APP_ENV != "development":
+            raise ValueError("ANCHOR_CHAIN=memory records made-up transactions; it needs APP_ENV=development.")
+        logger.warning("ANCHOR_CHAIN=memory: anchors get made-up transaction hashes")
+        return InMemoryChain()
+    return HttpChain(ANCHOR_CHAIN, ANCHOR_CHAIN_TOKEN)
+
+
+class Anchorer:
+    def __init__(self, session_factory=AsyncSessionLocal, chain=None):
+        self.session_factory = session_factory
+        self.chain = chain or get_chain()
+
+    async def seal_batch(self) -> Optional[int]:
+        """
+        Claims unanchored final results if the window is full or old enough,
+        and records their tree as a new (not yet submitted) anchor. Returns
+        the anchor's id, or None if there was nothing to seal.
+        """
+        table = models.VerificationRequest
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(table)
+                .filter(table.anchor_id.is_(None), table.status.in_(FINAL_STATUSES))
+                .order_by(table.id)
+                .limit(ANCHOR_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )
+            requests = result.scalars().all()
+            if not requests:
+                return None
+            if len(requests) < ANCHOR_BATCH_SIZE:
+                oldest = min(request.updated_at or request.created_at for request in requests)
+                now = datetime.datetime.now(datetime.timezone.utc)
+                if (now - oldest).total_seconds() < ANCHOR_WINDOW_SECONDS:
+                    await db.rollback()
+                    return None
+
+            levels = build_tree([hash_leaf(leaf_data(request)) for request in requests])
+            anchor = models.Anchor(merkle_root=levels[-1][0].hex(), leaf_count=len(requests))
+            db.add(anchor)
+            await db.flush()
+            for index, request in enumerate(requests):
+                request.anchor_id = anchor.id
+                request.merkle_proof = json.dumps(inclusion_proof(levels, index))
+            await db.commit()
+            return anchor.id
+
+    async def submit_pending(self) -> int:
+        """
+        Submits every sealed anchor that has no transaction yet, including
+        any left behind by a crashed worker, one transaction each so a
+        failure never un-records a root that already went out. Returns how
+        many were submitted.
+        """
+        anchor = models.Anchor
+        submitted = 0
+        while True:
+            async with self.session_factory() as db:
+                result = await db.execute(
+                    select(anchor).filter(anchor.tx_hash.is_(None)).order_by(anchor.id)
+                    .limit(1).with_for_update(skip_locked=True)
+                )
+                pending = result.scalars().first()
+                if pending is None:
+                    return submitted
+                tx_hash, explorer_url = await self.chain.submit_root(pending.merkle_root)
+                await db.execute(
+                    update(anchor).where(anchor.id == pending.id)
+                    .values(tx_hash=tx_hash, explorer_url=explorer_url, anchored_at=func.now())
+                )
+                await db.commit()
+            submitted += 1
+            logger.info("Anchored %d results under root %s in %s", pending.leaf_count, pending.merkle_root, tx_hash)
+
+    async def run_once(self) -> Optional[int]:
+        anchor_id = await self.seal_batch()
+        await self.submit_pending()
+        return anchor_id
+
+    async def run_forever(self, stop: Optional[asyncio.Event] = None):
+        stop = stop or asyncio.Event()
+        while not stop.is_set():
+            try:
+                sealed = await self.run_once()
+            except Exception:
+                logger.exception("Anchoring failed")
+                sealed = None
+            if sealed is None:
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=ANCHOR_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(Anchorer().run_forever())
@@ -0,0 +1,517 @@
+# backend-api/archival.py
+"""
+Partition maintenance and archival for verification_requests, which is
+range-partitioned by month of created_at (verification_requests_pYYYY_MM,
+plus verification_requests_default as a catch-all).
+
+The worker keeps ARCHIVE_PARTITIONS_AHEAD months of partitions ready. Once
+a whole month is older than ARCHIVE_RETENTION_DAYS, requests in it that are
+still pending were abandoned: they are marked expired (and the verifier's
+webhook told). The month's rows are then streamed into a gzip JSONL file
+under ARCHIVE_DIR, and the partition is detached and dropped. By default a
+month waits while any of its results is not yet anchored; the anchor worker
+gets to them within minutes.
+Run one copy next to the API:
+
+    python archival.py
+
+Each archive file is sorted by verifier, newest first, and cut into
+independently compressed gzip members of at most ARCHIVE_BLOCK_ROWS rows
+(the whole file is still an ordinary .jsonl.gz). Its manifest records
+where each verifier's blocks start, so the history endpoints read only the
+blocks a page needs: see `extend_history` and `iter_export_rows`. It also
+records the file's range of request IDs, for `find_request`.
+"""
+import asyncio
+import datetime
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import DBAPIError
+from starlette.concurrency import run_in_threadpool
+
+import crud
+import models
+import schemas
+from database import AsyncSessionLocal
+
+logger = logging.getLogger("archival")
+
+# --- Archival Settings ---
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+# A month is archived once all of it is older than this.
+ARCHIVE_RETENTION_DAYS = int(os.getenv("ARCHIVE_RETENTION_DAYS", "180"))
+ARCHIVE_PARTITIONS_AHEAD = int(os.getenv("ARCHIVE_PARTITIONS_AHEAD", "3"))
+# Keep a month in the database until all its results are in an anchored
+# Merkle tree. Archived rows keep their anchor_id and merkle_proof, so
+# inclusion proofs are still served for them (see `find_request`).
+ARCHIVE_REQUIRE_ANCHORED = os.getenv("ARCHIVE_REQUIRE_ANCHORED", "true").lower() in ("1", "true", "yes")
+ARCHIVE_BLOCK_ROWS = int(os.getenv("ARCHIVE_BLOCK_ROWS", "5000"))
+ARCHIVE_CHUNK_SIZE = int(os.getenv("ARCHIVE_CHUNK_SIZE", "5000"))
+ARCHIVE_COMPRESSION_LEVEL = int(os.getenv("ARCHIVE_COMPRESSION_LEVEL", "6"))
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "3600"))
+# The unpaginated history (paginate=false) reads at most this many archived
+# rows; the paginated listing and the export reach the rest.
+ARCHIVE_UNPAGINATED_LIMIT = int(os.getenv("ARCHIVE_UNPAGINATED_LIMIT", "1000"))
+# How long to wait for a table lock before giving up until the next run.
+# DETACH queues for an exclusive lock on the parent table, and every query on
+# verification_requests queues behind it while it waits, so keep this short.
+ARCHIVE_LOCK_TIMEOUT_MS = int(os.getenv("ARCHIVE_LOCK_TIMEOUT_MS", "2000"))
+
+TABLE = "verification_requests"
+PARTITION_PATTERN = re.compile(rf"^{TABLE}_p(\d{{4}})_(\d{{2}})$")
+FINAL_STATUSES = schemas.FINAL_STATUSES
+# SQLSTATE lock_not_available, raised when lock_timeout expires.
+LOCK_NOT_AVAILABLE = "55P03"
+
+Key = Tuple[datetime.datetime, int]
+
+
+# =================================================================
+# === Partitions ==================================================
+# =================================================================
+
+def next_month(month: datetime.date) -> datetime.date:
+    return (month.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+
+
+def partition_name(month: datetime.date) -> str:
+    return f"{TABLE}_p{month:%Y_%m}"
+
+
+def _bound(month: datetime.date) -> str:
+    return f"'{month:%Y-%m-%d} 00:00:00+00'"
+
+
+def _utc(month: datetime.date) -> datetime.datetime:
+    return datetime.datetime(month.year, month.month, 1, tzinfo=datetime.timezone.utc)
+
+
+async def list_partitions(db) -> List[datetime.date]:
+    """
+    The months that have a partition, oldest first.
+    """
+    result = await db.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = CAST(:table AS regclass)"
+    ), {"table": TABLE})
+    months = []
+    for (name,) in result:
+        match = PARTITION_PATTERN.match(name)
+        if match:
+            months.append(datetime.date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+async def create_partition(db, month: datetime.date):
+    """
+    Adds the partition for `month`, first moving any of its rows out of the
+    default partition (attaching would fail otherwise).
+    """
+    name, start, end = partition_name(month), month, next_month(month)
+    await db.execute(text(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    moved = await db.execute(text(
+        f"WITH moved AS (DELETE FROM {TABLE}_default WHERE created_at >= :start AND created_at < :end RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), {"start": _utc(start), "end": _utc(end)})
+    await db.execute(text(f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM ({_bound(start)}) TO ({_bound(end)})"))
+    if moved.rowcount:
+        logger.warning("Moved %d rows from %s_default into %s", moved.rowcount, TABLE, name)
+
+
+# =================================================================
+# === Archive files ===============================================
+# =================================================================
+
+def _jsonable(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+class ArchiveWriter:
+    """
+    Writes rows (already sorted by verifier, newest first) as gzip members
+    of at most ARCHIVE_BLOCK_ROWS rows, one verifier per member.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "wb")
+        self.digest = hashlib.sha256()
+        self.rows = 0
+        self.id_range = None
+        # verifier_id -> [[offset, length, count, newest_at, newest_id, oldest_at, oldest_id], ...]
+        self.blocks: Dict[str, list] = {}
+        self._block = None
+        self._block_verifier = None
+        self._compressor = None
+
+    def _write(self, data: bytes):
+        self.file.write(data)
+        self.digest.update(data)
+
+    def _finish_block(self):
+        if self._block is None:
+            return
+        self._write(self._compressor.flush())
+        self._block[1] = self.file.tell() - self._block[0]
+        self._block = None
+
+    def add(self, verifier_id: int, row: dict):
+        block = self._block
+        if block is None or block[2] >= ARCHIVE_BLOCK_ROWS or verifier_id != self._block_verifier:
+            self._finish_block()
+            # wbits=31: each block is a complete gzip member.
+            self._compressor = zlib.compressobj(ARCHIVE_COMPRESSION_LEVEL, zlib.DEFLATED, 31)
+            block = self._block = [self.file.tell(), 0, 0, row["created_at"], row["id"], None, None]
+            self._block_verifier = verifier_id
+            self.blocks.setdefault(str(verifier_id), []).append(block)
+        self._write(self._compressor.compress(json.dumps(row, separators=(",", ":")).encode() + b"\n"))
+        block[2] += 1
+        block[5], block[6] = row["created_at"], row["id"]
+        self.rows += 1
+        low, high = self.id_range or (row["id"], row["id"])
+        self.id_range = [min(low, row["id"]), max(high, row["id"])]
+
+    def close(self) -> dict:
+        self._finish_block()
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        size = self.file.tell()
+        self.file.close()
+        return {"rows": self.rows, "bytes": size, "sha256": self.digest.hexdigest(), "id_range": self.id_range, "verifiers": self.blocks}
+
+
+def _write_json(path: str, document: dict):
+    with open(path + ".tmp", "w") as f:
+        json.dump(document, f, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + ".tmp", path)
+
+
+class Manifest:
+    def __init__(self, path: str, document: dict):
+        self.path = os.path.join(os.path.dirname(path), document["file"])
+        self.start = datetime.datetime.fromisoformat(document["from"])
+        self.end = datetime.datetime.fromisoformat(document["to"])
+        # Missing from archives written before it was recorded.
+        self.id_range = document.get("id_range")
+        self.blocks = {
+            int(verifier_id): [
+                (offset, length, count, (datetime.datetime.fromisoformat(newest_at), newest_id), (datetime.datetime.fromisoformat(oldest_at), oldest_id))
+                for offset, length, count, newest_at, newest_id, oldest_at, oldest_id in blocks
+            ]
+            for verifier_id, blocks in document["verifiers"].items()
+        }
+
+
+# Parsed manifests by path, reloaded when the file changes.
+_manifests: Dict[str, Tuple[float, Manifest]] = {}
+
+
+def load_manifests(directory: str = ARCHIVE_DIR) -> List[Manifest]:
+    """
+    Every finished archive, newest month first.
+    """
+    loaded = []
+    for path in glob.glob(os.path.join(directory, f"{TABLE}_p*.json")):
+        mtime = os.stat(path).st_mtime
+        cached = _manifests.get(path)
+        if cached is None or cached[0] != mtime:
+            with open(path) as f:
+                cached = _manifests[path] = (mtime, Manifest(path, json.load(f)))
+        loaded.append(cached[1])
+    return sorted(loaded, key=lambda manifest: manifest.start, reverse=True)
+
+
+def _read_block(path: str, offset: int, length: int) -> List[dict]:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = zlib.decompress(f.read(length), 31)
+    return [json.loads(line) for line in data.splitlines()]
+
+
+def _aware(value: Optional[datetime.datetime]) -> Optional[datetime.datetime]:
+    # Query parameters may come without a zone; the database reads those as UTC too.
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value
+
+
+def _row_key(row: dict) -> Key:
+    return datetime.datetime.fromisoformat(row["created_at"]), row["id"]
+
+
+def read_history(verifier_id: int, after: Optional[Key], limit: int) -> List[schemas.VerificationRequestWithRelations]:
+    """
+    A verifier's archived requests older than `after`, newest first, at most
+    `limit` of them. Reads one block at a time and stops once it has enough.
+    """
+    found = []
+    for manifest in load_manifests():
+        if after is not None and manifest.start > after[0]:
+            continue
+        for offset, length, _, _, oldest in manifest.blocks.get(verifier_id, ()):
+            if after is not None and oldest >= after:
+                continue
+            for row in _read_block(manifest.path, offset, length):
+                if after is None or _row_key(row) < after:
+                    found.append(schemas.VerificationRequestWithRelations.model_validate(row))
+                    if len(found) >= limit:
+                        return found
+    return found
+
+
+async def extend_history(verifier_id: int, rows: list, after: Optional[Key], wanted: Optional[int] = None) -> list:
+    """
+    Tops up `rows` (newest first, from the live table) to `wanted` rows with
+    archived rows older than them. With `wanted` None (the unpaginated list)
+    it adds at most ARCHIVE_UNPAGINATED_LIMIT archived rows, so one call
+    can't load a verifier's whole archive into memory.
+    Archived months are always older than the live ones, so the two never overlap.
+    """
+    if wanted is not None and len(rows) >= wanted:
+        return rows
+    if rows:
+        after = (rows[-1].created_at, rows[-1].id)
+    limit = ARCHIVE_UNPAGINATED_LIMIT if wanted is None else wanted - len(rows)
+    archived = await run_in_threadpool(read_history, verifier_id, after, limit)
+    return list(rows) + archived
+
+
+def find_request(request_id: int) -> Optional[dict]:
+    """
+    One archived request by ID, or None. Only archives whose ID range covers
+    it are read, starting with the blocks whose newest and oldest IDs bracket
+    it (IDs grow with created_at unless rows were backdated).
+    """
+    for manifest in load_manifests():
+        if manifest.id_range is not None and not manifest.id_range[0] <= request_id <= manifest.id_range[1]:
+            continue
+        blocks = [block for verifier_blocks in manifest.blocks.values() for block in verifier_blocks]
+        blocks.sort(key=lambda block: not block[4][1] <= request_id <= block[3][1])
+        for offset, length, _, _, _ in blocks:
+            for row in _read_block(manifest.path, offset, length):
+                if row["id"] == request_id:
+                    return row
+    return None
+
+
+async def get_archived_request(request_id: int) -> Optional[dict]:
+    return await run_in_threadpool(find_request, request_id)
+
+
+def iter_export_rows(
+    verifier_id: int,
+    created_from: Optional[datetime.datetime] = None,
+    created_to: Optional[datetime.datetime] = None,
+    status: Optional[schemas.RequestStatus] = None,
+) -> Iterator[dict]:
+    """
+    A verifier's archived requests oldest first, as flat dicts with the same
+    keys as crud.verifier_export_query's columns. Holds one block in memory.
+    """
+    created_from, created_to = _aware(created_from), _aware(created_to)
+    for manifest in reversed(load_manifests()):
+        if (created_from is not None and manifest.end <= created_from) or (created_to is not None and manifest.start >= created_to):
+            continue
+        for offset, length, _, _, _ in reversed(manifest.blocks.get(verifier_id, [])):
+            for row in reversed(_read_block(manifest.path, offset, length)):
+                created_at = datetime.datetime.fromisoformat(row["created_at"])
+                if created_from is not None and created_at < created_from:
+                    continue
+                if created_to is not None and created_at >= created_to:
+                    continue
+                if status is not None and row["status"] != status:
+                    continue
+                yield {**row, "user_email": row["user"]["email"]}
+
+
+# =================================================================
+# === Worker ======================================================
+# =================================================================
+
+class Archiver:
+    def __init__(self, session_factory=AsyncSessionLocal, directory: str = ARCHIVE_DIR):
+        self.session_factory = session_factory
+        self.directory = directory
+
+    def _paths(self, month: datetime.date) -> Tuple[str, str]:
+        base = os.path.join(self.directory, partition_name(month))
+        return base + ".jsonl.gz", base + ".json"
+
+    def recover(self, partitions: List[datetime.date]):
+        """
+        Settles archives a crashed run left half done: kept if their
+        partition was dropped, discarded (to be redone) if it wasn't.
+        """
+        for pending in glob.glob(os.path.join(self.directory, f"{TABLE}_p*.json.pending")):
+            match = PARTITION_PATTERN.match(os.path.basename(pending)[:-len(".json.pending")])
+            month = datetime.date(int(match.group(1)), int(match.group(2)), 1)
+            if month in partitions:
+                data_path, _ = self._paths(month)
+                for path in (pending, data_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+            else:
+                os.replace(pending, pending[:-len(".pending")])
+
+    async def ensure_partitions(self, existing: List[datetime.date]) -> int:
+        """
+        Creates partitions for this month and the next ARCHIVE_PARTITIONS_AHEAD,
+        and for any month whose rows ended up in the default partition (e.g.
+        backdated bulk loads), so they can be archived like the rest.
+        """
+        month = datetime.datetime.now(datetime.timezone.utc).date().replace(day=1)
+        wanted = set()
+        for _ in range(ARCHIVE_PARTITIONS_AHEAD + 1):
+            wanted.add(month)
+            month = next_month(month)
+        async with self.session_factory() as db:
+            result = await db.execute(text(
+                f"SELECT DISTINCT CAST(date_trunc('month', created_at AT TIME ZONE 'UTC') AS date) FROM {TABLE}_default"
+            ))
+            wanted.update(result.scalars())
+        created = 0
+        for month in sorted(wanted - set(existing)):
+            async with self.session_factory() as db:
+                await create_partition(db, month)
+                await db.commit()
+            logger.info("Created partition %s", partition_name(month))
+            created += 1
+        return created
+
+    async def archive_partition(self, month: datetime.date) -> Optional[int]:
+        """
+        Expires the month's abandoned pending requests, writes the month to
+        the archive and drops its partition, all in one transaction while the
+        partition is locked against writes. Returns the rows archived, or
+        None if results are still waiting to be anchored or a lock wasn't
+        granted within ARCHIVE_LOCK_TIMEOUT_MS (both retried on the next run).
+        """
+        try:
+            return await self._archive_partition(month)
+        except DBAPIError as exc:
+            if getattr(exc.orig, "sqlstate", None) != LOCK_NOT_AVAILABLE:
+                raise
+            data_path, manifest_path = self._paths(month)
+            for path in (manifest_path + ".pending", data_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            logger.warning("Skipping %s this run: timed out waiting for a table lock", partition_name(month))
+            return None
+
+    async def _archive_partition(self, month: datetime.date) -> Optional[int]:
+        request, user, verifier = models.VerificationRequest, models.User, models.Verifier
+        name = partition_name(month)
+        in_month = (request.created_at >= _utc(month), request.created_at < _utc(next_month(month)))
+        data_path, manifest_path = self._paths(month)
+        async with self.session_factory() as db:
+            # Covers every lock below; the session rolls back if one times out.
+            await db.execute(text(f"SET LOCAL lock_timeout = '{ARCHIVE_LOCK_TIMEOUT_MS}ms'"))
+            await db.execute(text(f"LOCK TABLE {name} IN SHARE MODE"))
+            if ARCHIVE_REQUIRE_ANCHORED:
+                unanchored = (await db.execute(
+                    select(func.count()).select_from(request)
+                    .filter(*in_month, request.status.in_(FINAL_STATUSES), request.anchor_id.is_(None))
+                )).scalar_one()
+                if unanchored:
+                    logger.info("Keeping %s: %d results are not anchored yet", name, unanchored)
+                    return None
+
+            # Nobody finished these in the retention window; they won't be now.
+            abandoned = (await db.execute(
+                select(request).filter(*in_month, request.status == schemas.RequestStatus.pending)
+            )).scalars().all()
+            for pending in abandoned:
+                pending.status = schemas.RequestStatus.expired
+                pending.lease_expires_at = None
+            if abandoned:
+                await db.flush()
+                await crud.enqueue_webhook_events(db, abandoned)
+                logger.info("Expired %d abandoned pending requests in %s", len(abandoned), name)
+
+            os.makedirs(self.directory, exist_ok=True)
+            writer = ArchiveWriter(data_path)
+            columns = list(request.__table__.columns)
+            query = (
+                select(*columns, request.policy_to_check, user.email, verifier.company_name)
+                .join(user, user.id == request.user_id).join(verifier, verifier.id == request.verifier_id)
+                .filter(*in_month)
+                .order_by(request.verifier_id, request.created_at.desc(), request.id.desc())
+                .execution_options(yield_per=ARCHIVE_CHUNK_SIZE)
+            )
+            result = await db.stream(query)
+            async for chunk in result.partitions(ARCHIVE_CHUNK_SIZE):
+                for values in chunk:
+                    row = {column.name: _jsonable(value) for column, value in zip(columns, values)}
+                    row["policy_to_check"] = values[-3]
+                    row["user"] = {"id": row["user_id"], "email": values[-2]}
+                    row["verifier"] = {"id": row["verifier_id"], "company_name": values[-1]}
+                    writer.add(row["verifier_id"], row)
+            summary = writer.close()
+
+            total = (await db.execute(select(func.count()).select_from(request).filter(*in_month))).scalar_one()
+            if total != summary["rows"]:
+                os.remove(data_path)
+                raise RuntimeError(f"{name}: wrote {summary['rows']} rows but the partition holds {total}")
+            _write_json(manifest_path + ".pending", {
+                "partition": name,
+                "from": _utc(month).isoformat(),
+                "to": _utc(next_month(month)).isoformat(),
+                "file": os.path.basename(data_path),
+                "archived_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                **summary,
+            })
+            await db.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+            await db.execute(text(f"DROP TABLE {name}"))
+            await db.commit()
+        os.replace(manifest_path + ".pending", manifest_path)
+        logger.info("Archived %d rows from %s to %s (%d bytes)", summary["rows"], name, data_path, summary["bytes"])
+        return summary["rows"]
+
+    async def run_once(self) -> int:
+        """
+        Creates upcoming partitions and archives every month past the
+        retention window. Returns how many months were archived.
+        """
+        async with self.session_factory() as db:
+            partitions = await list_partitions(db)
+        self.recover(partitions)
+        if await self.ensure_partitions(partitions):
+            async with self.session_factory() as db:
+                partitions = await list_partitions(db)
+        cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=ARCHIVE_RETENTION_DAYS)
+        archived = 0
+        for month in partitions:
+            if _utc(next_month(month)) > cutoff:
+                break
+            if await self.archive_partition(month) is not None:
+                archived += 1
+        return archived
+
+    async def run_forever(self, stop: Optional[asyncio.Event] = None):
+        stop = stop or asyncio.Event()
+        while not stop.is_set():
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Archival failed")
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=ARCHIVE_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(Archiver().run_forever())
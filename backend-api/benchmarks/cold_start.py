@@ -0,0 +1,86 @@
+# backend-api/benchmarks/cold_start.py
+"""
+Measures time-to-first-request: starts a fresh uvicorn process, then times
+how long until it listens (/health), until it is ready (/ready), and how
+slow its first real request is compared with the ones after it. Runs once
+with startup prewarming and once without, for comparison.
+
+    python benchmarks/cold_start.py --runs 3
+
+Uses the database in DATABASE_URL. The probe request is read-only.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NO_PREWARM = {"DB_PREWARM_CONNECTIONS": "0", "PREWARM_HASHING": "false"}
+
+
+def wait_for(client: httpx.Client, path: str, deadline: float) -> float:
+    while time.monotonic() < deadline:
+        try:
+            if client.get(path).status_code == 200:
+                return time.monotonic()
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"{path} did not answer 200 in time")
+
+
+def timed_get(client: httpx.Client, path: str) -> float:
+    started = time.perf_counter()
+    response = client.get(path)
+    if response.status_code >= 500:
+        raise RuntimeError(f"{path} answered {response.status_code}")
+    return (time.perf_counter() - started) * 1000
+
+
+def run_once(args, extra_env: dict) -> dict:
+    env = {**os.environ, **extra_env}
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"]
+    spawned = time.monotonic()
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{args.port}", timeout=args.timeout) as client:
+            deadline = spawned + args.timeout
+            listening = wait_for(client, "/health", deadline)
+            ready = wait_for(client, "/ready", deadline)
+            first_ms = timed_get(client, args.path)
+            steady_ms = statistics.median(timed_get(client, args.path) for _ in range(20))
+            reported = client.get("/ready").json()
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return {
+        "listening_s": listening - spawned,
+        "ready_s": ready - spawned,
+        "first_ms": first_ms,
+        "steady_ms": steady_ms,
+        "db_ms": reported["database"].get("latency_ms") or 0.0,
+    }
+
+
+def main(args):
+    print(f"{'mode':<14}{'listening s':>13}{'ready s':>10}{'1st req ms':>12}{'steady ms':>11}{'db rtt ms':>11}")
+    for mode, extra_env in (("prewarmed", {}), ("cold", NO_PREWARM)):
+        runs = [run_once(args, extra_env) for _ in range(args.runs)]
+        median = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+        print(
+            f"{mode:<14}{median['listening_s']:>13.2f}{median['ready_s']:>10.2f}"
+            f"{median['first_ms']:>12.1f}{median['steady_ms']:>11.1f}{median['db_ms']:>11.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--path", default="/verifiers/by-name/?name=cold-start-probe", help="request to time")
+    parser.add_argument("--timeout", type=float, default=60)
+    main(parser.parse_args())
@@ -0,0 +1,134 @@
+# backend-api/benchmarks/enum_storage.py
+"""
+Compares the on-disk size of verification_requests before and after revision
+d4f1b8e2a639, which stores status, result and policy as smallint codes
+instead of strings. Builds both layouts with the same rows in a scratch
+schema, adds each layout's indexes, and prints table, index and total sizes.
+
+    python benchmarks/enum_storage.py --rows 10000000
+
+Only touches the `enum_storage_bench` schema, which it drops at the end
+(pass --keep to look at it afterwards).
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from database import engine
+
+SCHEMA = "enum_storage_bench"
+
+# Same columns as the live table, with the three columns in each layout's type.
+COLUMNS = (
+    "id integer NOT NULL, verifier_id integer, user_id integer, {policy}, {status}, {result}, "
+    "etherscan_url varchar, proof varchar, lease_expires_at timestamptz, dispatch_attempts integer NOT NULL DEFAULT 0, "
+    "anchor_id integer, merkle_proof varchar, created_at timestamptz NOT NULL, updated_at timestamptz"
+)
+
+LAYOUTS = {
+    "strings (before)": {
+        "table": "requests_strings",
+        "columns": COLUMNS.format(policy="policy_to_check varchar NOT NULL", status="status varchar", result="result varchar"),
+        "policy_column": "policy_to_check",
+        "select": "policy, status, result",
+        "pending": "'pending'",
+        "final": "'completed', 'failed'",
+    },
+    "codes (after)": {
+        "table": "requests_codes",
+        "columns": COLUMNS.format(policy="policy_id smallint NOT NULL", status="status smallint NOT NULL", result="result smallint"),
+        "policy_column": "policy_id",
+        "select": "policy_code, status_code, result_code",
+        "pending": "0",
+        "final": "1, 2",
+    },
+}
+
+# The partial indexes whose predicates change, plus the primary key.
+INDEXES = (
+    "CREATE INDEX ON {schema}.{table} (user_id) WHERE status = {pending}",
+    "CREATE INDEX ON {schema}.{table} (lease_expires_at) WHERE status = {pending} AND proof IS NOT NULL",
+    "CREATE INDEX ON {schema}.{table} (id) WHERE anchor_id IS NULL AND status IN ({final})",
+    "ALTER TABLE {schema}.{table} ADD PRIMARY KEY (id, created_at)",
+)
+
+
+def source_rows(conn, rows: int):
+    """
+    One set of random rows shaped like production (about 25% pending), kept
+    in an unlogged table so both layouts get exactly the same data.
+    """
+    print(f"Generating {rows:,} rows...")
+    conn.execute(text(
+        f"CREATE UNLOGGED TABLE {SCHEMA}.source AS "
+        "SELECT i AS id, 1 + (random() * 499)::int AS verifier_id, 1 + (random() * 199999)::int AS user_id, "
+        "       p.policy_code, p.policy, o.status_code, o.status, o.result_code, o.result, "
+        "       now() - random() * interval '180 days' AS created_at "
+        "FROM generate_series(1, :rows) AS i "
+        "CROSS JOIN LATERAL (SELECT (random() * 2)::int + 1 AS policy_code WHERE i > 0) AS pc "
+        "JOIN (VALUES (1, 'isOver18'), (2, 'isOver21'), (3, 'isResident')) AS p(policy_code, policy) USING (policy_code) "
+        "CROSS JOIN LATERAL (SELECT CASE WHEN random() < 0.25 THEN 0 WHEN random() < 0.85 THEN 1 ELSE 2 END AS status_code WHERE i > 0) AS sc "
+        "JOIN (VALUES (0, 'pending', NULL::int, NULL), (1, 'completed', 1, 'Yes'), (2, 'failed', 0, 'No')) "
+        "     AS o(status_code, status, result_code, result) USING (status_code)"
+    ), {"rows": rows})
+
+
+def build(conn, layout: dict):
+    table = layout["table"]
+    conn.execute(text(f"CREATE TABLE {SCHEMA}.{table} ({layout['columns']})"))
+    conn.execute(text(
+        f"INSERT INTO {SCHEMA}.{table} (id, verifier_id, user_id, {layout['policy_column']}, status, result, created_at, updated_at) "
+        f"SELECT id, verifier_id, user_id, {layout['select']}, created_at, "
+        f"       CASE WHEN status_code <> 0 THEN created_at + interval '1 minute' END "
+        f"FROM {SCHEMA}.source ORDER BY id"
+    ))
+    for ddl in INDEXES:
+        conn.execute(text(ddl.format(schema=SCHEMA, **layout)))
+    conn.execute(text(f"VACUUM ANALYZE {SCHEMA}.{table}"))
+
+
+def sizes(conn, table: str) -> dict:
+    return conn.execute(text(
+        "SELECT pg_relation_size(c.oid) AS heap, pg_indexes_size(c.oid) AS indexes, pg_total_relation_size(c.oid) AS total "
+        "FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace WHERE n.nspname = :schema AND c.relname = :table"
+    ), {"schema": SCHEMA, "table": table}).mappings().one()
+
+
+def mib(size: int) -> str:
+    return f"{size / 1024 / 1024:,.1f} MiB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--keep", action="store_true", help="leave the scratch schema in place")
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        try:
+            source_rows(conn, args.rows)
+            measured = {}
+            for label, layout in LAYOUTS.items():
+                print(f"Building {label}...")
+                build(conn, layout)
+                measured[label] = sizes(conn, layout["table"])
+
+            print(f"\n{'layout':<20}{'table':>14}{'indexes':>14}{'total':>14}{'bytes/row':>12}")
+            for label, size in measured.items():
+                print(f"{label:<20}{mib(size['heap']):>14}{mib(size['indexes']):>14}{mib(size['total']):>14}{size['total'] / args.rows:>12.1f}")
+            before, after = measured.values()
+            for key in ("heap", "indexes", "total"):
+                print(f"{key} saved: {mib(before[key] - after[key])} ({1 - after[key] / before[key]:.1%})")
+        finally:
+            if not args.keep:
+                conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# backend-api/benchmarks/explain_request_indexes.py
+"""
+Seeds a large verification_requests table and prints EXPLAIN ANALYZE for the
+two hot request queries, first without and then with the indexes added in
+revision a4e8f2c61d07.
+
+    python benchmarks/explain_request_indexes.py --rows 10000000
+
+Run it against a scratch database that is already at the latest revision.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from database import engine
+from models import enum_code
+from schemas import RequestStatus, VerificationResult
+
+PENDING, COMPLETED, FAILED = (enum_code(status) for status in (RequestStatus.pending, RequestStatus.completed, RequestStatus.failed))
+YES, NO = enum_code(VerificationResult.yes), enum_code(VerificationResult.no)
+
+
+INDEXES = {
+    "ix_verification_requests_user_id_pending":
+        "CREATE INDEX ix_verification_requests_user_id_pending "
+        f"ON verification_requests (user_id) WHERE status = {PENDING}",
+    "ix_verification_requests_verifier_id_created_at":
+        "CREATE INDEX ix_verification_requests_verifier_id_created_at "
+        "ON verification_requests (verifier_id, created_at DESC)",
+}
+
+# The same shapes crud.get_requests_for_user and crud.get_requests_by_verifier send.
+QUERIES = {
+    "pending requests for a user":
+        f"SELECT * FROM verification_requests WHERE user_id = :user_id AND status = {PENDING}",
+    "verifier history (newest first)":
+        "SELECT * FROM verification_requests WHERE verifier_id = :verifier_id ORDER BY created_at DESC",
+    "verifier history, first page":
+        "SELECT * FROM verification_requests WHERE verifier_id = :verifier_id ORDER BY created_at DESC LIMIT 50",
+}
+
+
+def seed(conn, users: int, verifiers: int, rows: int):
+    """
+    Tops the tables up to the requested sizes with set-based INSERTs.
+    Roughly 2% of requests are pending, the rest completed or failed.
+    """
+    existing = conn.execute(text("SELECT count(*) FROM users WHERE email LIKE 'seed-%'")).scalar()
+    if existing < users:
+        print(f"Seeding {users - existing} users...")
+        conn.execute(text(
+            "INSERT INTO users (email, hashed_password, did) "
+            "SELECT 'seed-' || i || '@example.com', 'x', 'did:example:seed-' || i "
+            "FROM generate_series(:start, :stop) AS i"
+        ), {"start": existing + 1, "stop": users})
+
+    existing = conn.execute(text("SELECT count(*) FROM verifiers WHERE company_name LIKE 'seed-%'")).scalar()
+    if existing < verifiers:
+        print(f"Seeding {verifiers - existing} verifiers...")
+        conn.execute(text(
+            "INSERT INTO verifiers (company_name, hashed_password, api_key_hash, api_key_prefix, is_active) "
+            "SELECT 'seed-' || i, 'x', encode(sha256(convert_to('seed-key-' || i, 'UTF8')), 'hex'), 'seed-key', true "
+            "FROM generate_series(:start, :stop) AS i"
+        ), {"start": existing + 1, "stop": verifiers})
+
+    existing = conn.execute(text("SELECT count(*) FROM verification_requests")).scalar()
+    if existing < rows:
+        print(f"Seeding {rows - existing} verification requests (this takes a while)...")
+        conn.execute(text("INSERT INTO policies (name) VALUES ('isOver18') ON CONFLICT (name) DO NOTHING"))
+        conn.execute(text(
+            "INSERT INTO verification_requests (verifier_id, user_id, policy_id, status, result, created_at, updated_at) "
+            "SELECT v.id, u.id, (SELECT id FROM policies WHERE name = 'isOver18'), s.status, "
+            f"       CASE s.status WHEN {COMPLETED} THEN {YES} WHEN {FAILED} THEN {NO} END, "
+            f"       s.created_at, CASE WHEN s.status <> {PENDING} THEN s.created_at + interval '1 minute' END "
+            "FROM generate_series(1, :count) AS i "
+            "CROSS JOIN LATERAL (SELECT "
+            f"    CASE WHEN random() < 0.02 THEN {PENDING} WHEN random() < 0.95 THEN {COMPLETED} ELSE {FAILED} END::smallint AS status, "
+            "    now() - random() * interval '730 days' AS created_at, "
+            "    (SELECT min(id) FROM users WHERE email LIKE 'seed-%') + (random() * (:users - 1))::int AS user_id, "
+            "    (SELECT min(id) FROM verifiers WHERE company_name LIKE 'seed-%') + (random() * (:verifiers - 1))::int AS verifier_id "
+            "    WHERE i > 0) AS s "
+            "JOIN users u ON u.id = s.user_id "
+            "JOIN verifiers v ON v.id = s.verifier_id"
+        ), {"count": rows - existing, "users": users, "verifiers": verifiers})
+    conn.execute(text("ANALYZE users"))
+    conn.execute(text("ANALYZE verifiers"))
+    conn.execute(text("ANALYZE verification_requests"))
+
+
+def explain_all(conn, params: dict):
+    for label, query in QUERIES.items():
+        print(f"\n--- {label} ---")
+        plan = conn.execute(text("EXPLAIN (ANALYZE, BUFFERS) " + query), params).scalars().all()
+        print("\n".join(plan))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--verifiers", type=int, default=500)
+    parser.add_argument("--skip-seed", action="store_true")
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        if not args.skip_seed:
+            seed(conn, args.users, args.verifiers, args.rows)
+
+        # Pick a busy user and verifier so the plans have real work to do.
+        params = {
+            "user_id": conn.execute(text(
+                f"SELECT user_id FROM verification_requests WHERE status = {PENDING} "
+                "GROUP BY user_id ORDER BY count(*) DESC LIMIT 1"
+            )).scalar(),
+            "verifier_id": conn.execute(text(
+                "SELECT verifier_id FROM verification_requests GROUP BY verifier_id ORDER BY count(*) DESC LIMIT 1"
+            )).scalar(),
+        }
+
+        print("\n========== BEFORE (indexes dropped) ==========")
+        for name in INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        explain_all(conn, params)
+
+        print("\n========== AFTER (indexes created) ==========")
+        for ddl in INDEXES.values():
+            conn.execute(text(ddl))
+        conn.execute(text("ANALYZE verification_requests"))
+        explain_all(conn, params)
+
+
+if __name__ == "__main__":
+    main()
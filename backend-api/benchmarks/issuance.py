@@ -0,0 +1,82 @@
+# backend-api/benchmarks/issuance.py
+"""
+Compares credential issuance throughput: one POST /issuer/issue-credential
+per user versus POST /issuer/issue-credentials/batch, plus the raw signing
+cost of the prepared signer against a plain jose.jwt.encode per credential.
+
+    python benchmarks/issuance.py --count 2000 --batch-size 1000
+
+Requests go through the ASGI app in-process, against the database in
+DATABASE_URL (it needs at least one user), authenticated with
+ISSUER_ADMIN_KEY. Issued credentials are deleted again afterwards.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from jose import jwt
+from sqlalchemy import delete, select
+
+import issuer
+import models
+import security
+from database import AsyncSessionLocal
+from main import app
+
+
+def bench_signing(count: int):
+    claims = {"sub": 1, "iss": security.ISSUER_DID, "iat": time.time(), "claim": {"birthYear": 1990, "country": "USA"}}
+    started = time.perf_counter()
+    for _ in range(count):
+        jwt.encode(claims, security.get_issuer_signing_key(), algorithm=security.ISSUER_ALGORITHM)
+    naive = count / (time.perf_counter() - started)
+    signer = issuer.get_signer()
+    started = time.perf_counter()
+    for _ in range(count):
+        signer.sign(claims)
+    prepared = count / (time.perf_counter() - started)
+    print(f"signing only        jose.jwt.encode: {naive:>10.0f}/s   prepared signer: {prepared:>10.0f}/s")
+
+
+async def main(args):
+    if not security.ISSUER_ADMIN_KEY:
+        sys.exit("Set ISSUER_ADMIN_KEY; the issuance routes refuse every caller without it.")
+    bench_signing(args.count)
+    async with AsyncSessionLocal() as db:
+        user_ids = (await db.execute(select(models.User.id).order_by(models.User.id).limit(args.count))).scalars().all()
+        max_credential_id = (await db.execute(select(models.Credential.id).order_by(models.Credential.id.desc()).limit(1))).scalar() or 0
+    if not user_ids:
+        sys.exit("No users found; create or seed some first.")
+    items = [{"user_id": user_ids[i % len(user_ids)], "birth_year": 1990} for i in range(args.count)]
+
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test", timeout=None,
+                                     headers={"issuer-admin-key": security.ISSUER_ADMIN_KEY}) as client:
+            started = time.perf_counter()
+            for item in items:
+                (await client.post("/issuer/issue-credential", json=item)).raise_for_status()
+            single = args.count / (time.perf_counter() - started)
+
+            started = time.perf_counter()
+            for start in range(0, args.count, args.batch_size):
+                response = await client.post("/issuer/issue-credentials/batch", json={"items": items[start:start + args.batch_size]})
+                response.raise_for_status()
+            batched = args.count / (time.perf_counter() - started)
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(models.Credential).filter(models.Credential.id > max_credential_id))
+            await db.commit()
+
+    print(f"end to end (HTTP)   single: {single:>10.0f}/s   batch of {args.batch_size}: {batched:>10.0f}/s   ({batched / single:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,176 @@
+# backend-api/benchmarks/load.py
+"""
+HTTP load driver: runs a mixed workload against a running API server and
+reports p50/p95/p99 latency and throughput per operation.
+
+    uvicorn main:app --workers 4 &
+    python benchmarks/load.py --concurrency 64 --duration 60 --save-baseline benchmarks/baseline-load.json
+    python benchmarks/load.py --concurrency 64 --duration 60 --compare benchmarks/baseline-load.json
+
+The operations and their default weights (change them with --mix):
+
+    login     POST /users/token
+    create    POST /verification/request
+    history   GET /verification/requests/verifier and /verification/requests/user/{id}
+              (the latter with a token from an earlier login)
+    callback  PUT /verification/request/{id} for a request this run created
+
+Credentials come from seed.py's --keys-out file; callbacks send
+--service-key (default: VERIFIER_SERVICE_KEY). Each worker is a closed
+loop (one request at a time), so --concurrency is the number of requests
+in flight.
+"""
+import argparse
+import asyncio
+import collections
+import json
+import os
+import random
+import sys
+import time
+
+import httpx
+
+import stats
+
+DEFAULT_MIX = "login=1,create=3,history=4,callback=2"
+
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight)
+    unknown = set(weights) - {"login", "create", "history", "callback"}
+    if unknown:
+        raise SystemExit(f"Unknown operations in --mix: {', '.join(sorted(unknown))}")
+    return weights
+
+
+class Workload:
+    def __init__(self, client: httpx.AsyncClient, seeded: dict, rng: random.Random, service_key: str = None):
+        self.client = client
+        self.seeded = seeded
+        self.rng = rng
+        self.service_key = service_key
+        # Requests created by this run that can still receive a callback.
+        self.created = collections.deque(maxlen=10000)
+        # user id -> bearer token from this run's logins, for the user history route.
+        self.tokens = {}
+
+    def _verifier(self):
+        return self.rng.choice(self.seeded["verifiers"])
+
+    async def login(self):
+        user = self.rng.choice(self.seeded["users"])
+        response = await self.client.post("/users/token", data={"username": user["email"], "password": self.seeded["password"]})
+        if response.status_code < 300:
+            self.tokens[user["id"]] = response.json()["access_token"]
+        return response
+
+    async def create(self):
+        verifier = self._verifier()
+        user = self.rng.choice(self.seeded["users"])
+        response = await self.client.post(
+            "/verification/request", json={"user_id": user["id"], "policy": "isOver18"}, headers={"api-key": verifier["api_key"]}
+        )
+        if response.status_code < 300:
+            self.created.append(response.json()["id"])
+        return response
+
+    async def history(self):
+        if self.rng.random() < 0.5:
+            return await self.client.get("/verification/requests/verifier?limit=50", headers={"api-key": self._verifier()["api_key"]})
+        if not self.tokens:
+            return await self.login()
+        user_id = self.rng.choice(list(self.tokens))
+        return await self.client.get(
+            f"/verification/requests/user/{user_id}?limit=50", headers={"Authorization": f"Bearer {self.tokens[user_id]}"}
+        )
+
+    async def callback(self):
+        if not self.created:
+            return await self.create()
+        request_id = self.created.popleft()
+        outcome = self.rng.random() < 0.85
+        return await self.client.put(
+            f"/verification/request/{request_id}",
+            json={"status": "completed" if outcome else "failed", "result": "Yes" if outcome else "No"},
+            headers={"verifier-service-key": self.service_key or ""},
+        )
+
+
+async def worker(workload: Workload, operations, weights, deadline: float, record, rng: random.Random):
+    while time.monotonic() < deadline:
+        name = rng.choices(operations, cum_weights=weights)[0]
+        started = time.perf_counter()
+        try:
+            response = await getattr(workload, name)()
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        record(name, time.perf_counter() - started, ok)
+
+
+async def run_phase(args, seeded, duration: float, record):
+    mix = parse_mix(args.mix)
+    operations = list(mix)
+    cumulative, total = [], 0.0
+    for name in operations:
+        total += mix[name]
+        cumulative.append(total)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        workload = Workload(client, seeded, random.Random(args.seed), args.service_key)
+        deadline = time.monotonic() + duration
+        await asyncio.gather(*(
+            worker(workload, operations, cumulative, deadline, record, random.Random(args.seed + i))
+            for i in range(args.concurrency)
+        ))
+
+
+async def main(args):
+    with open(args.keys) as f:
+        seeded = json.load(f)
+
+    if args.warmup:
+        print(f"Warming up for {args.warmup:.0f}s...")
+        await run_phase(args, seeded, args.warmup, lambda *_: None)
+
+    samples = collections.defaultdict(list)
+    errors = collections.Counter()
+
+    def record(name, elapsed, ok):
+        if ok:
+            samples[name].append(elapsed)
+        else:
+            errors[name] += 1
+
+    print(f"Running {args.mix} with {args.concurrency} workers for {args.duration:.0f}s against {args.base_url}...")
+    started = time.perf_counter()
+    await run_phase(args, seeded, args.duration, record)
+    elapsed = time.perf_counter() - started
+
+    results = {
+        name: stats.summarize(samples[name], elapsed, errors[name])
+        for name in sorted(set(samples) | set(errors))
+    }
+    results["total"] = stats.summarize([s for values in samples.values() for s in values], elapsed, sum(errors.values()))
+    print()
+    meta = {"mix": args.mix, "concurrency": args.concurrency, "duration": args.duration, "base_url": args.base_url}
+    return stats.report(args, results, meta)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--keys", default=stats.DEFAULT_KEYS_PATH, help="credentials file written by seed.py")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"operation weights (default {DEFAULT_MIX})")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30, help="seconds to measure")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds to run before measuring")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--service-key", default=os.getenv("VERIFIER_SERVICE_KEY"), help="verifier-service-key for callbacks")
+    stats.add_baseline_arguments(parser)
+    sys.exit(asyncio.run(main(parser.parse_args())))
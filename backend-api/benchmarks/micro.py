@@ -0,0 +1,151 @@
+# backend-api/benchmarks/micro.py
+"""
+Micro-benchmarks for each crud function and for the security helpers
+(password hashing, API key hashing, access tokens).
+
+    python benchmarks/micro.py --iterations 200 --save-baseline benchmarks/baseline-micro.json
+    python benchmarks/micro.py --iterations 200 --compare benchmarks/baseline-micro.json
+
+Needs data from seed.py (it reads --keys). Rows the benchmarks create are
+deleted again at the end. Keep the seeded data set the same between a
+baseline and a comparison, or the numbers won't be comparable.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, select
+
+import crud
+import hashing
+import models
+import schemas
+import security
+import stats
+from cache import api_key_cache
+from database import AsyncSessionLocal
+
+
+async def timed(samples, fn):
+    started = time.perf_counter()
+    result = fn()
+    if asyncio.iscoroutine(result):
+        result = await result
+    samples.append(time.perf_counter() - started)
+    return result
+
+
+async def bench(name: str, iterations: int, make_call, results: dict, warmup: int = 5):
+    """
+    Times the callable returned by `make_call(i)` after `warmup` untimed
+    calls. `i` counts every call, warm-up included, so no two calls share it.
+    """
+    for i in range(warmup):
+        await timed([], make_call(i))
+    samples = []
+    for i in range(warmup, warmup + iterations):
+        await timed(samples, make_call(i))
+    results[name] = stats.summarize(samples)
+    print(f"  {name}: p50 {results[name]['p50_ms']:.3f} ms")
+
+
+async def main(args):
+    with open(args.keys) as f:
+        seeded = json.load(f)
+    users = seeded["users"]
+    verifier = seeded["verifiers"][0]
+    rng = random.Random(args.seed)
+    n = args.iterations
+    slow_n = max(1, n // 10)
+    results = {}
+
+    async with AsyncSessionLocal() as db:
+        max_request_id = (await db.execute(select(models.VerificationRequest.id).order_by(models.VerificationRequest.id.desc()).limit(1))).scalar() or 0
+        pending_ids = (await db.execute(
+            select(models.VerificationRequest.id)
+            .filter(models.VerificationRequest.verifier_id == verifier["id"], models.VerificationRequest.status == "pending")
+            .limit(n * 101)
+        )).scalars().all()
+    run_tag = uuid.uuid4().hex[:8]
+
+    # --- security ---
+    claims = {"sub": users[0]["email"], "type": "user"}
+    await bench("security.create_access_token", n, lambda i: lambda: security.create_access_token(claims), results)
+    await bench("security.hash_api_key", n, lambda i: lambda: security.hash_api_key(verifier["api_key"]), results)
+    password_hash = security.get_password_hash(seeded["password"])
+    await bench("security.get_password_hash", slow_n, lambda i: lambda: security.get_password_hash(seeded["password"]), results)
+    await bench("security.verify_password", slow_n, lambda i: lambda: security.verify_password(seeded["password"], password_hash), results)
+    await bench("hashing.verify_password (pool)", slow_n, lambda i: lambda: hashing.verify_password(seeded["password"], password_hash), results)
+
+    # --- crud, one session per call as in a request ---
+    async def with_db(fn):
+        async with AsyncSessionLocal() as db:
+            return await fn(db)
+
+    def cold_api_key_lookup():
+        api_key_cache.clear()
+        return with_db(lambda db: crud.get_verifier_by_api_key(db, verifier["api_key"]))
+
+    await bench("crud.get_user_by_email", n, lambda i: lambda: with_db(
+        lambda db: crud.get_user_by_email(db, rng.choice(users)["email"])), results)
+    await bench("crud.get_verifier_by_company_name", n, lambda i: lambda: with_db(
+        lambda db: crud.get_verifier_by_company_name(db, verifier["company_name"])), results)
+    await bench("crud.get_verifier_by_api_key (cold)", n, lambda i: cold_api_key_lookup, results)
+    await bench("crud.get_verifier_by_api_key (cached)", n, lambda i: lambda: with_db(
+        lambda db: crud.get_verifier_by_api_key(db, verifier["api_key"])), results)
+    await bench("crud.get_existing_user_ids (1000)", n, lambda i: lambda: with_db(
+        lambda db: crud.get_existing_user_ids(db, [user["id"] for user in users[:1000]])), results)
+    await bench("crud.get_requests_for_user (page 50)", n, lambda i: lambda: with_db(
+        lambda db: crud.get_requests_for_user(db, rng.choice(users)["id"], limit=50)), results)
+    await bench("crud.get_requests_by_verifier (page 50)", n, lambda i: lambda: with_db(
+        lambda db: crud.get_requests_by_verifier(db, verifier["id"], limit=50)), results)
+
+    try:
+        await bench("crud.create_user", slow_n, lambda i: lambda: with_db(lambda db: crud.create_user(
+            db, schemas.UserCreate(email=f"micro-{run_tag}-{i}@bench.example", password=seeded["password"]))), results)
+        await bench("crud.create_verification_request", n, lambda i: lambda: with_db(lambda db: crud.create_verification_request(
+            db, verifier["id"], rng.choice(users)["id"], "isOver18")), results)
+        batch = [schemas.VerificationRequestCreate(user_id=user["id"], policy="isOver18") for user in users[:100]]
+        await bench("crud.create_verification_requests_batch (100)", n, lambda i: lambda: with_db(
+            lambda db: crud.create_verification_requests_batch(db, verifier["id"], batch)), results)
+        if len(pending_ids) >= n * 101:
+            await bench("crud.update_verification_request", n, lambda i: lambda: with_db(lambda db: crud.update_verification_request(
+                db, pending_ids[i], "completed", "Yes", None)), results, warmup=0)
+            await bench("crud.update_verification_requests_batch (100)", n, lambda i: lambda: with_db(
+                lambda db: crud.update_verification_requests_batch(db, [
+                    schemas.VerificationStatusUpdate(id=request_id, status="completed", result="Yes")
+                    for request_id in pending_ids[n + i * 100:n + (i + 1) * 100]
+                ])), results, warmup=0)
+        else:
+            print("  (skipping status updates: not enough pending requests for this verifier; seed more)")
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(models.VerificationRequest).filter(models.VerificationRequest.id > max_request_id))
+            await db.execute(delete(models.User).filter(models.User.email.like(f"micro-{run_tag}-%")))
+            # The updated rows go back to pending so the next run starts from the same data.
+            await db.execute(
+                models.VerificationRequest.__table__.update()
+                .where(models.VerificationRequest.id.in_(pending_ids))
+                .values(status="pending", result=None)
+            )
+            await db.commit()
+        hashing.shutdown()
+
+    print()
+    return stats.report(args, results, {"iterations": n, "users": len(users)})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--keys", default=stats.DEFAULT_KEYS_PATH, help="credentials file written by seed.py")
+    parser.add_argument("--seed", type=int, default=1)
+    stats.add_baseline_arguments(parser)
+    sys.exit(asyncio.run(main(parser.parse_args())))
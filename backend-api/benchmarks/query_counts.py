@@ -0,0 +1,119 @@
+# backend-api/benchmarks/query_counts.py
+"""
+Checks that the listing and lookup endpoints issue a fixed number of SQL
+statements, whatever the number of rows they return. Exits non-zero if any
+endpoint's query count grows with the data (an N+1 regression).
+
+    python benchmarks/query_counts.py --sizes 10 1000
+
+Run it against a scratch database at the latest revision; the rows it
+creates are removed again at the end.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from sqlalchemy import delete, event, insert
+
+import crud
+import models
+import schemas
+import security
+from database import AsyncSessionLocal, async_engine
+from main import app
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+async def seed_principals():
+    api_key = security.generate_api_key()
+    suffix = uuid.uuid4().hex[:8]
+    async with AsyncSessionLocal() as db:
+        user = models.User(email=f"qc-{suffix}@example.com", hashed_password="x", did=f"did:example:qc-{suffix}")
+        verifier = models.Verifier(
+            company_name=f"qc-{suffix}", hashed_password="x",
+            api_key_hash=security.hash_api_key(api_key), api_key_prefix=api_key[:security.API_KEY_PREFIX_LENGTH],
+        )
+        db.add_all([user, verifier])
+        await db.commit()
+        return user.id, user.email, verifier.id, verifier.company_name, api_key
+
+
+async def top_up_requests(user_id: int, verifier_id: int, have: int, want: int):
+    if want <= have:
+        return
+    async with AsyncSessionLocal() as db:
+        policy_id = await crud.get_policy_id(db, "isOver18")
+        rows = [
+            {"user_id": user_id, "verifier_id": verifier_id, "policy_id": policy_id, "status": schemas.RequestStatus.pending}
+            for _ in range(want - have)
+        ]
+        await db.execute(insert(models.VerificationRequest), rows)
+        await db.commit()
+
+
+async def cleanup(user_id: int, verifier_id: int):
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(models.VerificationRequest).filter(models.VerificationRequest.user_id == user_id))
+        await db.execute(delete(models.User).filter(models.User.id == user_id))
+        await db.execute(delete(models.Verifier).filter(models.Verifier.id == verifier_id))
+        await db.commit()
+
+
+async def main(sizes):
+    user_id, email, verifier_id, company_name, api_key = await seed_principals()
+    headers = {"api-key": api_key}
+    user_headers = {"Authorization": f"Bearer {security.create_access_token({'sub': email, 'type': 'user', 'uid': user_id})}"}
+    endpoints = {
+        "GET /users/by-email/": (f"/users/by-email/?email={email}", {}),
+        "GET /verifiers/by-name/": (f"/verifiers/by-name/?name={company_name}", {}),
+        "GET /verification/requests/user/{id}": (f"/verification/requests/user/{user_id}?limit=500", user_headers),
+        "GET /verification/requests/user/{id} (unpaginated)": (f"/verification/requests/user/{user_id}?paginate=false", user_headers),
+        "GET /verification/requests/verifier": ("/verification/requests/verifier?limit=500", headers),
+        "GET /verification/requests/verifier (unpaginated)": ("/verification/requests/verifier?paginate=false", headers),
+    }
+
+    counter = QueryCounter()
+    event.listen(async_engine.sync_engine, "before_cursor_execute", counter)
+    counts = {name: {} for name in endpoints}
+    have = 0
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            for size in sizes:
+                await top_up_requests(user_id, verifier_id, have, size)
+                have = max(have, size)
+                for name, (url, hdrs) in endpoints.items():
+                    await client.get(url, headers=hdrs)  # warm caches (e.g. the API key cache)
+                    counter.count = 0
+                    response = await client.get(url, headers=hdrs)
+                    response.raise_for_status()
+                    counts[name][size] = counter.count
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", counter)
+        await cleanup(user_id, verifier_id)
+
+    failed = False
+    print(f"{'endpoint':<55}" + "".join(f"{f'{s} rows':>12}" for s in sizes))
+    for name, by_size in counts.items():
+        flat = len(set(by_size.values())) == 1
+        failed = failed or not flat
+        print(f"{name:<55}" + "".join(f"{by_size[s]:>12}" for s in sizes) + ("" if flat else "   <-- grows with rows"))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000])
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(sorted(args.sizes))))
@@ -0,0 +1,173 @@
+# backend-api/benchmarks/seed.py
+"""
+Seeds the database in DATABASE_URL with benchmark data: users, verifiers and
+a large history of verification requests, loaded with COPY.
+
+    python benchmarks/seed.py --users 20000 --verifiers 200 --requests 2000000
+    python benchmarks/seed.py --purge
+
+The data is shaped like production: a few verifiers send most requests
+(Zipf-like), most requests are finished, and creation times spread over the
+last --days days. Every seeded user and verifier shares the password
+BENCH_PASSWORD; verifier API keys are written to --keys-out for micro.py
+and load.py. Seeded rows are recognisable by their `bench-` names, and
+--purge removes them (and everything that references them).
+"""
+import argparse
+import asyncio
+import datetime
+import itertools
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncpg
+
+import security
+import stats
+from database import get_async_connect_args, get_async_database_url
+from models import enum_code
+from schemas import RequestStatus, VerificationResult
+
+BENCH_PASSWORD = "bench-password"
+BENCH_EMAIL_DOMAIN = "bench.example"
+BENCH_COMPANY_PREFIX = "bench-verifier-"
+
+# (status, result, weight), as the codes COPY writes
+OUTCOMES = [
+    (enum_code(RequestStatus.completed), enum_code(VerificationResult.yes), 62),
+    (enum_code(RequestStatus.failed), enum_code(VerificationResult.no), 13),
+    (enum_code(RequestStatus.pending), None, 25),
+]
+POLICIES = ["isOver18", "isOver21", "isResident"]
+
+
+async def connect():
+    return await asyncpg.connect(get_async_database_url().replace("postgresql+asyncpg://", "postgresql://", 1), **get_async_connect_args())
+
+
+async def purge(conn):
+    users = f"SELECT id FROM users WHERE email LIKE '%@{BENCH_EMAIL_DOMAIN}'"
+    verifiers = f"SELECT id FROM verifiers WHERE company_name LIKE '{BENCH_COMPANY_PREFIX}%'"
+    async with conn.transaction():
+        await conn.execute(f"DELETE FROM webhook_outbox WHERE verifier_id IN ({verifiers})")
+        await conn.execute(f"DELETE FROM verification_requests WHERE verifier_id IN ({verifiers}) OR user_id IN ({users})")
+        await conn.execute(f"DELETE FROM credentials WHERE owner_id IN ({users})")
+        await conn.execute(f"DELETE FROM users WHERE id IN ({users})")
+        await conn.execute(f"DELETE FROM verifiers WHERE id IN ({verifiers})")
+    await conn.execute("ANALYZE users, verifiers, verification_requests")
+
+
+async def seed_users(conn, count: int, password_hash: str, now: datetime.datetime):
+    start = await conn.fetchval(f"SELECT count(*) FROM users WHERE email LIKE '%@{BENCH_EMAIL_DOMAIN}'")
+    records = (
+        (f"bench-user-{i}@{BENCH_EMAIL_DOMAIN}", password_hash, f"did:example:bench-user-{i}", now)
+        for i in range(start, start + count)
+    )
+    await conn.copy_records_to_table("users", records=records, columns=["email", "hashed_password", "did", "created_at"])
+    return await conn.fetch(f"SELECT id, email FROM users WHERE email LIKE '%@{BENCH_EMAIL_DOMAIN}' ORDER BY id")
+
+
+async def seed_verifiers(conn, count: int, password_hash: str, now: datetime.datetime):
+    start = await conn.fetchval(f"SELECT count(*) FROM verifiers WHERE company_name LIKE '{BENCH_COMPANY_PREFIX}%'")
+    keys = {}
+    records = []
+    for i in range(start, start + count):
+        name = f"{BENCH_COMPANY_PREFIX}{i}"
+        api_key = security.generate_api_key()
+        keys[name] = api_key
+        # Limits are switched off (0): the benchmarks measure the service, not the limiter.
+        records.append((name, password_hash, security.hash_api_key(api_key), api_key[:security.API_KEY_PREFIX_LENGTH], True, 0.0, 0, now))
+    await conn.copy_records_to_table(
+        "verifiers", records=records,
+        columns=["company_name", "hashed_password", "api_key_hash", "api_key_prefix", "is_active", "rate_limit_per_second", "max_concurrent_requests", "created_at"],
+    )
+    rows = await conn.fetch("SELECT id, company_name FROM verifiers WHERE company_name = ANY($1::text[])", list(keys))
+    return [{"id": row["id"], "company_name": row["company_name"], "api_key": keys[row["company_name"]]} for row in rows]
+
+
+def request_records(count: int, user_ids, verifier_ids, policy_ids, days: int, now: datetime.datetime, rng: random.Random):
+    # Zipf-like: the verifier at rank r gets a share proportional to 1/r.
+    verifier_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(verifier_ids) + 1)))
+    outcome_weights = list(itertools.accumulate(weight for _, _, weight in OUTCOMES))
+    span = days * 86400
+    for _ in range(count):
+        status, result, _ = rng.choices(OUTCOMES, cum_weights=outcome_weights)[0]
+        created_at = now - datetime.timedelta(seconds=rng.random() * span)
+        updated_at = None if status == enum_code(RequestStatus.pending) else created_at + datetime.timedelta(seconds=rng.expovariate(1 / 30))
+        yield (
+            rng.choices(verifier_ids, cum_weights=verifier_weights)[0], rng.choice(user_ids), rng.choice(policy_ids),
+            status, result, created_at, updated_at,
+        )
+
+
+async def seed_requests(conn, count: int, user_ids, verifier_ids, days: int, now, rng, chunk_size: int):
+    await conn.execute("INSERT INTO policies (name) SELECT unnest($1::text[]) ON CONFLICT (name) DO NOTHING", POLICIES)
+    policy_ids = [row["id"] for row in await conn.fetch("SELECT id FROM policies WHERE name = ANY($1::text[]) ORDER BY id", POLICIES)]
+    columns = ["verifier_id", "user_id", "policy_id", "status", "result", "created_at", "updated_at"]
+    records = request_records(count, user_ids, verifier_ids, policy_ids, days, now, rng)
+    loaded = 0
+    started = time.perf_counter()
+    while loaded < count:
+        chunk = [record for _, record in zip(range(chunk_size), records)]
+        await conn.copy_records_to_table("verification_requests", records=chunk, columns=columns)
+        loaded += len(chunk)
+        rate = loaded / (time.perf_counter() - started)
+        print(f"  verification_requests: {loaded:,}/{count:,} ({rate:,.0f} rows/s)", end="\r", flush=True)
+    print()
+
+
+async def main(args):
+    conn = await connect()
+    try:
+        if args.purge:
+            await purge(conn)
+            if os.path.exists(args.keys_out):
+                os.remove(args.keys_out)
+            print("Removed all benchmark rows.")
+            return
+        rng = random.Random(args.seed)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        password_hash = security.get_password_hash(BENCH_PASSWORD)
+
+        users = await seed_users(conn, args.users, password_hash, now)
+        print(f"  users: {len(users):,} benchmark users in total")
+        verifiers = await seed_verifiers(conn, args.verifiers, password_hash, now)
+        print(f"  verifiers: {len(verifiers):,} added")
+        if args.requests:
+            all_verifier_ids = [row["id"] for row in await conn.fetch(
+                f"SELECT id FROM verifiers WHERE company_name LIKE '{BENCH_COMPANY_PREFIX}%' ORDER BY id"
+            )]
+            user_ids = [row["id"] for row in users]
+            await seed_requests(conn, args.requests, user_ids, all_verifier_ids, args.days, now, rng, args.chunk_size)
+        await conn.execute("ANALYZE users, verifiers, verification_requests")
+    finally:
+        await conn.close()
+
+    existing = {"password": BENCH_PASSWORD, "users": [], "verifiers": []}
+    if os.path.exists(args.keys_out):
+        with open(args.keys_out) as f:
+            existing = json.load(f)
+    existing["users"] = [{"id": row["id"], "email": row["email"]} for row in users[:args.keys_users]]
+    existing["verifiers"] = existing.get("verifiers", []) + verifiers
+    with open(args.keys_out, "w") as f:
+        json.dump(existing, f, indent=2)
+    print(f"Credentials for the load driver written to {args.keys_out} (keep it out of version control).")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--verifiers", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=1000000)
+    parser.add_argument("--days", type=int, default=90, help="spread of created_at into the past")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="rows per COPY")
+    parser.add_argument("--seed", type=int, default=1, help="random seed, for repeatable data")
+    parser.add_argument("--keys-out", default=stats.DEFAULT_KEYS_PATH)
+    parser.add_argument("--keys-users", type=int, default=1000, help="users to record for login and request traffic")
+    parser.add_argument("--purge", action="store_true", help="delete all benchmark rows instead of seeding")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,114 @@
+# backend-api/benchmarks/sse_idle_wallets.py
+"""
+Measures database load from many connected-but-idle wallets, comparing the
+Server-Sent Events stream with the old polling pattern.
+
+    uvicorn main:app --port 8000            # in another shell
+    python benchmarks/sse_idle_wallets.py --mode sse  --wallets 10000
+    python benchmarks/sse_idle_wallets.py --mode poll --wallets 10000 --poll-interval 5
+
+Queries are counted on the server side, from pg_stat_statements when that
+extension is installed and from pg_stat_database transaction counts
+otherwise. 10k sockets needs a raised open-file limit (ulimit -n). Wallet
+tokens are minted locally, so run it with the server's SECRET_KEY /
+JWT_SIGNING_KEYS.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from sqlalchemy import text
+
+import security
+from database import engine
+
+
+def wallet_token(user_id: int) -> str:
+    return security.create_access_token({"sub": f"wallet-{user_id}", "type": "user", "uid": user_id})
+
+
+def db_counter():
+    """
+    Returns (label, read_fn) for the best server-side query counter available.
+    """
+    with engine.connect() as conn:
+        try:
+            conn.execute(text("SELECT 1 FROM pg_stat_statements LIMIT 1"))
+            query = "SELECT sum(calls) FROM pg_stat_statements"
+            label = "statements"
+        except Exception:
+            query = "SELECT xact_commit + xact_rollback FROM pg_stat_database WHERE datname = current_database()"
+            label = "transactions"
+
+    def read():
+        with engine.connect() as conn:
+            return int(conn.execute(text(query)).scalar())
+    return label, read
+
+
+async def sse_wallet(client: httpx.AsyncClient, user_id: int, connected: asyncio.Event):
+    async with client.stream("GET", f"/verification/requests/user/{user_id}/events", params={"access_token": wallet_token(user_id)}) as response:
+        response.raise_for_status()
+        connected.set()
+        async for _ in response.aiter_lines():
+            pass
+
+
+async def polling_wallet(client: httpx.AsyncClient, user_id: int, connected: asyncio.Event, interval: float):
+    headers = {"Authorization": f"Bearer {wallet_token(user_id)}"}
+    connected.set()
+    while True:
+        await client.get(f"/verification/requests/user/{user_id}", headers=headers)
+        await asyncio.sleep(interval)
+
+
+async def main(args):
+    with engine.connect() as conn:
+        user_ids = conn.execute(text("SELECT id FROM users ORDER BY id LIMIT :n"), {"n": args.wallets}).scalars().all()
+    if not user_ids:
+        sys.exit("No users found; seed some first (see benchmarks/explain_request_indexes.py).")
+
+    label, read_count = db_counter()
+    limits = httpx.Limits(max_connections=args.wallets, max_keepalive_connections=args.wallets)
+    timeout = httpx.Timeout(None, connect=60)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=timeout) as client:
+        flags, tasks = [], []
+        for i in range(args.wallets):
+            connected = asyncio.Event()
+            user_id = user_ids[i % len(user_ids)]
+            if args.mode == "sse":
+                coro = sse_wallet(client, user_id, connected)
+            else:
+                coro = polling_wallet(client, user_id, connected, args.poll_interval)
+            flags.append(connected)
+            tasks.append(asyncio.create_task(coro))
+        await asyncio.gather(*(flag.wait() for flag in flags))
+        print(f"{args.wallets} wallets connected ({args.mode}); measuring for {args.duration:.0f}s...")
+
+        # Let connection setup settle before measuring the steady state.
+        await asyncio.sleep(2)
+        before, started = read_count(), time.monotonic()
+        await asyncio.sleep(args.duration)
+        after, elapsed = read_count(), time.monotonic() - started
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    per_minute = (after - before) * 60 / elapsed
+    print(f"mode={args.mode} wallets={args.wallets} db_{label}_per_minute={per_minute:.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--mode", choices=["sse", "poll"], default="sse")
+    parser.add_argument("--wallets", type=int, default=10_000)
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--poll-interval", type=float, default=5)
+    asyncio.run(main(parser.parse_args()))
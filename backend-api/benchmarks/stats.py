@@ -0,0 +1,113 @@
+# backend-api/benchmarks/stats.py
+"""
+Latency summaries and baseline files shared by the benchmark scripts.
+
+Both scripts take --save-baseline PATH to record a run and --compare PATH to
+check a run against a saved one; a comparison exits non-zero if any
+benchmark's p95 grew, or its throughput fell, by more than --threshold.
+Baselines only compare runs on the same machine and seeded dataset (each
+records the host it came from), so they are kept locally, not in git.
+"""
+import datetime
+import json
+import os
+import platform
+from typing import Dict, List, Optional
+
+# Where seed.py writes the credentials the other benchmarks log in with.
+DEFAULT_KEYS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "seed_keys.json")
+# Benchmarks faster than this are too noisy to flag on relative change alone.
+MIN_COMPARABLE_MS = 0.05
+
+
+def percentile(sorted_samples: List[float], q: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    rank = q / 100 * (len(sorted_samples) - 1)
+    low = int(rank)
+    high = min(low + 1, len(sorted_samples) - 1)
+    return sorted_samples[low] + (sorted_samples[high] - sorted_samples[low]) * (rank - low)
+
+
+def summarize(samples: List[float], elapsed: Optional[float] = None, errors: int = 0) -> dict:
+    """
+    Latency percentiles (ms) for samples given in seconds, plus throughput
+    when the wall-clock `elapsed` time is known.
+    """
+    ordered = sorted(samples)
+    summary = {
+        "count": len(ordered),
+        "errors": errors,
+        "mean_ms": sum(ordered) / len(ordered) * 1000 if ordered else 0.0,
+        "p50_ms": percentile(ordered, 50) * 1000,
+        "p95_ms": percentile(ordered, 95) * 1000,
+        "p99_ms": percentile(ordered, 99) * 1000,
+    }
+    if elapsed:
+        summary["per_second"] = len(ordered) / elapsed
+    return summary
+
+
+def print_table(results: Dict[str, dict]):
+    print(f"{'benchmark':<48}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'per sec':>10}")
+    for name, s in results.items():
+        per_second = f"{s['per_second']:>10.1f}" if "per_second" in s else f"{'':>10}"
+        print(f"{name:<48}{s['count']:>8}{s['errors']:>8}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}{per_second}")
+
+
+def save_baseline(path: str, results: Dict[str, dict], meta: dict):
+    document = {
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "meta": meta,
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+    print(f"\nBaseline written to {path}")
+
+
+def compare(path: str, results: Dict[str, dict], threshold: float) -> List[str]:
+    """
+    Returns one line per regression against the baseline at `path`.
+    """
+    with open(path) as f:
+        baseline = json.load(f)["results"]
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if max(before["p95_ms"], current["p95_ms"]) >= MIN_COMPARABLE_MS and current["p95_ms"] > before["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {before['p95_ms']:.2f} ms -> {current['p95_ms']:.2f} ms")
+        if "per_second" in before and "per_second" in current and current["per_second"] < before["per_second"] * (1 - threshold):
+            regressions.append(f"{name}: throughput {before['per_second']:.1f}/s -> {current['per_second']:.1f}/s")
+        if current["errors"] > before["errors"]:
+            regressions.append(f"{name}: errors {before['errors']} -> {current['errors']}")
+    return regressions
+
+
+def add_baseline_arguments(parser):
+    parser.add_argument("--save-baseline", metavar="PATH", help="write this run's results to a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare this run with a saved baseline")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed relative slowdown (default 0.15 = 15%%)")
+
+
+def report(args, results: Dict[str, dict], meta: dict) -> int:
+    """
+    Prints the results, then saves and/or compares them as requested.
+    Returns the process exit code.
+    """
+    print_table(results)
+    if args.save_baseline:
+        save_baseline(args.save_baseline, results, meta)
+    if args.compare:
+        regressions = compare(args.compare, results, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.compare}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions against {args.compare} (threshold {args.threshold:.0%}).")
+    return 0
@@ -0,0 +1,67 @@
+# backend-api/benchmarks/token_verify.py
+"""
+Measures the cost of checking a bearer token on each request, with the
+verified-token cache (security.decode_access_token) and without it
+(security.verify_access_token, a full signature and expiry check).
+
+    python benchmarks/token_verify.py --principals 1000 --requests 200000
+
+Requests draw their token Zipf-like from --principals tokens, as in a
+stream of requests where a few principals are busy. Runs in-process; it only
+needs the token key settings (SECRET_KEY or JWT_SIGNING_KEYS), not a database.
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import security
+import stats
+
+
+def workload(args):
+    tokens = [
+        security.create_access_token({"sub": f"bench-user-{i}@bench.example", "type": "user", "uid": i})
+        for i in range(args.principals)
+    ]
+    weights = list(itertools.accumulate(1 / rank for rank in range(1, len(tokens) + 1)))
+    rng = random.Random(args.seed)
+    return rng.choices(tokens, cum_weights=weights, k=args.requests)
+
+
+def run(label: str, verify, requests) -> dict:
+    samples = []
+    for token in requests:
+        started = time.perf_counter()
+        claims = verify(token)
+        samples.append(time.perf_counter() - started)
+        if claims is None:
+            raise RuntimeError("a freshly issued token failed to verify")
+    summary = stats.summarize(samples)
+    print(
+        f"{label:<12}{summary['mean_ms'] * 1000:>14.2f}{summary['p50_ms'] * 1000:>12.2f}{summary['p99_ms'] * 1000:>12.2f}"
+        f"{len(samples) / sum(samples):>14,.0f}"
+    )
+    return summary
+
+
+def main(args):
+    requests = workload(args)
+    print(f"{len(requests):,} requests over {args.principals:,} tokens (HS256)\n")
+    print(f"{'mode':<12}{'mean us/req':>14}{'p50 us':>12}{'p99 us':>12}{'verifies/s':>14}")
+    run("cache off", security.verify_access_token, requests)
+    security.verified_tokens.clear()
+    run("cache on", security.decode_access_token, requests)
+    print(f"\ncache holds {len(security.verified_tokens):,} tokens (VERIFIED_TOKEN_CACHE_SIZE={security.VERIFIED_TOKEN_CACHE_SIZE})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--principals", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=1)
+    main(parser.parse_args())
@@ -0,0 +1,65 @@
+# backend-api/cache.py
+import os
+import time
+from collections import OrderedDict
+
+# Sentinel returned by `TTLCache.get` when nothing usable is cached.
+# (`None` is a valid cached value: it is how negative entries are stored.)
+MISSING = object()
+
+
+class TTLCache:
+    """
+    A small in-process LRU cache whose entries also expire after a TTL.
+    `None` values are negative entries and use their own (shorter) TTL.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, negative_ttl: float = 0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return MISSING
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl: float = None):
+        """
+        Caches `value`; `ttl` overrides the cache's TTL for this entry.
+        """
+        if ttl is None:
+            ttl = self.ttl if value is not None else self.negative_ttl
+        if ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# --- API Key Cache ---
+# Maps the SHA-256 of an API key to the resolved verifier (or None for unknown
+# keys). The TTL bounds how long another worker process can serve a stale
+# entry after a key rotation or deactivation.
+API_KEY_CACHE_SIZE = int(os.getenv("API_KEY_CACHE_SIZE", "10000"))
+API_KEY_CACHE_TTL = float(os.getenv("API_KEY_CACHE_TTL", "60"))
+API_KEY_NEGATIVE_CACHE_TTL = float(os.getenv("API_KEY_NEGATIVE_CACHE_TTL", "10"))
+
+api_key_cache = TTLCache(API_KEY_CACHE_SIZE, API_KEY_CACHE_TTL, API_KEY_NEGATIVE_CACHE_TTL)
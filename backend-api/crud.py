@@ -1,69 +1,208 @@
 # backend-api/crud.py
 
-from sqlalchemy.orm import Session
-import models, schemas, security
+import datetime
+import logging
+from typing import Iterable, List, Optional, Set
+
+from sqlalchemy import Integer, String, and_, column, func, insert, literal, or_, select, tuple_, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+import models, schemas, security, hashing, events
+from pagination import Cursor
+from cache import api_key_cache, MISSING
 import uuid
 
+logger = logging.getLogger("api.crud")
+
+
+class InvalidStatusTransition(Exception):
+    def __init__(self, request_id: int, current: schemas.RequestStatus, requested: schemas.RequestStatus):
+        super().__init__(f"Request {request_id} is already {current} and cannot become {requested}")
+        self.current = current
+        self.requested = requested
+
+
+class RequestLeased(Exception):
+    def __init__(self, request_id: int, lease_expires_at: datetime.datetime):
+        super().__init__(f"Request {request_id} is being verified; resubmit after its lease ends")
+        self.lease_expires_at = lease_expires_at
+
 # === User CRUD Operations ===
 
-def get_user_by_email(db: Session, email: str):
+async def get_user_by_email(db: AsyncSession, email: str):
     """
     Fetches a single user from the database based on their email.
     """
-    return db.query(models.User).filter(models.User.email == email).first()
+    result = await db.execute(select(models.User).filter(models.User.email == email))
+    return result.scalars().first()
 
-def create_user(db: Session, user: schemas.UserCreate):
+async def create_user(db: AsyncSession, user: schemas.UserCreate):
     """
     Creates a new user in the database with a hashed password.
     """
-    hashed_password = security.get_password_hash(user.password)
+    hashed_password = await hashing.hash_password(user.password)
     # For now, we are not creating a DID, it can be added later.
     db_user = models.User(email=user.email, hashed_password=hashed_password, did=f"did:example:{uuid.uuid4()}")
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user, attribute_names=["verification_requests"])
     return db_user
 
 
 # === Verifier CRUD Operations ===
 
-def get_verifier_by_company_name(db: Session, company_name: str):
+async def get_verifier_by_company_name(db: AsyncSession, company_name: str):
     """
     Fetches a single verifier from the database based on their company name.
     """
-    return db.query(models.Verifier).filter(models.Verifier.company_name == company_name).first()
+    result = await db.execute(select(models.Verifier).filter(models.Verifier.company_name == company_name))
+    return result.scalars().first()
 
 
-def create_verifier(db: Session, verifier: schemas.VerifierCreate):
-    api_key = str(uuid.uuid4())
+async def create_verifier(db: AsyncSession, verifier: schemas.VerifierCreate):
+    api_key = security.generate_api_key()
     # Hash the password provided during sign-up
-    hashed_password = security.get_password_hash(verifier.password) 
+    hashed_password = await hashing.hash_password(verifier.password)
     db_verifier = models.Verifier(
         company_name=verifier.company_name,
         hashed_password=hashed_password, # Store the hashed password
-        api_key=api_key
+        api_key_hash=security.hash_api_key(api_key),
+        api_key_prefix=api_key[:security.API_KEY_PREFIX_LENGTH]
     )
     db.add(db_verifier)
-    db.commit()
-    db.refresh(db_verifier)
+    await db.commit()
+    await db.refresh(db_verifier)
+    # The plain key is handed back exactly once and is never stored.
+    db_verifier.api_key = api_key
+    return db_verifier
+
+
+async def get_verifier_by_api_key(db: AsyncSession, api_key: str):
+    """
+    Resolves an API key to a slim verifier principal. Results (including
+    unknown keys) are cached by key hash, so most calls skip the database.
+    Only the primary's answers are cached: a lagging replica can still show
+    a rotated key or a deactivated verifier, and write routes share the cache.
+    """
+    key_hash = security.hash_api_key(api_key)
+    cached = api_key_cache.get(key_hash)
+    if cached is not MISSING:
+        return cached
+    result = await db.execute(select(models.Verifier).filter(models.Verifier.api_key_hash == key_hash))
+    db_verifier = result.scalars().first()
+    principal = schemas.VerifierPrincipal.model_validate(db_verifier) if db_verifier else None
+    if not db.info.get("replica"):
+        api_key_cache.set(key_hash, principal)
+    return principal
+
+
+def _principal_cache_key(verifier_id: int):
+    return ("verifier", verifier_id)
+
+
+def _invalidate_verifier(db_verifier: models.Verifier, api_key_hash: str):
+    api_key_cache.invalidate(api_key_hash)
+    api_key_cache.invalidate(_principal_cache_key(db_verifier.id))
+
+
+async def get_verifier_principal(db: AsyncSession, verifier_id: int):
+    """
+    The same slim principal for a verifier's bearer token, cached by ID in
+    the API key cache (and so just as fresh). As above, only the primary's
+    answers are cached.
+    """
+    cache_key = _principal_cache_key(verifier_id)
+    cached = api_key_cache.get(cache_key)
+    if cached is not MISSING:
+        return cached
+    db_verifier = await db.get(models.Verifier, verifier_id)
+    principal = schemas.VerifierPrincipal.model_validate(db_verifier) if db_verifier else None
+    if principal is not None and not db.info.get("replica"):
+        api_key_cache.set(cache_key, principal)
+    return principal
+
+
+async def rotate_verifier_api_key(db: AsyncSession, db_verifier: models.Verifier):
+    """
+    Replaces a verifier's API key. The old key stops working immediately in
+    this process (and within the cache TTL everywhere else).
+    """
+    old_key_hash = db_verifier.api_key_hash
+    api_key = security.generate_api_key()
+    db_verifier.api_key_hash = security.hash_api_key(api_key)
+    db_verifier.api_key_prefix = api_key[:security.API_KEY_PREFIX_LENGTH]
+    await db.commit()
+    _invalidate_verifier(db_verifier, old_key_hash)
+    db_verifier.api_key = api_key
+    return db_verifier
+
+
+async def set_verifier_active(db: AsyncSession, verifier_id: int, is_active: bool):
+    """
+    Activates or deactivates a verifier and drops its cached principal (by
+    API key and by ID), so this process sees the change at once.
+    """
+    db_verifier = await db.get(models.Verifier, verifier_id)
+    if not db_verifier:
+        return None
+    db_verifier.is_active = is_active
+    await db.commit()
+    _invalidate_verifier(db_verifier, db_verifier.api_key_hash)
     return db_verifier
 
 
 # === Verification Request CRUD Operations ===
 
-def create_verification_request(db: Session, verifier_id: int, user_id: int, policy: str):
+# Listings are serialized with their user and verifier, so both many-to-one
+# relationships are joined into the same SELECT (one query per page, however
+# many rows it holds).
+_WITH_RELATIONS = (
+    joinedload(models.VerificationRequest.user),
+    joinedload(models.VerificationRequest.verifier),
+)
+
+# Policy name -> id. The policies table is tiny and only ever grows, so it is
+# cached for the life of the process and reloaded when a name is missing.
+_policy_ids = {}
+
+async def get_policy_ids(db: AsyncSession, names: Iterable[str]) -> dict:
+    """
+    Maps the known policy names among `names` to their ids.
+    """
+    names = set(names)
+    if not names <= _policy_ids.keys():
+        result = await db.execute(select(models.Policy.name, models.Policy.id))
+        _policy_ids.update(result.tuples().all())
+    return {name: _policy_ids[name] for name in names if name in _policy_ids}
+
+async def get_policy_id(db: AsyncSession, name: str) -> Optional[int]:
+    return (await get_policy_ids(db, [name])).get(name)
+
+async def create_verification_request(db: AsyncSession, verifier_id: int, user_id: int, policy: str):
     """
     Creates a new verification request in the database with a 'pending' status.
+    Returns None if the policy is unknown.
     """
+    policy_id = await get_policy_id(db, policy)
+    if policy_id is None:
+        return None
     db_request = models.VerificationRequest(
         verifier_id=verifier_id,
         user_id=user_id,
-        policy_to_check=policy,
-        status="pending"
+        policy_id=policy_id,
+        status=schemas.RequestStatus.pending
     )
     db.add(db_request)
-    db.commit()
-    db.refresh(db_request)
+    await db.commit()
+    # Reload with user and verifier (one joined SELECT) so the change event
+    # carries everything a wallet needs to render the request.
+    result = await db.execute(
+        select(models.VerificationRequest).options(*_WITH_RELATIONS)
+        .filter(models.VerificationRequest.id == db_request.id)
+        .execution_options(populate_existing=True)
+    )
+    db_request = result.scalars().one()
+    await events.broker.publish(db, [events.request_event("created", db_request, schemas.VerificationRequestWithRelations)])
     return db_request
 
 
@@ -73,22 +212,82 @@ def create_verification_request(db: Session, verifier_id: int, user_id: int, pol
 
 
 
-def get_requests_for_user(db: Session, user_id: int):
+async def get_existing_user_ids(db: AsyncSession, user_ids: Iterable[int]) -> Set[int]:
     """
-    Fetches all pending verification requests for a specific user.
+    Returns the subset of `user_ids` that exist, in a single query.
     """
-    return db.query(models.VerificationRequest).filter(
+    result = await db.execute(select(models.User.id).filter(models.User.id.in_(set(user_ids))))
+    return set(result.scalars().all())
+
+async def create_verification_requests_batch(db: AsyncSession, verifier_id: int, items: List[schemas.VerificationRequestCreate]):
+    """
+    Creates many 'pending' verification requests in one transaction with a
+    multi-row INSERT ... RETURNING. Items for unknown users or policies are
+    skipped. Returns a list aligned with `items`: the new request, or None
+    if the user or policy does not exist.
+    """
+    known_user_ids = await get_existing_user_ids(db, (item.user_id for item in items))
+    policy_ids = await get_policy_ids(db, (item.policy for item in items))
+    accepted = [item.user_id in known_user_ids and item.policy in policy_ids for item in items]
+    rows = [
+        {"verifier_id": verifier_id, "user_id": item.user_id, "policy_id": policy_ids[item.policy], "status": schemas.RequestStatus.pending}
+        for item, ok in zip(items, accepted) if ok
+    ]
+    created = []
+    if rows:
+        result = await db.scalars(
+            insert(models.VerificationRequest).returning(models.VerificationRequest, sort_by_parameter_order=True),
+            rows,
+        )
+        created = result.all()
+        await db.commit()
+        result = await db.execute(
+            select(models.VerificationRequest).options(*_WITH_RELATIONS)
+            .filter(models.VerificationRequest.id.in_([db_request.id for db_request in created]))
+            .execution_options(populate_existing=True)
+        )
+        await events.broker.publish(db, [
+            events.request_event("created", db_request, schemas.VerificationRequestWithRelations)
+            for db_request in result.scalars().all()
+        ])
+    created_iter = iter(created)
+    return [next(created_iter) if ok else None for ok in accepted]
+
+def _keyset(query, limit: Optional[int], after: Optional[Cursor]):
+    """
+    Orders a request query newest first and applies an optional keyset
+    window. Without a limit every matching row is returned.
+    """
+    query = query.order_by(
+        models.VerificationRequest.created_at.desc(),
+        models.VerificationRequest.id.desc()
+    )
+    if after is not None:
+        query = query.filter(
+            tuple_(models.VerificationRequest.created_at, models.VerificationRequest.id) < tuple_(*after)
+        )
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+async def get_requests_for_user(db: AsyncSession, user_id: int, limit: Optional[int] = None, after: Optional[Cursor] = None):
+    """
+    Fetches pending verification requests for a specific user, newest first.
+    """
+    query = select(models.VerificationRequest).options(*_WITH_RELATIONS).filter(
         models.VerificationRequest.user_id == user_id,
-        models.VerificationRequest.status == 'pending'
-    ).all()
+        models.VerificationRequest.status == schemas.RequestStatus.pending
+    )
+    result = await db.execute(_keyset(query, limit, after))
+    return result.scalars().all()
 
-def get_requests_by_verifier(db: Session, verifier_id: int):
+async def get_requests_by_verifier(db: AsyncSession, verifier_id: int, limit: Optional[int] = None, after: Optional[Cursor] = None):
     """
-    Fetches all verification requests initiated by a specific verifier.
+    Fetches verification requests initiated by a specific verifier, newest first.
     """
-    return db.query(models.VerificationRequest).order_by(
-        models.VerificationRequest.created_at.desc()
-    ).filter(models.VerificationRequest.verifier_id == verifier_id).all()
+    query = select(models.VerificationRequest).options(*_WITH_RELATIONS).filter(models.VerificationRequest.verifier_id == verifier_id)
+    result = await db.execute(_keyset(query, limit, after))
+    return result.scalars().all()
 
 
 
@@ -97,24 +296,224 @@ def get_requests_by_verifier(db: Session, verifier_id: int):
 
 
 
-def update_verification_request(db: Session, request_id: int, status: str, result: str, etherscan_url: str):
+def verifier_export_query(
+    verifier_id: int,
+    created_from: Optional[datetime.datetime] = None,
+    created_to: Optional[datetime.datetime] = None,
+    status: Optional[schemas.RequestStatus] = None,
+):
+    """
+    Builds the column-level query behind a verifier's audit export, oldest
+    first. Plain rows instead of ORM objects keep the stream cheap.
+    """
+    query = select(
+        models.VerificationRequest.id,
+        models.VerificationRequest.user_id,
+        models.User.email.label("user_email"),
+        models.VerificationRequest.policy_to_check,
+        models.VerificationRequest.status,
+        models.VerificationRequest.result,
+        models.VerificationRequest.etherscan_url,
+        models.VerificationRequest.created_at,
+        models.VerificationRequest.updated_at,
+    ).join(models.User, models.User.id == models.VerificationRequest.user_id).filter(
+        models.VerificationRequest.verifier_id == verifier_id
+    )
+    if created_from is not None:
+        query = query.filter(models.VerificationRequest.created_at >= created_from)
+    if created_to is not None:
+        query = query.filter(models.VerificationRequest.created_at < created_to)
+    if status is not None:
+        query = query.filter(models.VerificationRequest.status == status)
+    return query.order_by(models.VerificationRequest.created_at, models.VerificationRequest.id)
+
+
+
+
+
+
+
+
+# === Webhook Outbox ===
+
+WEBHOOK_EVENT_TYPE = "verification_request.updated"
+
+async def enqueue_webhook_events(db: AsyncSession, requests):
+    """
+    Adds an outbox row for each changed request whose verifier has a webhook
+    configured. Runs inside the caller's transaction (one INSERT ... SELECT),
+    so an event exists if and only if the change was committed.
+    """
+    if not requests:
+        return
+    incoming = values(
+        column("verifier_id", Integer), column("request_id", Integer), column("payload", String),
+        name="incoming",
+    ).data([
+        (request.verifier_id, request.id, schemas.VerificationRequest.model_validate(request).model_dump_json())
+        for request in requests
+    ])
+    await db.execute(
+        insert(models.WebhookOutbox).from_select(
+            ["verifier_id", "request_id", "event_type", "payload"],
+            select(incoming.c.verifier_id, incoming.c.request_id, literal(WEBHOOK_EVENT_TYPE), incoming.c.payload)
+            .join(models.Verifier, models.Verifier.id == incoming.c.verifier_id)
+            .filter(models.Verifier.webhook_url.isnot(None))
+        )
+    )
+
+
+async def set_verifier_webhook(db: AsyncSession, verifier_id: int, webhook_url: Optional[str]):
+    """
+    Sets (or clears) a verifier's webhook URL. A new signing secret is
+    generated whenever a URL is set.
+    """
+    db_verifier = await db.get(models.Verifier, verifier_id)
+    db_verifier.webhook_url = webhook_url
+    db_verifier.webhook_secret = security.generate_api_key() if webhook_url else None
+    await db.commit()
+    return db_verifier
+
+
+def _is_allowed(current, current_result, status, result) -> bool:
+    """
+    A pending request may move to a final status; repeating the outcome a
+    request already has (a retried callback) is allowed and changes nothing.
+    """
+    if status == current:
+        return status not in schemas.FINAL_STATUSES or result == current_result
+    return status in schemas.ALLOWED_TRANSITIONS.get(current, ())
+
+
+async def update_verification_request(
+    db: AsyncSession, request_id: int, status: schemas.RequestStatus,
+    result: Optional[schemas.VerificationResult], etherscan_url: Optional[str],
+):
     """
     Finds a verification request by its ID and updates its status, result,
-    and etherscan_url.
+    and etherscan_url. Raises InvalidStatusTransition for a change that
+    ALLOWED_TRANSITIONS doesn't permit.
     """
-    db_request = db.query(models.VerificationRequest).filter(models.VerificationRequest.id == request_id).first()
+    # Locked so two concurrent callbacks can't both see the request pending.
+    db_request = await get_verification_request_for_update(db, request_id)
     if not db_request:
-        # In a real app, you might want to raise an exception here.
-        # For now, we'll just log it if it happens.
-        print(f"Error: Could not find request ID {request_id} to update.")
+        logger.warning("Status update for unknown verification request %s", request_id)
         return None
+    if not _is_allowed(db_request.status, db_request.result, status, result):
+        raise InvalidStatusTransition(request_id, db_request.status, status)
     
+    before = (db_request.status, db_request.result, db_request.etherscan_url)
     db_request.status = status
     db_request.result = result
     # Only update the URL if one is provided
     if etherscan_url:
         db_request.etherscan_url = etherscan_url
     
-    db.commit()
-    db.refresh(db_request)
-    return db_request
\ No newline at end of file
+    await db.flush()
+    await db.refresh(db_request)
+    if (db_request.status, db_request.result, db_request.etherscan_url) != before:
+        await enqueue_webhook_events(db, [db_request])
+    await db.commit()
+    await events.broker.publish(db, [events.request_event("updated", db_request)])
+    return db_request
+
+
+async def get_anchored_request(db: AsyncSession, request_id: int):
+    """
+    Fetches a request together with its anchor (if any).
+    """
+    result = await db.execute(
+        select(models.VerificationRequest).options(joinedload(models.VerificationRequest.anchor))
+        .filter(models.VerificationRequest.id == request_id)
+    )
+    return result.scalars().first()
+
+
+async def get_verification_request_for_update(db: AsyncSession, request_id: int):
+    """
+    The request, row-locked until the transaction ends (and so serialized with
+    the dispatcher's claims, which skip locked rows). None if it doesn't exist.
+    """
+    result = await db.execute(
+        select(models.VerificationRequest).filter(models.VerificationRequest.id == request_id).with_for_update()
+    )
+    return result.scalars().first()
+
+
+async def submit_proof(db: AsyncSession, db_request: models.VerificationRequest, proof: schemas.ProofSubmission):
+    """
+    Stores a wallet's proof on a pending request (locked with
+    get_verification_request_for_update) and queues it for the dispatcher.
+    Resubmitting replaces the proof and restarts the attempts. Raises
+    RequestLeased while a dispatcher holds the request: its result would be
+    for the old proof, and clearing the lease would let a second worker claim it.
+    """
+    lease = db_request.lease_expires_at
+    if lease is not None and lease > datetime.datetime.now(datetime.timezone.utc):
+        await db.rollback()
+        raise RequestLeased(db_request.id, lease)
+    db_request.proof = proof.model_dump_json()
+    db_request.lease_expires_at = None
+    db_request.dispatch_attempts = 0
+    await db.commit()
+    return db_request
+
+
+async def update_verification_requests_batch(db: AsyncSession, updates: List[schemas.VerificationStatusUpdate]):
+    """
+    Applies many status callbacks in one transaction with a single
+    UPDATE ... FROM (VALUES ...). Rows that already hold the submitted values
+    are left alone, so retried callbacks don't bump updated_at or rewrite
+    the row, and final rows never take a different outcome (see
+    ALLOWED_TRANSITIONS). Returns (updated_ids, unchanged_ids, rejected_ids,
+    missing_ids).
+    """
+    # If an ID appears twice, the last update wins.
+    latest = {item.id: item for item in updates}
+    table = models.VerificationRequest.__table__
+    incoming = values(
+        column("id", Integer), column("status", table.c.status.type), column("result", table.c.result.type),
+        column("etherscan_url", String),
+        name="incoming",
+    ).data([(item.id, item.status, item.result, item.etherscan_url) for item in latest.values()])
+    pending = schemas.RequestStatus.pending
+    # Mirrors _is_allowed: pending -> final, or the same outcome again (which
+    # only writes if the URL changed).
+    allowed = or_(
+        and_(table.c.status == pending, incoming.c.status.in_(sorted(schemas.ALLOWED_TRANSITIONS[pending]))),
+        and_(
+            table.c.status == incoming.c.status,
+            or_(table.c.status == pending, table.c.result.is_not_distinct_from(incoming.c.result)),
+        ),
+    )
+    # As with single updates, a missing URL keeps the one already stored.
+    new_url = func.coalesce(incoming.c.etherscan_url, table.c.etherscan_url)
+
+    result = await db.execute(
+        update(table)
+        .where(table.c.id == incoming.c.id)
+        .where(allowed)
+        .where(or_(
+            table.c.status.is_distinct_from(incoming.c.status),
+            table.c.result.is_distinct_from(incoming.c.result),
+            table.c.etherscan_url.is_distinct_from(new_url),
+        ))
+        .values(status=incoming.c.status, result=incoming.c.result, etherscan_url=new_url, updated_at=func.now())
+        .returning(*table.c, models.VerificationRequest.policy_to_check.label("policy_to_check"))
+    )
+    updated_rows = result.all()
+    updated_ids = {row.id for row in updated_rows}
+
+    not_updated = set(latest) - updated_ids
+    unchanged_ids, rejected_ids = set(), set()
+    if not_updated:
+        result = await db.execute(select(table.c.id, table.c.status, table.c.result).filter(table.c.id.in_(not_updated)))
+        for row in result:
+            item = latest[row.id]
+            allowed_here = _is_allowed(row.status, row.result, item.status, item.result)
+            (unchanged_ids if allowed_here else rejected_ids).add(row.id)
+    await enqueue_webhook_events(db, updated_rows)
+    await db.commit()
+    await events.broker.publish(db, [events.request_event("updated", row) for row in updated_rows])
+    missing_ids = not_updated - unchanged_ids - rejected_ids
+    return sorted(updated_ids), sorted(unchanged_ids), sorted(rejected_ids), sorted(missing_ids)
\ No newline at end of file
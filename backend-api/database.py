@@ -1,6 +1,9 @@
 
+import functools
 import os
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
@@ -8,12 +11,138 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Checked when the first engine is created rather than at import, so tools
+# and tests can import the app without a database configured.
 DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise ValueError("DATABASE_URL environment variable is not set!")
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# --- Connection Pool Settings ---
+# All of these can be tuned per deployment from the environment.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+
+# libpq query options that asyncpg.connect() doesn't take as keywords (as
+# in Neon's URLs). sslmode becomes asyncpg's `ssl` argument; asyncpg has no
+# channel binding, so that one is dropped.
+_LIBPQ_ONLY_OPTIONS = ("sslmode", "channel_binding")
+
+
+def _to_async_url(url: str) -> str:
+    """
+    Turns a sync Postgres URL (psycopg2) into one that uses the asyncpg
+    driver, minus the libpq-only options (see `_async_connect_args`).
+    """
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            url = "postgresql+asyncpg://" + url[len(prefix):]
+            break
+    return make_url(url).difference_update_query(_LIBPQ_ONLY_OPTIONS).render_as_string(hide_password=False)
+
+
+def _async_connect_args(url: str) -> dict:
+    """
+    asyncpg connect() arguments for the options `_to_async_url` strips.
+    """
+    sslmode = make_url(url).query.get("sslmode")
+    return {"ssl": sslmode} if sslmode else {}
+
+
+def _require_database_url() -> str:
+    if not DATABASE_URL:
+        raise ValueError("DATABASE_URL environment variable is not set!")
+    return DATABASE_URL
+
+
+def get_async_database_url() -> str:
+    return _to_async_url(os.getenv("ASYNC_DATABASE_URL") or _require_database_url())
+
+
+def get_async_connect_args() -> dict:
+    """
+    Pass these along with `get_async_database_url()`, to SQLAlchemy as
+    connect_args or to asyncpg.connect() directly.
+    """
+    return _async_connect_args(os.getenv("ASYNC_DATABASE_URL") or _require_database_url())
+
+
+# --- Read Replica Settings ---
+# Comma-separated URLs of read replicas for the read-only routes (see
+# replicas.py). Empty means every query goes to the primary.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+
+
+pool_options = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+}
+
+# Engines are built on first use. Neither opens a connection until asked to.
+@functools.lru_cache(maxsize=None)
+def get_engine():
+    """
+    The sync engine, kept for Alembic and offline scripts.
+    """
+    return create_engine(_require_database_url(), **pool_options)
+
+
+@functools.lru_cache(maxsize=None)
+def get_async_engine():
+    """
+    The async engine that serves all the API routes.
+    """
+    return create_async_engine(get_async_database_url(), connect_args=get_async_connect_args(), **pool_options)
+
+
+@functools.lru_cache(maxsize=None)
+def get_replica_engines():
+    """
+    One async engine per replica in DATABASE_REPLICA_URLS, each with its own pool.
+    """
+    return tuple(
+        create_async_engine(_to_async_url(url), connect_args=_async_connect_args(url), **pool_options)
+        for url in DATABASE_REPLICA_URLS
+    )
+
+
+def make_async_sessionmaker(engine):
+    return async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+@functools.lru_cache(maxsize=None)
+def _sync_sessionmaker():
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+
+
+@functools.lru_cache(maxsize=None)
+def _async_sessionmaker():
+    return make_async_sessionmaker(get_async_engine())
+
+
+def SessionLocal(**kwargs):
+    return _sync_sessionmaker()(**kwargs)
+
+
+def AsyncSessionLocal(**kwargs):
+    return _async_sessionmaker()(**kwargs)
+
+
+def __getattr__(name):
+    # `engine`, `async_engine` and `ASYNC_DATABASE_URL` used to be built at
+    # import time; they are still importable, but now resolve on first access.
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine()
+    if name == "ASYNC_DATABASE_URL":
+        return get_async_database_url()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 Base = declarative_base()
 
 
@@ -24,4 +153,8 @@ def get_db():
         yield db
     finally:
         db.close()
-        
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,188 @@
+# backend-api/dispatcher.py
+"""
+Sends proofs submitted through POST /verification/request/{id}/proof to the
+verifier service and records the outcome. Run it next to the API (any number
+of copies):
+
+    python dispatcher.py
+
+Each worker claims a batch of pending requests with FOR UPDATE SKIP LOCKED
+and a time-limited lease, so workers never pick up the same request while
+its lease is live. If a worker dies, its requests become claimable again
+once the lease runs out.
+"""
+import asyncio
+import json
+import logging
+import os
+from typing import List, Optional, Tuple
+
+import httpx
+import prometheus_client
+from sqlalchemy import func, literal_column, or_, select, update
+
+import crud
+import events
+import models
+import proof_cache
+import schemas
+from database import AsyncSessionLocal
+
+logger = logging.getLogger("dispatcher")
+
+# --- Dispatcher Settings ---
+VERIFIER_SVC_URL = os.getenv("VERIFIER_SVC_URL", "http://localhost:8081")
+DISPATCH_POLL_INTERVAL = float(os.getenv("DISPATCH_POLL_INTERVAL", "1.0"))
+# Requests claimed per round, and how many proofs are in flight at once.
+DISPATCH_CLAIM_SIZE = int(os.getenv("DISPATCH_CLAIM_SIZE", "64"))
+DISPATCH_CONCURRENCY = int(os.getenv("DISPATCH_CONCURRENCY", "16"))
+DISPATCH_TIMEOUT = float(os.getenv("DISPATCH_TIMEOUT", "30"))
+# Must comfortably exceed the time to verify a whole claimed batch.
+DISPATCH_LEASE_SECONDS = float(os.getenv("DISPATCH_LEASE_SECONDS", "120"))
+# After a transient error the request is retried in RETRY_DELAY * attempts
+# seconds; after MAX_ATTEMPTS claims it is marked failed.
+DISPATCH_RETRY_DELAY = float(os.getenv("DISPATCH_RETRY_DELAY", "10"))
+DISPATCH_MAX_ATTEMPTS = int(os.getenv("DISPATCH_MAX_ATTEMPTS", "5"))
+# Serves this worker's Prometheus metrics (proof cache outcomes) on
+# http://<host>:<port>/metrics. 0 turns it off.
+DISPATCH_METRICS_PORT = int(os.getenv("DISPATCH_METRICS_PORT", "9101"))
+
+
+def _seconds(expr):
+    return expr * literal_column("interval '1 second'")
+
+
+class VerificationDispatcher:
+    """
+    Claims requests with a proof waiting, verifies them against verifier-svc
+    over a pooled keep-alive client, and writes the results back in one bulk
+    update per batch (which also queues webhooks and wallet events).
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal, client: Optional[httpx.AsyncClient] = None):
+        self.session_factory = session_factory
+        self.client = client or httpx.AsyncClient(
+            base_url=VERIFIER_SVC_URL,
+            timeout=DISPATCH_TIMEOUT,
+            limits=httpx.Limits(max_connections=DISPATCH_CONCURRENCY, max_keepalive_connections=DISPATCH_CONCURRENCY),
+        )
+        self._slots = asyncio.Semaphore(DISPATCH_CONCURRENCY)
+        self.cache = proof_cache.ProofCache(session_factory)
+
+    async def claim(self) -> List:
+        table = models.VerificationRequest
+        due = (
+            select(table.id)
+            .filter(
+                table.status == schemas.RequestStatus.pending,
+                table.proof.isnot(None),
+                or_(table.lease_expires_at.is_(None), table.lease_expires_at <= func.now()),
+            )
+            .order_by(table.lease_expires_at.asc().nulls_first())
+            .limit(DISPATCH_CLAIM_SIZE)
+            .with_for_update(skip_locked=True)
+        )
+        async with self.session_factory() as db:
+            result = await db.execute(
+                update(table)
+                .where(table.id.in_(due.scalar_subquery()))
+                .values(
+                    lease_expires_at=func.now() + _seconds(DISPATCH_LEASE_SECONDS),
+                    dispatch_attempts=table.dispatch_attempts + 1,
+                )
+                .returning(table.id, table.proof, table.dispatch_attempts)
+            )
+            rows = result.all()
+            await db.commit()
+        return rows
+
+    async def _verify_remote(self, body: bytes) -> bool:
+        async with self._slots:
+            response = await self.client.post("/verify", content=body, headers={"Content-Type": "application/json"})
+        if response.status_code == 200:
+            return bool(response.json().get("isValid"))
+        if response.status_code == 400:
+            # Malformed proof; retrying won't help.
+            return False
+        raise httpx.HTTPStatusError(f"Unexpected HTTP {response.status_code}", request=response.request, response=response)
+
+    async def verify(self, row) -> Optional[schemas.VerificationStatusUpdate]:
+        """
+        Returns the final status for the request, or None if it should be
+        retried later.
+        """
+        if row.dispatch_attempts > DISPATCH_MAX_ATTEMPTS:
+            return schemas.VerificationStatusUpdate(id=row.id, status=schemas.RequestStatus.failed)
+        submission = json.loads(row.proof)
+        body = row.proof.encode()
+        try:
+            is_valid = await self.cache.verify(
+                submission["proof"], submission["publicSignals"], lambda: self._verify_remote(body)
+            )
+        except httpx.HTTPError as exc:
+            logger.warning("Verifying request %s failed: %s: %s", row.id, type(exc).__name__, exc)
+            return None
+        return schemas.VerificationStatusUpdate(
+            id=row.id,
+            status=schemas.RequestStatus.completed if is_valid else schemas.RequestStatus.failed,
+            result=schemas.VerificationResult.yes if is_valid else schemas.VerificationResult.no,
+        )
+
+    async def _release(self, rows: List):
+        """
+        Shortens the lease on requests that hit a transient error so they are
+        retried after a backoff instead of waiting out the full lease.
+        """
+        table = models.VerificationRequest
+        async with self.session_factory() as db:
+            await db.execute(
+                update(table).where(table.id.in_([row.id for row in rows]))
+                .values(lease_expires_at=func.now() + _seconds(DISPATCH_RETRY_DELAY * table.dispatch_attempts))
+            )
+            await db.commit()
+
+    async def run_once(self) -> Tuple[int, int]:
+        """
+        Claims, verifies and records one batch. Returns (claimed, finished).
+        """
+        rows = await self.claim()
+        if not rows:
+            return 0, 0
+        outcomes = await asyncio.gather(*(self.verify(row) for row in rows))
+        finished = [outcome for outcome in outcomes if outcome is not None]
+        retry = [row for row, outcome in zip(rows, outcomes) if outcome is None]
+        if finished:
+            async with self.session_factory() as db:
+                await crud.update_verification_requests_batch(db, finished)
+        if retry:
+            await self._release(retry)
+        logger.info(
+            "Claimed %d requests, finished %d; proof cache %s", len(rows), len(finished), dict(self.cache.stats)
+        )
+        return len(rows), len(finished)
+
+    async def run_forever(self, stop: Optional[asyncio.Event] = None):
+        stop = stop or asyncio.Event()
+        try:
+            while not stop.is_set():
+                try:
+                    claimed, _ = await self.run_once()
+                except Exception:
+                    logger.exception("Dispatching verification requests failed")
+                    claimed = 0
+                if claimed < DISPATCH_CLAIM_SIZE:
+                    try:
+                        await asyncio.wait_for(stop.wait(), timeout=DISPATCH_POLL_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            await self.client.aclose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if events.EVENT_BACKEND == "memory":
+        logger.warning("EVENT_BACKEND=memory: results from this process won't reach the API's event streams; use postgres")
+    if DISPATCH_METRICS_PORT:
+        prometheus_client.start_http_server(DISPATCH_METRICS_PORT)
+    asyncio.run(VerificationDispatcher().run_forever())
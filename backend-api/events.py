@@ -0,0 +1,329 @@
+# backend-api/events.py
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict, defaultdict, deque
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+import schemas
+
+logger = logging.getLogger("api.events")
+
+# --- Event Settings ---
+# "memory" only reaches subscribers in the same process; "postgres" fans
+# events out to every API process through LISTEN/NOTIFY.
+EVENT_BACKEND = os.getenv("EVENT_BACKEND", "memory")
+EVENT_CHANNEL = os.getenv("EVENT_CHANNEL", "verification_events")
+# Recent events kept per user so a reconnecting client can resume from its
+# Last-Event-ID without touching the database.
+EVENT_REPLAY_SIZE = int(os.getenv("EVENT_REPLAY_SIZE", "100"))
+EVENT_REPLAY_USERS = int(os.getenv("EVENT_REPLAY_USERS", "10000"))
+# A subscriber that falls this far behind is disconnected (it will reconnect
+# and resume) rather than letting its queue grow without bound.
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("SUBSCRIBER_QUEUE_SIZE", "256"))
+# Comment lines sent on idle streams so proxies don't time them out.
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+# Backoff between attempts to re-open a lost LISTEN connection (postgres backend).
+EVENT_RECONNECT_MIN_SECONDS = float(os.getenv("EVENT_RECONNECT_MIN_SECONDS", "0.5"))
+EVENT_RECONNECT_MAX_SECONDS = float(os.getenv("EVENT_RECONNECT_MAX_SECONDS", "30"))
+# Serializes publishing (pg_advisory_xact_lock key), so event IDs are handed
+# out in the order the events are delivered.
+EVENT_PUBLISH_LOCK_KEY = int(os.getenv("EVENT_PUBLISH_LOCK_KEY", "7201"))
+
+EVENT_ID_DIGITS = 20
+
+
+def event_id(sequence: int) -> str:
+    """
+    Event IDs are numbers assigned as events are published, zero-padded so
+    they sort as plain strings; any process can tell which events a client
+    has missed. They are not derived from row timestamps: now() is the
+    start of a transaction, so a change that commits late would get an ID
+    below ones its subscribers had already seen, and be skipped.
+    """
+    return f"{sequence:0{EVENT_ID_DIGITS}d}"
+
+
+def is_event_id(value: str) -> bool:
+    return len(value) == EVENT_ID_DIGITS and value.isdigit()
+
+
+def request_event(event_type: str, request, schema=schemas.VerificationRequest) -> dict:
+    """
+    An event for a changed request; the broker sets its ID when publishing.
+    """
+    return {
+        "id": None,
+        "type": event_type,
+        "user_id": request.user_id,
+        "data": schema.model_validate(request).model_dump(mode="json"),
+    }
+
+
+class InProcessBroker:
+    """
+    Delivers events to subscribers in this process, keyed by user ID.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[int, set] = defaultdict(set)
+        self._replay: "OrderedDict[int, deque]" = OrderedDict()
+        self._last_sequence = 0
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        for queues in self._subscribers.values():
+            for queue in queues:
+                queue.put_nowait(None)
+
+    async def publish(self, db: AsyncSession, events: List[dict]):
+        """
+        Call after the change has been committed. IDs count up from the
+        clock in microseconds, so they stay above the last run's after a
+        restart.
+        """
+        for event in events:
+            self._last_sequence = max(self._last_sequence + 1, time.time_ns() // 1000)
+            event["id"] = event_id(self._last_sequence)
+            self._dispatch(event)
+
+    def _dispatch(self, event: dict):
+        user_id = event["user_id"]
+        history = self._replay.get(user_id)
+        if history is None:
+            history = self._replay[user_id] = deque(maxlen=EVENT_REPLAY_SIZE)
+            while len(self._replay) > EVENT_REPLAY_USERS:
+                self._replay.popitem(last=False)
+        self._replay.move_to_end(user_id)
+        history.append(event)
+        for queue in list(self._subscribers.get(user_id, ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Too slow: drop it, its stream ends and the client resumes.
+                self._subscribers[user_id].discard(queue)
+                queue.get_nowait()
+                queue.put_nowait(None)
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers[user_id].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue):
+        queues = self._subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def replay(self, user_id: int, last_event_id: str) -> Optional[List[dict]]:
+        """
+        Returns the events after `last_event_id`, or None if this process
+        can't prove it still holds all of them (the caller then resyncs).
+        """
+        history = self._replay.get(user_id)
+        if not history or history[0]["id"] > last_event_id:
+            return None
+        return [event for event in history if event["id"] > last_event_id]
+
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def status(self) -> dict:
+        return {"backend": "memory", "listening": True}
+
+    def _resync_all(self):
+        """
+        Ends every stream and forgets the replay buffers, so clients
+        reconnect and get a snapshot instead of silently missing events.
+        """
+        self._replay.clear()
+        for user_id, queues in list(self._subscribers.items()):
+            for queue in list(queues):
+                if queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+            del self._subscribers[user_id]
+
+
+class PostgresBroker(InProcessBroker):
+    """
+    Publishes with pg_notify and keeps one LISTEN connection per process,
+    which feeds the local subscribers. Idle subscribers cost no queries.
+
+    If the LISTEN connection drops, it is re-opened in the background with
+    exponential backoff. Notifications sent in the gap are lost, so every
+    open stream is ended on reconnect and its client resyncs.
+    """
+
+    def __init__(self, dsn: str, connect_args: Optional[dict] = None):
+        super().__init__()
+        self.dsn = dsn
+        self.connect_args = connect_args or {}
+        self._listener = None
+        self._lost = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.reconnects = 0
+        self.last_error: Optional[str] = None
+
+    async def start(self):
+        # The first attempt runs now, so a healthy start is listening before
+        # the first request; after that the loop keeps it open.
+        await self._connect()
+        self._task = asyncio.create_task(self._keep_listening())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await super().stop()
+        await self._close()
+
+    async def _connect(self) -> bool:
+        import asyncpg
+        self._lost.clear()
+        listener = None
+        try:
+            listener = await asyncpg.connect(self.dsn, **self.connect_args)
+            listener.add_termination_listener(self._on_terminated)
+            await listener.add_listener(EVENT_CHANNEL, self._on_notify)
+        except Exception as exc:
+            if listener is not None:
+                listener.terminate()
+            self.last_error = f"{type(exc).__name__}: {exc}"
+            logger.warning("Could not LISTEN on %s: %s", EVENT_CHANNEL, self.last_error)
+            self._lost.set()
+            return False
+        self._listener = listener
+        self.last_error = None
+        return True
+
+    async def _close(self):
+        listener, self._listener = self._listener, None
+        if listener is not None and not listener.is_closed():
+            await listener.close()
+
+    def _on_terminated(self, connection):
+        if connection is self._listener:
+            self._lost.set()
+
+    async def _keep_listening(self):
+        delay = EVENT_RECONNECT_MIN_SECONDS
+        while True:
+            await self._lost.wait()
+            if self._listener is not None:
+                logger.warning("Lost the LISTEN connection on %s; reconnecting", EVENT_CHANNEL)
+                await self._close()
+                self._resync_all()
+            await asyncio.sleep(delay)
+            if await self._connect():
+                self.reconnects += 1
+                self._resync_all()
+                delay = EVENT_RECONNECT_MIN_SECONDS
+            else:
+                delay = min(delay * 2, EVENT_RECONNECT_MAX_SECONDS)
+
+    def status(self) -> dict:
+        return {
+            "backend": "postgres",
+            "listening": self._listener is not None and not self._listener.is_closed(),
+            "reconnects": self.reconnects,
+            "error": self.last_error,
+        }
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self._dispatch(json.loads(payload))
+
+    async def publish(self, db: AsyncSession, events: List[dict]):
+        """
+        Takes IDs from verification_event_seq and notifies in one short
+        transaction. Publishers hold a transaction lock until they commit,
+        and notifications are delivered in commit order, so every listener
+        sees IDs in increasing order.
+        """
+        if not events:
+            return
+        await db.execute(select(func.pg_advisory_xact_lock(EVENT_PUBLISH_LOCK_KEY)))
+        sequences = sorted((await db.execute(
+            select(models.verification_event_seq.next_value()).select_from(func.generate_series(1, len(events)))
+        )).scalars())
+        for event, sequence in zip(events, sequences):
+            event["id"] = event_id(sequence)
+        payloads = func.unnest(array([json.dumps(event, separators=(",", ":")) for event in events])).table_valued("payload")
+        await db.execute(select(func.pg_notify(EVENT_CHANNEL, payloads.c.payload)))
+        await db.commit()
+
+
+def _create_broker():
+    if EVENT_BACKEND == "postgres":
+        from database import get_async_connect_args, get_async_database_url
+        return PostgresBroker(get_async_database_url().replace("postgresql+asyncpg://", "postgresql://", 1), get_async_connect_args())
+    return InProcessBroker()
+
+
+broker = _create_broker()
+
+
+
+def format_sse(event: dict) -> str:
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+async def sse_stream(
+    user_id: int,
+    last_event_id: Optional[str],
+    snapshot: Callable[[], Awaitable[List[dict]]],
+    is_disconnected: Callable[[], Awaitable[bool]],
+):
+    """
+    Yields a user's change events as Server-Sent Events. A reconnecting
+    client gets what it missed from the replay buffer, or a full "snapshot"
+    event if the buffer can't cover the gap.
+    """
+    queue = broker.subscribe(user_id)
+    try:
+        yield "retry: 3000\n\n"
+        # IDs from before event_id's current format can't be compared.
+        if last_event_id and not is_event_id(last_event_id):
+            yield f"event: snapshot\ndata: {json.dumps(await snapshot())}\n\n"
+            last_event_id = None
+        sent = last_event_id or ""
+        if last_event_id:
+            missed = broker.replay(user_id, last_event_id)
+            if missed is None:
+                yield f"event: snapshot\ndata: {json.dumps(await snapshot())}\n\n"
+            else:
+                for event in missed:
+                    yield format_sse(event)
+                    sent = max(sent, event["id"])
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    break
+                yield ": heartbeat\n\n"
+                continue
+            if event is None:
+                break
+            # Subscribing before replaying can deliver an event twice.
+            if event["id"] <= sent:
+                continue
+            sent = event["id"]
+            yield format_sse(event)
+    finally:
+        broker.unsubscribe(user_id, queue)
\ No newline at end of file
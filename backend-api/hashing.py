@@ -0,0 +1,65 @@
+# backend-api/hashing.py
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+import security
+
+# --- Hashing Service Settings ---
+# bcrypt is deliberately slow, so it runs in a small pool of worker processes
+# instead of the request threadpool. Jobs beyond the queue limit are rejected
+# straight away so a login burst can't back up every other endpoint.
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 2)))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", "64"))
+
+_executor: Optional[ProcessPoolExecutor] = None
+_outstanding = 0
+
+
+class HashingServiceBusy(Exception):
+    """
+    Raised when the hashing queue is full. The API turns this into a 503.
+    """
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=HASH_WORKERS)
+    return _executor
+
+
+async def _submit(fn, *args):
+    global _outstanding
+    if _outstanding >= HASH_WORKERS + HASH_QUEUE_LIMIT:
+        raise HashingServiceBusy()
+    _outstanding += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), fn, *args)
+    finally:
+        _outstanding -= 1
+
+
+async def hash_password(password: str) -> str:
+    return await _submit(security.get_password_hash, password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await _submit(security.verify_password, plain_password, hashed_password)
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifies a password and, if the stored hash is stale (e.g. a lower cost
+    factor than BCRYPT_ROUNDS), also returns a fresh hash to store.
+    """
+    return await _submit(security.verify_and_update_password, plain_password, hashed_password)
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,125 @@
+# backend-api/issuer.py
+import base64
+import datetime
+import json
+import time
+from typing import List, Optional
+
+from jose import jwk
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+import schemas
+import security
+import status_list
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+class CredentialSigner:
+    """
+    Signs credential claims as compact JWS (standard JWTs). The key is parsed
+    and the JOSE header encoded once, so each signature is just the payload
+    encoding plus the raw signing operation.
+    """
+
+    def __init__(self, issuer_did: str, key: str, algorithm: str, key_id: str):
+        self.issuer_did = issuer_did
+        self.algorithm = algorithm
+        self.kid = f"{issuer_did}#{key_id}"
+        self._key = jwk.construct(key, algorithm)
+        self._header = _b64(json.dumps({"alg": algorithm, "kid": self.kid, "typ": "JWT"}, separators=(",", ":")).encode())
+
+    def sign(self, claims: dict) -> str:
+        payload = _b64(json.dumps(claims, separators=(",", ":")).encode())
+        signing_input = f"{self._header}.{payload}"
+        return f"{signing_input}.{_b64(self._key.sign(signing_input.encode()))}"
+
+    def issue(self, user_id: int, claim_data: dict, issued_at: Optional[float] = None, status_index: Optional[int] = None) -> schemas.VerifiableCredential:
+        claims = {
+            "sub": user_id,
+            "iss": self.issuer_did,
+            "iat": issued_at if issued_at is not None else datetime.datetime.utcnow().timestamp(),
+            "claim": claim_data,
+        }
+        if status_index is not None:
+            claims["credentialStatus"] = {
+                "type": "BitstringStatusListEntry",
+                "statusPurpose": "revocation",
+                "statusListIndex": str(status_index),
+                "statusListCredential": status_list.STATUS_LIST_URL,
+            }
+        return schemas.VerifiableCredential(
+            issuer_did=self.issuer_did, subject_id=user_id, claim_data=claim_data,
+            signature=self.sign(claims), status_list_index=status_index,
+        )
+
+
+_signer: Optional[CredentialSigner] = None
+
+def get_signer() -> CredentialSigner:
+    """
+    The process-wide signer, built on first use.
+    """
+    global _signer
+    if _signer is None:
+        _signer = CredentialSigner(
+            security.ISSUER_DID, security.get_issuer_signing_key(), security.ISSUER_ALGORITHM, security.ISSUER_KEY_ID
+        )
+    return _signer
+
+
+def claim_data_for(request: schemas.CredentialIssueRequest) -> dict:
+    return {"birthYear": request.birth_year, "country": "USA"}
+
+
+def sign_batch(requests: List[schemas.CredentialIssueRequest], first_status_index: int) -> List[schemas.VerifiableCredential]:
+    """
+    Signs one credential per request, all with the same issuance time and
+    consecutive status list indices from `first_status_index`.
+    CPU-bound: call it from a worker thread for large batches.
+    """
+    signer = get_signer()
+    issued_at = datetime.datetime.utcnow().timestamp()
+    return [
+        signer.issue(request.user_id, claim_data_for(request), issued_at, first_status_index + offset)
+        for offset, request in enumerate(requests)
+    ]
+
+
+async def store_credentials(db: AsyncSession, credentials: List[schemas.VerifiableCredential]) -> List[int]:
+    """
+    Bulk-inserts issued credentials with one multi-row INSERT and returns
+    their IDs in the same order.
+    """
+    if not credentials:
+        return []
+    result = await db.execute(
+        insert(models.Credential).returning(models.Credential.id, sort_by_parameter_order=True),
+        [
+            {"owner_id": vc.subject_id, "issuer_did": vc.issuer_did, "vc_data_json": vc.model_dump_json(), "status_list_index": vc.status_list_index}
+            for vc in credentials
+        ],
+    )
+    ids = list(result.scalars().all())
+    await db.commit()
+    return ids
+
+
+class Throughput:
+    """
+    Times an issuance run, for the throughput figures in batch responses.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+
+    def report(self, count: int) -> dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "elapsed_ms": round(elapsed * 1000, 2),
+            "credentials_per_second": round(count / elapsed, 1) if elapsed > 0 else None,
+        }
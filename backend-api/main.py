@@ -1,26 +1,69 @@
 import os
 import datetime
-from typing import List, Optional
+import json
+import logging
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from typing import List, Optional, Union
 
-from fastapi import FastAPI, Depends, HTTPException, Header
+from fastapi import FastAPI, Depends, HTTPException, Header, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 
-# Import all our local modules
+# Import all our local modules (readiness first: it notes the process start time)
+import readiness
 import models
 import schemas
 import crud
 import security
-from database import get_db
+import hashing
+import metrics
+import pagination
+import ratelimit
+import replicas
+import exports
+import events
+import anchoring
+import archival
+import issuer
+import status_list
+import webhooks
+from database import DB_MAX_OVERFLOW, DB_POOL_SIZE, AsyncSessionLocal, get_async_db, get_async_engine
+
+logger = logging.getLogger("api")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the token and credential signing keys now, so a bad key configuration stops startup.
+    security.get_signing_keys()
+    issuer.get_signer()
+    try:
+        metrics.instrument_engine(get_async_engine(), DB_POOL_SIZE + DB_MAX_OVERFLOW)
+    except ValueError as exc:
+        logger.error("%s The API will report unready.", exc)
+    await events.broker.start()
+    await replicas.router.start()
+    # Failures leave the instance unready (see /ready) rather than crashing it.
+    await readiness.prewarm()
+    yield
+    await replicas.router.stop()
+    await events.broker.stop()
+    hashing.shutdown()
 
 app = FastAPI(
     title="ZK-KYC Engine API",
     description="A service to manage users, verifiers, and Zero-Knowledge KYC requests.",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan,
 )
 
+# Added first so it sits inside CORS: a shed request still gets CORS headers.
+app.add_middleware(ratelimit.LoadSheddingMiddleware, exempt={"/health", "/ready", "/metrics"})
+
 # === CORS Middleware Configuration ===
 origins = [
     "http://localhost",
@@ -34,108 +77,437 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-DB-Queries", "X-DB-Time-Ms", "Server-Timing", "X-DB-Route"],
 )
+app.add_middleware(replicas.ReadYourWritesMiddleware)
+app.add_middleware(metrics.MetricsMiddleware, router=app.router, on_response=readiness.record_request)
 
-# === Authentication Dependency ===
-def get_verifier_from_api_key(api_key: str = Header(None), db: Session = Depends(get_db)):
-    if api_key is None: raise HTTPException(status_code=401, detail="API Key header is missing")
-    verifier = db.query(models.Verifier).filter(models.Verifier.api_key == api_key).first()
-    if not verifier or not verifier.is_active: raise HTTPException(status_code=401, detail="Invalid API Key or Verifier is inactive")
-    return verifier
+@app.exception_handler(hashing.HashingServiceBusy)
+async def hashing_busy_handler(request, exc):
+    return JSONResponse(status_code=503, content={"detail": "Server is busy, please retry shortly"}, headers={"Retry-After": "1"})
+
+# === Authentication Dependencies ===
+# Bearer tokens from /users/token and /verifiers/token. The `type` claim keeps
+# a user's token from being accepted as a verifier's and vice versa.
+user_token = OAuth2PasswordBearer(tokenUrl="users/token")
+optional_user_token = OAuth2PasswordBearer(tokenUrl="users/token", auto_error=False)
+verifier_token = OAuth2PasswordBearer(tokenUrl="verifiers/token")
+optional_verifier_token = OAuth2PasswordBearer(tokenUrl="verifiers/token", auto_error=False)
+
+def token_claims(token: Optional[str], principal_type: str) -> dict:
+    # Signatures are checked once per token and then cached (see security.decode_access_token).
+    claims = security.decode_access_token(token) if token else None
+    if not claims or claims.get("type") != principal_type or not claims.get("sub"):
+        raise HTTPException(status_code=401, detail="Invalid or expired token", headers={"WWW-Authenticate": "Bearer"})
+    return claims
+
+# Async so they run on the event loop: the verified-token cache isn't thread-safe.
+async def get_user_claims(token: str = Depends(user_token)):
+    return token_claims(token, "user")
+
+# EventSource can't set headers, so the event stream also takes ?access_token=.
+async def get_user_claims_for_stream(token: Optional[str] = Depends(optional_user_token), access_token: Optional[str] = None):
+    return token_claims(token or access_token, "user")
+
+def authorize_user(claims: dict, user_id: int):
+    if claims.get("uid") != user_id: raise HTTPException(status_code=403, detail="Token was not issued to this user")
+
+@asynccontextmanager
+async def authenticate_verifier(api_key: Optional[str], token: Optional[str], db: AsyncSession):
+    if api_key is None and token is None: raise HTTPException(status_code=401, detail="API Key header is missing")
+    # Verified before any DB work: a bad token costs no connection.
+    claims = token_claims(token, "verifier") if api_key is None else None
+
+    # The principal usually comes from the cache; the session only opens a connection on a miss.
+    if claims is not None:
+        verifier = await crud.get_verifier_principal(db, claims["vid"]) if "vid" in claims else None
+        if not verifier or not verifier.is_active: raise HTTPException(status_code=401, detail="Invalid token or Verifier is inactive", headers={"WWW-Authenticate": "Bearer"})
+    else:
+        verifier = await crud.get_verifier_by_api_key(db, api_key=api_key)
+        if not verifier or not verifier.is_active: raise HTTPException(status_code=401, detail="Invalid API Key or Verifier is inactive")
+    try:
+        slot = await ratelimit.admit(verifier)
+    except ratelimit.RateLimited as exc:
+        raise HTTPException(status_code=429, detail=exc.detail, headers={"Retry-After": str(exc.retry_after)})
+    try:
+        # Only admitted calls check out a connection; its wait feeds the shedder.
+        ratelimit.shedder.record(await metrics.acquire_connection(db))
+        yield verifier
+    finally:
+        if slot is not None:
+            await ratelimit.release(verifier, slot)
+
+# Verifier routes take an `api-key` header or a verifier's bearer token.
+async def get_verifier_from_api_key(api_key: str = Header(None), token: Optional[str] = Depends(optional_verifier_token), db: AsyncSession = Depends(get_async_db)):
+    async with authenticate_verifier(api_key, token, db) as verifier:
+        yield verifier
+
+# The same check on the read session, so read-only routes use one connection (often a replica's).
+async def get_verifier_for_reads(api_key: str = Header(None), token: Optional[str] = Depends(optional_verifier_token), db: AsyncSession = Depends(replicas.get_read_db)):
+    async with authenticate_verifier(api_key, token, db) as verifier:
+        yield verifier
 
 # =================================================================
 # === API ROUTES ==================================================
 # =================================================================
 
 @app.get("/health", tags=["System"])
-def health_check():
+async def health_check():
+    """Liveness: the process is up. It deliberately doesn't touch the database; see /ready."""
     return {"status": "ok"}
 
+@app.get("/ready", tags=["System"])
+async def readiness_check():
+    """Readiness: the database answers and startup prewarming has finished. 503 until then."""
+    report = await readiness.report()
+    return JSONResponse(status_code=200 if report["status"] == "ready" else 503, content=report)
+
+@app.get("/metrics", tags=["System"], include_in_schema=False)
+def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
 # === User Endpoints ===
 @app.post("/users/", response_model=schemas.User, tags=["Users"], status_code=201)
-def create_user_endpoint(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_email(db, email=user.email)
+async def create_user_endpoint(request: Request, user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await crud.get_user_by_email(db, email=user.email)
     if db_user: raise HTTPException(status_code=400, detail="Email already registered")
-    return crud.create_user(db=db, user=user)
-
-@app.post("/users/token", response_model=schemas.Token, tags=["Users"])
-def login_user_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = crud.get_user_by_email(db, email=form_data.username)
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
-        raise HTTPException(status_code=401, detail="Incorrect email or password")
-    access_token = security.create_access_token(data={"sub": user.email, "type": "user"})
-    return {"access_token": access_token, "token_type": "bearer"}
-
-@app.get("/users/by-email/", response_model=schemas.User, tags=["Users"])
-def get_user_by_email_endpoint(email: str, db: Session = Depends(get_db)):
-    user = crud.get_user_by_email(db, email=email)
+    db_user = await crud.create_user(db=db, user=user)
+    replicas.pin_account(request, replicas.user_account(db_user.id))
+    return db_user
+
+@app.post("/users/token", response_model=schemas.UserToken, response_model_exclude_none=True, tags=["Users"])
+async def login_user_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), profile: bool = False, db: AsyncSession = Depends(get_async_db)):
+    """Logs a user in. With `profile=true` the response also carries the user's profile, saving a lookup."""
+    user = await crud.get_user_by_email(db, email=form_data.username)
+    if not user: raise HTTPException(status_code=401, detail="Incorrect email or password")
+    verified, new_hash = await hashing.verify_and_update_password(form_data.password, user.hashed_password)
+    if not verified: raise HTTPException(status_code=401, detail="Incorrect email or password")
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+    access_token = security.create_access_token(data={"sub": user.email, "type": "user", "uid": user.id})
+    return {"access_token": access_token, "token_type": "bearer", "user": user if profile else None}
+
+@app.get("/users/me", response_model=schemas.UserProfile, tags=["Users"])
+async def get_current_user_endpoint(claims: dict = Depends(get_user_claims), db: AsyncSession = Depends(replicas.get_read_db)):
+    """The user the bearer token was issued to."""
+    user = await crud.get_user_by_email(db, email=claims["sub"])
+    if not user: raise HTTPException(status_code=401, detail="Invalid or expired token", headers={"WWW-Authenticate": "Bearer"})
+    return user
+
+@app.get("/users/by-email/", response_model=schemas.UserProfile, tags=["Users"])
+async def get_user_by_email_endpoint(email: str, db: AsyncSession = Depends(replicas.get_read_db)):
+    user = await crud.get_user_by_email(db, email=email)
     if not user: raise HTTPException(status_code=404, detail="User with that email not found")
     return user
 
 # === Verifier Endpoints ===
-@app.post("/verifiers/", response_model=schemas.Verifier, tags=["Verifiers"], status_code=201)
-def create_verifier_endpoint(verifier: schemas.VerifierCreate, db: Session = Depends(get_db)):
-    db_verifier = crud.get_verifier_by_company_name(db, company_name=verifier.company_name)
+@app.post("/verifiers/", response_model=schemas.VerifierWithApiKey, tags=["Verifiers"], status_code=201)
+async def create_verifier_endpoint(request: Request, verifier: schemas.VerifierCreate, db: AsyncSession = Depends(get_async_db)):
+    db_verifier = await crud.get_verifier_by_company_name(db, company_name=verifier.company_name)
     if db_verifier: raise HTTPException(status_code=400, detail="Company name already registered")
-    return crud.create_verifier(db=db, verifier=verifier)
+    db_verifier = await crud.create_verifier(db=db, verifier=verifier)
+    replicas.pin_account(request, replicas.verifier_account(db_verifier.id))
+    return db_verifier
+
+@app.post("/verifiers/token", response_model=schemas.VerifierToken, response_model_exclude_none=True, tags=["Verifiers"])
+async def login_verifier_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), profile: bool = False, db: AsyncSession = Depends(get_async_db)):
+    """Logs a verifier in. With `profile=true` the response also carries the verifier's profile, saving a lookup."""
+    verifier = await crud.get_verifier_by_company_name(db, company_name=form_data.username)
+    if not verifier: raise HTTPException(status_code=401, detail="Incorrect company name or password")
+    verified, new_hash = await hashing.verify_and_update_password(form_data.password, verifier.hashed_password)
+    if not verified: raise HTTPException(status_code=401, detail="Incorrect company name or password")
+    if new_hash:
+        verifier.hashed_password = new_hash
+        await db.commit()
+    access_token = security.create_access_token(data={"sub": verifier.company_name, "type": "verifier", "vid": verifier.id})
+    return {"access_token": access_token, "token_type": "bearer", "verifier": verifier if profile else None}
 
-@app.post("/verifiers/token", response_model=schemas.Token, tags=["Verifiers"])
-def login_verifier_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    verifier = crud.get_verifier_by_company_name(db, company_name=form_data.username)
-    if not verifier or not security.verify_password(form_data.password, verifier.hashed_password):
+@app.get("/verifiers/me", response_model=schemas.VerifierProfile, tags=["Verifiers"])
+async def get_current_verifier_endpoint(token: str = Depends(verifier_token), db: AsyncSession = Depends(replicas.get_read_db)):
+    """The verifier the bearer token was issued to."""
+    verifier = await crud.get_verifier_by_company_name(db, company_name=token_claims(token, "verifier")["sub"])
+    if not verifier: raise HTTPException(status_code=401, detail="Invalid or expired token", headers={"WWW-Authenticate": "Bearer"})
+    return verifier
+
+@app.post("/verifiers/api-key/rotate", response_model=schemas.VerifierWithApiKey, tags=["Verifiers"])
+async def rotate_verifier_api_key_endpoint(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    """Issues a new API key for a verifier. The old key stops working."""
+    verifier = await crud.get_verifier_by_company_name(db, company_name=form_data.username)
+    if not verifier or not await hashing.verify_password(form_data.password, verifier.hashed_password):
         raise HTTPException(status_code=401, detail="Incorrect company name or password")
-    access_token = security.create_access_token(data={"sub": verifier.company_name, "type": "verifier"})
-    return {"access_token": access_token, "token_type": "bearer"}
+    replicas.pin_account(request, replicas.verifier_account(verifier.id))
+    return await crud.rotate_verifier_api_key(db=db, db_verifier=verifier)
+
+@app.put("/verifiers/webhook", response_model=schemas.WebhookSettings, tags=["Verifiers"])
+async def set_verifier_webhook_endpoint(config: schemas.WebhookConfig, db: AsyncSession = Depends(get_async_db), verifier: schemas.VerifierPrincipal = Depends(get_verifier_from_api_key)):
+    """Sets where request status changes are pushed. Returns a fresh signing secret for the deliveries. Private and loopback hosts are refused."""
+    if config.url:
+        try:
+            await webhooks.check_destination(str(config.url))
+        except webhooks.DestinationRejected as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+    return await crud.set_verifier_webhook(db=db, verifier_id=verifier.id, webhook_url=str(config.url) if config.url else None)
 
-@app.get("/verifiers/by-name/", response_model=schemas.Verifier, tags=["Verifiers"])
-def get_verifier_by_name_endpoint(name: str, db: Session = Depends(get_db)):
-    verifier = crud.get_verifier_by_company_name(db, company_name=name)
+@app.get("/verifiers/by-name/", response_model=schemas.VerifierProfile, tags=["Verifiers"])
+async def get_verifier_by_name_endpoint(name: str, db: AsyncSession = Depends(replicas.get_read_db)):
+    verifier = await crud.get_verifier_by_company_name(db, company_name=name)
     if not verifier: raise HTTPException(status_code=404, detail="Verifier with that name not found")
     return verifier
 
 # === Issuer Endpoint ===
-@app.post("/issuer/issue-credential", response_model=schemas.VerifiableCredential, tags=["Issuer"])
-def issue_credential(request: schemas.CredentialIssueRequest, db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.id == request.user_id).first()
+async def require_issuer_admin(issuer_admin_key: Optional[str] = Header(None)):
+    if issuer_admin_key is None: raise HTTPException(status_code=401, detail="issuer-admin-key header is missing")
+    if not security.is_issuer_admin_key(issuer_admin_key): raise HTTPException(status_code=403, detail="Invalid issuer admin key")
+
+@app.post("/issuer/issue-credential", response_model=schemas.VerifiableCredential, tags=["Issuer"], dependencies=[Depends(require_issuer_admin)])
+async def issue_credential(request: schemas.CredentialIssueRequest, http_request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Issues and stores a signed credential for one user. Needs the issuer-admin-key header."""
+    user = await db.get(models.User, request.user_id)
     if not user: raise HTTPException(status_code=404, detail="User not found")
-    claim_data_to_encode = { "sub": user.id, "iss": security.ISSUER_DID, "iat": datetime.datetime.utcnow().timestamp(), "claim": { "birthYear": request.birth_year, "country": "USA" } }
-    signature = jwt.encode(claim_data_to_encode, security.JWT_SECRET_KEY, algorithm=security.ALGORITHM)
-    return schemas.VerifiableCredential(issuer_did=security.ISSUER_DID, subject_id=user.id, claim_data={"birthYear": request.birth_year, "country": "USA"}, signature=signature)
+    replicas.pin_account(http_request, replicas.user_account(user.id))
+    signer = issuer.get_signer()
+    status_index = await status_list.allocate_indices(db, signer.issuer_did, 1)
+    credential = signer.issue(user.id, issuer.claim_data_for(request), status_index=status_index)
+    await issuer.store_credentials(db, [credential])
+    return credential
+
+@app.post("/issuer/issue-credentials/batch", response_model=schemas.CredentialIssueBatchResult, tags=["Issuer"], dependencies=[Depends(require_issuer_admin)])
+async def issue_credentials_batch(request: Request, batch: schemas.CredentialIssueBatch, db: AsyncSession = Depends(get_async_db)):
+    """Issues and stores credentials for many users in one call. Unknown users are reported per item. Needs the issuer-admin-key header."""
+    timer = issuer.Throughput()
+    known_user_ids = await crud.get_existing_user_ids(db, (item.user_id for item in batch.items))
+    for user_id in known_user_ids:
+        replicas.pin_account(request, replicas.user_account(user_id))
+    to_issue = [item for item in batch.items if item.user_id in known_user_ids]
+    first_index = await status_list.allocate_indices(db, issuer.get_signer().issuer_did, len(to_issue)) if to_issue else 0
+    credentials = await run_in_threadpool(issuer.sign_batch, to_issue, first_index)
+    credential_ids = await issuer.store_credentials(db, credentials)
+    issued = iter(zip(credential_ids, credentials))
+    results = []
+    for index, item in enumerate(batch.items):
+        if item.user_id in known_user_ids:
+            credential_id, credential = next(issued)
+            results.append({"index": index, "user_id": item.user_id, "credential_id": credential_id, "credential": credential})
+        else:
+            results.append({"index": index, "user_id": item.user_id, "error": f"User with ID {item.user_id} not found"})
+    report = timer.report(len(credentials))
+    logger.info("Issued %d credentials in %.1f ms (%s/s)", len(credentials), report["elapsed_ms"], report["credentials_per_second"])
+    return {"issued": len(credentials), "failed": len(batch.items) - len(credentials), "results": results, **report}
+
+@app.post("/issuer/credentials/{credential_id}/revoke", tags=["Issuer"], dependencies=[Depends(require_issuer_admin)])
+async def revoke_credential(credential_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Revokes a credential by setting its bit in the issuer's status list. Safe to repeat. Needs the issuer-admin-key header."""
+    revoked = await status_list.revoke(db, credential_id)
+    if revoked is None: raise HTTPException(status_code=404, detail="Credential not found")
+    issuer_did, index = revoked
+    return {"credential_id": credential_id, "issuer_did": issuer_did, "status_list_index": index, "revoked": True}
+
+@app.put("/admin/verifiers/{verifier_id}/active", response_model=schemas.VerifierProfile, tags=["Verifiers"], dependencies=[Depends(require_issuer_admin)])
+async def set_verifier_active_endpoint(request: Request, verifier_id: int, body: schemas.VerifierActive, db: AsyncSession = Depends(get_async_db)):
+    """Suspends or reinstates a verifier; a suspended verifier's API key and tokens are refused. Needs the issuer-admin-key header."""
+    verifier = await crud.set_verifier_active(db, verifier_id=verifier_id, is_active=body.is_active)
+    if verifier is None: raise HTTPException(status_code=404, detail="Verifier not found")
+    replicas.pin_account(request, replicas.verifier_account(verifier.id))
+    return verifier
+
+@app.get("/issuer/status-list", tags=["Issuer"])
+async def get_status_list(request: Request, issuer_did: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
+    """
+    The issuer's revocation bitstring, GZIP-compressed. Bit N (most significant
+    bit first) is set if the credential with status_list_index N is revoked.
+    Send If-None-Match with the last ETag to skip unchanged downloads.
+    """
+    issuer_did = issuer_did or security.ISSUER_DID
+    known = request.headers.get("if-none-match", "").strip('"').rpartition("-v")[2]
+    listed = await status_list.get_compressed(db, issuer_did, known_version=int(known) if known.isdigit() else None)
+    if listed is None: raise HTTPException(status_code=404, detail="No status list for that issuer")
+    version, blob = listed
+    headers = {"ETag": f'"status-list-v{version}"', "Cache-Control": f"public, max-age={status_list.STATUS_LIST_MAX_AGE}"}
+    if blob is None:
+        return Response(status_code=304, headers=headers)
+    return Response(content=blob, media_type="application/octet-stream", headers=headers)
 
 # === Verification Flow Endpoints ===
 @app.post("/verification/request", response_model=schemas.VerificationRequest, tags=["Verification"])
-def request_verification(request_data: schemas.VerificationRequestCreate, db: Session = Depends(get_db), verifier: models.Verifier = Depends(get_verifier_from_api_key)):
-    user = db.query(models.User).filter(models.User.id == request_data.user_id).first()
+async def request_verification(request_data: schemas.VerificationRequestCreate, db: AsyncSession = Depends(get_async_db), verifier: schemas.VerifierPrincipal = Depends(get_verifier_from_api_key)):
+    user = await db.get(models.User, request_data.user_id)
     if not user: raise HTTPException(status_code=404, detail=f"User with ID {request_data.user_id} not found")
-    return crud.create_verification_request(db=db, verifier_id=verifier.id, user_id=request_data.user_id, policy=request_data.policy)
+    db_request = await crud.create_verification_request(db=db, verifier_id=verifier.id, user_id=request_data.user_id, policy=request_data.policy)
+    if db_request is None: raise HTTPException(status_code=422, detail=f"Unknown policy '{request_data.policy}'")
+    return db_request
 
 # --- NEW ENDPOINTS FOR DAY 19 ---
 
-@app.get("/verification/requests/user/{user_id}", response_model=List[schemas.VerificationRequestWithRelations], tags=["Verification"])
-def get_user_verification_requests(user_id: int, db: Session = Depends(get_db)):
-    """An endpoint for a user's wallet to fetch their pending KYC requests."""
-    # In a real app, this should be protected by user authentication (e.g., a JWT token)
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+@app.post("/verification/requests/batch", response_model=schemas.VerificationRequestBatchResult, tags=["Verification"])
+async def request_verification_batch(batch: schemas.VerificationRequestBatchCreate, db: AsyncSession = Depends(get_async_db), verifier: schemas.VerifierPrincipal = Depends(get_verifier_from_api_key)):
+    """Creates many verification requests at once. Unknown users and policies are reported per item, the rest are still created."""
+    created = await crud.create_verification_requests_batch(db=db, verifier_id=verifier.id, items=batch.items)
+    # Served from crud's policy cache, which the batch insert just filled.
+    known_policies = await crud.get_policy_ids(db, (item.policy for item in batch.items))
+    results = [
+        {"index": index, "user_id": item.user_id, "request": db_request}
+        if db_request is not None else
+        {"index": index, "user_id": item.user_id, "error": f"Unknown policy '{item.policy}'"}
+        if item.policy not in known_policies else
+        {"index": index, "user_id": item.user_id, "error": f"User with ID {item.user_id} not found"}
+        for index, (item, db_request) in enumerate(zip(batch.items, created))
+    ]
+    failed = sum(1 for db_request in created if db_request is None)
+    return {"created": len(created) - failed, "failed": failed, "results": results}
+
+# Both listings are keyset-paginated. Pass `paginate=false` to get the old
+# unpaginated list shape (every matching row in one response).
+def get_page_params(
+    limit: int = Query(pagination.DEFAULT_PAGE_SIZE, ge=1, le=pagination.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    paginate: bool = True,
+):
+    after = None
+    if cursor:
+        try: after = pagination.decode_cursor(cursor)
+        except ValueError: raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"limit": limit, "after": after, "paginate": paginate}
+
+@app.get("/verification/requests/user/{user_id}", response_model=Union[schemas.VerificationRequestPage, List[schemas.VerificationRequestWithRelations]], tags=["Verification"])
+async def get_user_verification_requests(user_id: int, page: dict = Depends(get_page_params), claims: dict = Depends(get_user_claims), db: AsyncSession = Depends(replicas.get_read_db)):
+    """An endpoint for a user's wallet to fetch their pending KYC requests. Needs the user's bearer token."""
+    authorize_user(claims, user_id)
+    user = await db.get(models.User, user_id)
+    if not user: raise HTTPException(status_code=404, detail="User not found")
+    if not page["paginate"]:
+        return await crud.get_requests_for_user(db=db, user_id=user_id)
+    rows = await crud.get_requests_for_user(db=db, user_id=user_id, limit=page["limit"] + 1, after=page["after"])
+    items, next_cursor = pagination.build_page(rows, page["limit"])
+    return {"items": items, "next_cursor": next_cursor}
+
+@app.get("/verification/requests/user/{user_id}/events", tags=["Verification"])
+async def stream_user_verification_events(user_id: int, request: Request, last_event_id: Optional[str] = Header(None), claims: dict = Depends(get_user_claims_for_stream), db: AsyncSession = Depends(get_async_db)):
+    """Pushes new and updated requests to a user's wallet as Server-Sent Events, instead of polling. Needs the user's bearer token."""
+    authorize_user(claims, user_id)
+    user = await db.get(models.User, user_id)
     if not user: raise HTTPException(status_code=404, detail="User not found")
-    return crud.get_requests_for_user(db=db, user_id=user_id)
+    # Release the connection now: an idle stream must not hold one from the pool.
+    await db.close()
+
+    async def snapshot():
+        async with AsyncSessionLocal() as snapshot_db:
+            pending = await crud.get_requests_for_user(db=snapshot_db, user_id=user_id)
+            return [schemas.VerificationRequestWithRelations.model_validate(row).model_dump(mode="json") for row in pending]
+
+    return StreamingResponse(
+        events.sse_stream(user_id, last_event_id, snapshot, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-@app.get("/verification/requests/verifier", response_model=List[schemas.VerificationRequestWithRelations], tags=["Verification"])
-def get_verifier_request_history(db: Session = Depends(get_db), verifier: models.Verifier = Depends(get_verifier_from_api_key)):
-    """An endpoint for a verifier to fetch their entire request history."""
-    return crud.get_requests_by_verifier(db=db, verifier_id=verifier.id)
+@app.get("/verification/requests/verifier", response_model=Union[schemas.VerificationRequestPage, List[schemas.VerificationRequestWithRelations]], tags=["Verification"])
+async def get_verifier_request_history(page: dict = Depends(get_page_params), db: AsyncSession = Depends(replicas.get_read_db), verifier: schemas.VerifierPrincipal = Depends(get_verifier_for_reads)):
+    """An endpoint for a verifier to fetch their request history, a page at a time."""
+    # Pages that run past the live partitions continue into the archive (see archival.py).
+    if not page["paginate"]:
+        rows = await crud.get_requests_by_verifier(db=db, verifier_id=verifier.id)
+        return await archival.extend_history(verifier.id, rows, None)
+    rows = await crud.get_requests_by_verifier(db=db, verifier_id=verifier.id, limit=page["limit"] + 1, after=page["after"])
+    rows = await archival.extend_history(verifier.id, rows, page["after"], page["limit"] + 1)
+    items, next_cursor = pagination.build_page(rows, page["limit"])
+    return {"items": items, "next_cursor": next_cursor}
+
+@app.get("/verification/requests/verifier/export", tags=["Verification"])
+async def export_verifier_request_history(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    created_from: Optional[datetime.datetime] = None,
+    created_to: Optional[datetime.datetime] = None,
+    status: Optional[schemas.RequestStatus] = None,
+    db: AsyncSession = Depends(get_async_db),
+    verifier: schemas.VerifierPrincipal = Depends(get_verifier_from_api_key),
+):
+    """Streams a verifier's full request history (for audits) as NDJSON or CSV, archived months included."""
+    # `db` is the session get_verifier_from_api_key authenticated on (dependencies are cached per request).
+    query = crud.verifier_export_query(verifier.id, created_from=created_from, created_to=created_to, status=status)
+    archived = archival.iter_export_rows(verifier.id, created_from=created_from, created_to=created_to, status=status)
+    filename = f"verification-requests-{verifier.id}.{format}"
+    return StreamingResponse(
+        exports.stream_rows(db, query, format, request.is_disconnected, archived=archived),
+        media_type=exports.EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@app.post("/verification/request/{request_id}/proof", status_code=202, tags=["Verification"])
+async def submit_verification_proof(request_id: int, submission: schemas.ProofSubmission, claims: dict = Depends(get_user_claims), db: AsyncSession = Depends(get_async_db)):
+    """
+    Queues a wallet's proof for off-chain verification. The dispatcher workers
+    send it to the verifier service and update the request when it is checked.
+    Needs the bearer token of the user the request is for.
+    """
+    db_request = await crud.get_verification_request_for_update(db, request_id)
+    if db_request is None: raise HTTPException(status_code=404, detail="Verification request not found")
+    authorize_user(claims, db_request.user_id)
+    if db_request.status != schemas.RequestStatus.pending: raise HTTPException(status_code=409, detail=f"Request is already {db_request.status}")
+    try:
+        await crud.submit_proof(db, db_request, submission)
+    except crud.RequestLeased as exc:
+        retry_after = max(1, int((exc.lease_expires_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds()) + 1)
+        raise HTTPException(status_code=409, detail=str(exc), headers={"Retry-After": str(retry_after)})
+    return {"id": request_id, "status": "queued"}
+
+@app.get("/verification/request/{request_id}/inclusion-proof", response_model=schemas.InclusionProof, tags=["Verification"])
+async def get_inclusion_proof(request_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Proves a finished result is covered by an anchored Merkle root, including results in archived months."""
+    db_request = await crud.get_anchored_request(db, request_id)
+    if db_request is not None:
+        leaf, merkle_proof, anchor = anchoring.leaf_data(db_request), db_request.merkle_proof, db_request.anchor
+    else:
+        # Archived rows keep their proof and anchor_id; the anchors table is never archived.
+        row = await archival.get_archived_request(request_id)
+        if row is None: raise HTTPException(status_code=404, detail="Verification request not found")
+        leaf, merkle_proof = anchoring.leaf_data(SimpleNamespace(**row)), row["merkle_proof"]
+        anchor = await db.get(models.Anchor, row["anchor_id"]) if row["anchor_id"] is not None else None
+    if anchor is None: raise HTTPException(status_code=409, detail="Result has not been anchored yet")
+    return {
+        "request_id": request_id,
+        "leaf": leaf,
+        "leaf_hash": anchoring.hash_leaf(leaf).hex(),
+        "proof": json.loads(merkle_proof),
+        "merkle_root": anchor.merkle_root,
+        "leaf_count": anchor.leaf_count,
+        "tx_hash": anchor.tx_hash,
+        "explorer_url": anchor.explorer_url,
+        "anchored_at": anchor.anchored_at,
+    }
+
+async def require_verifier_service(verifier_service_key: Optional[str] = Header(None)):
+    if verifier_service_key is None: raise HTTPException(status_code=401, detail="verifier-service-key header is missing")
+    if not security.is_verifier_service_key(verifier_service_key): raise HTTPException(status_code=403, detail="Invalid verifier service key")
 
 class VerificationUpdate(BaseModel):
-    status: str
-    result: Optional[str] = None
+    status: schemas.RequestStatus
+    result: Optional[schemas.VerificationResult] = None
     etherscan_url: Optional[str] = None
 
-@app.put("/verification/request/{request_id}", response_model=schemas.VerificationRequest, tags=["Verification"])
-def update_verification_status(request_id: int, update_data: VerificationUpdate, db: Session = Depends(get_db)):
-    """An endpoint for the verifier service to call back and update a request's status."""
-    return crud.update_verification_request(
-        db=db,
-        request_id=request_id,
-        status=update_data.status,
-        result=update_data.result,
-        etherscan_url=update_data.etherscan_url
-    )
\ No newline at end of file
+@app.put("/verification/request/{request_id}", response_model=schemas.VerificationRequest, tags=["Verification"], dependencies=[Depends(require_verifier_service)])
+async def update_verification_status(request: Request, request_id: int, update_data: VerificationUpdate, db: AsyncSession = Depends(get_async_db)):
+    """An endpoint for the verifier service to call back and update a request's status. A final result can't be changed. Needs the verifier-service-key header."""
+    try:
+        db_request = await crud.update_verification_request(
+            db=db,
+            request_id=request_id,
+            status=update_data.status,
+            result=update_data.result,
+            etherscan_url=update_data.etherscan_url
+        )
+    except crud.InvalidStatusTransition as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    if db_request is None: raise HTTPException(status_code=404, detail="Verification request not found")
+    # The caller is the verifier service; the request's user and verifier are the ones who read the result.
+    replicas.pin_account(request, replicas.user_account(db_request.user_id))
+    replicas.pin_account(request, replicas.verifier_account(db_request.verifier_id))
+    return db_request
+
+@app.put("/verification/requests/batch", response_model=schemas.VerificationStatusBatchResult, tags=["Verification"], dependencies=[Depends(require_verifier_service)])
+async def update_verification_status_batch(batch: schemas.VerificationStatusBatchUpdate, db: AsyncSession = Depends(get_async_db)):
+    """A bulk version of the status callback, for the verifier service to drain a backlog. Safe to retry. Needs the verifier-service-key header."""
+    updated, unchanged, rejected, missing = await crud.update_verification_requests_batch(db=db, updates=batch.items)
+    return {"updated": updated, "unchanged": unchanged, "rejected": rejected, "missing": missing}
\ No newline at end of file
@@ -0,0 +1,197 @@
+# backend-api/metrics.py
+"""
+Prometheus metrics and per-request database instrumentation.
+
+- `MetricsMiddleware` records latency and in-flight requests per route, and
+  adds the request's query count and DB time to the response headers
+  (X-DB-Queries, X-DB-Time-Ms and a Server-Timing `db` entry).
+- `instrument_engine` hooks SQLAlchemy's cursor events to count queries,
+  time them, and log any slower than SLOW_QUERY_SECONDS.
+- Pool gauges report connections in use and the recent wait for one;
+  replica gauges report each read replica's lag.
+
+Served by GET /metrics in main.py.
+"""
+import contextvars
+import logging
+import os
+import time
+from typing import Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+from starlette.routing import Match
+
+import ratelimit
+
+logger = logging.getLogger("api.metrics")
+slow_query_logger = logging.getLogger("api.slow_query")
+
+# --- Metrics Settings ---
+# Queries slower than this are logged with their statement. 0 turns it off.
+SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_SECONDS", "0.2"))
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time to serve an HTTP request.", ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being served.", ["method", "route"])
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements executed per HTTP request.", ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+DB_QUERIES = Counter("db_queries_total", "SQL statements executed.")
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "Time spent executing one SQL statement.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+DB_SLOW_QUERIES = Counter("db_slow_queries_total", "SQL statements slower than SLOW_QUERY_SECONDS.")
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds", "Time spent waiting to check a connection out of the pool.",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 5, 30),
+)
+DB_REPLICA_LAG = Gauge("db_replica_lag_seconds", "Last measured replay lag of each read replica (NaN if unreachable).", ["replica"])
+DB_READ_SESSIONS = Counter("db_read_sessions_total", "Sessions opened for read-only routes, by the database that served them.", ["target"])
+
+# The smoothed wait that load shedding acts on (see ratelimit.LoadShedder).
+Gauge("db_pool_wait_recent_seconds", "Recent average wait for a pooled connection.").set_function(ratelimit.shedder.pool_wait)
+
+
+class QueryStats:
+    __slots__ = ("count", "seconds", "route")
+
+    def __init__(self, route: str):
+        self.count = 0
+        self.seconds = 0.0
+        self.route = route
+
+
+# The stats of the HTTP request being served, if any. SQLAlchemy's async
+# engine runs cursor events in a greenlet that shares the task's context.
+_current: contextvars.ContextVar[Optional[QueryStats]] = contextvars.ContextVar("query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    DB_QUERIES.inc()
+    DB_QUERY_LATENCY.observe(elapsed)
+    stats = _current.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+    if SLOW_QUERY_SECONDS and elapsed >= SLOW_QUERY_SECONDS:
+        DB_SLOW_QUERIES.inc()
+        slow_query_logger.warning(
+            "Slow query (%.1f ms) on %s: %s",
+            elapsed * 1000, stats.route if stats else "-", " ".join(statement.split())[:2000],
+        )
+
+
+def _on_error(exception_context):
+    started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def instrument_queries(engine):
+    """
+    Attaches the query hooks to an (async) engine. Used on its own for the
+    read replicas, which have no pool gauges.
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _on_error)
+
+
+def instrument_engine(engine, capacity: int):
+    """
+    Attaches the query hooks and pool gauges to an (async) engine whose
+    pool holds at most `capacity` connections.
+    """
+    instrument_queries(engine)
+    pool = getattr(engine, "sync_engine", engine).pool
+    Gauge("db_pool_checked_out", "Pooled connections in use.").set_function(pool.checkedout)
+    Gauge("db_pool_capacity", "Pool size plus allowed overflow.").set_function(lambda: capacity)
+    Gauge("db_pool_utilization", "Share of the pool's capacity in use (0-1).").set_function(
+        lambda: pool.checkedout() / capacity if capacity else 0
+    )
+    ratelimit.shedder.watch_pool(pool, capacity)
+
+
+async def acquire_connection(db) -> float:
+    """
+    Checks out the session's connection now and returns how long the pool
+    took to hand it over.
+    """
+    started = time.perf_counter()
+    await db.connection()
+    waited = time.perf_counter() - started
+    DB_POOL_WAIT.observe(waited)
+    return waited
+
+
+def render():
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (so streaming responses pass straight through).
+    """
+
+    def __init__(self, app, router, on_response=None):
+        self.app = app
+        self.router = router
+        # Called with the route template once each response completes.
+        self.on_response = on_response
+
+    def _route(self, scope) -> str:
+        for route in self.router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        method = scope["method"]
+        route = self._route(scope)
+        stats = QueryStats(route)
+        token = _current.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_headers(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                db_ms = stats.seconds * 1000
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-db-queries", str(stats.count).encode()),
+                    (b"x-db-time-ms", f"{db_ms:.2f}".encode()),
+                    (b"server-timing", f"db;dur={db_ms:.2f};desc=\"{stats.count} queries\"".encode()),
+                ]
+            await send(message)
+
+        in_flight = REQUESTS_IN_FLIGHT.labels(method, route)
+        in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            in_flight.dec()
+            _current.reset(token)
+            elapsed = time.perf_counter() - started
+            REQUEST_LATENCY.labels(method, route, str(status)).observe(elapsed)
+            REQUEST_QUERIES.labels(route).observe(stats.count)
+            if self.on_response is not None:
+                self.on_response(route)
+            logger.debug(
+                "%s %s -> %s in %.1f ms (%d queries, %.1f ms in DB)",
+                method, route, status, elapsed * 1000, stats.count, stats.seconds * 1000,
+            )
@@ -1,12 +1,74 @@
 # backend-api/models.py
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, Float, SmallInteger, String, DateTime, ForeignKey, Boolean, Index, LargeBinary, Sequence, UniqueConstraint, CheckConstraint, select, text
+from sqlalchemy.orm import column_property, relationship
 from sqlalchemy.sql import func
+from sqlalchemy.types import TypeDecorator
 from database import Base 
+from schemas import RequestStatus, VerificationResult
+
+
+# The SMALLINT stored for each enum member. Codes are permanent: never
+# change or reuse one. A new member takes the next unused code (and the
+# column's CHECK constraint is widened in a migration).
+ENUM_CODES = {
+    RequestStatus: {
+        RequestStatus.pending: 0,
+        RequestStatus.completed: 1,
+        RequestStatus.failed: 2,
+        RequestStatus.expired: 3,
+    },
+    VerificationResult: {
+        VerificationResult.no: 0,
+        VerificationResult.yes: 1,
+    },
+}
+
+
+class SmallIntEnum(TypeDecorator):
+    """
+    Stores a string enum as a SMALLINT, using the member's code from
+    ENUM_CODES (not its position, so members can be reordered). Accepts
+    members or their string values; loads members.
+    """
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, enum_class):
+        super().__init__()
+        self.enum_class = enum_class
+        self.codes = ENUM_CODES[enum_class]
+        if set(self.codes) != set(enum_class) or len(set(self.codes.values())) != len(self.codes):
+            raise ValueError(f"ENUM_CODES must give every {enum_class.__name__} member its own code")
+        self.members = {code: member for member, code in self.codes.items()}
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return self.codes[self.enum_class(value)]
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return self.members[value]
+
+
+def enum_code(member) -> int:
+    """
+    The stored code of an enum member, for raw SQL and index predicates.
+    """
+    return ENUM_CODES[type(member)][member]
+
+
+def enum_code_range(enum_class) -> str:
+    """
+    "<lowest> AND <highest>" code, for the columns' BETWEEN checks.
+    """
+    codes = ENUM_CODES[enum_class].values()
+    return f"{min(codes)} AND {max(codes)}"
 
 class User(Base):
     __tablename__ = "users"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     # DID (Decentralized Identifier) for the user
@@ -18,11 +80,19 @@ class User(Base):
 
 class Verifier(Base):
     __tablename__ = "verifiers"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     company_name = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False) # <-- ADD THIS LINE
-    api_key = Column(String, unique=True, nullable=False)
+    # Only a SHA-256 of the API key is stored; the key itself is shown once.
+    api_key_hash = Column(String, unique=True, index=True, nullable=False)
+    api_key_prefix = Column(String, nullable=False)
     webhook_url = Column(String, nullable=True)
+    # Shared secret for the HMAC signature on webhook deliveries.
+    webhook_secret = Column(String, nullable=True)
+    # Per-verifier admission limits (see ratelimit.py); null means the default.
+    rate_limit_per_second = Column(Float, nullable=True)
+    rate_limit_burst = Column(Integer, nullable=True)
+    max_concurrent_requests = Column(Integer, nullable=True)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
@@ -30,27 +100,139 @@ class Verifier(Base):
 
 class Credential(Base):
     __tablename__ = "credentials"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     owner_id = Column(Integer, ForeignKey("users.id"))
     # The full, signed Verifiable Credential JSON
     vc_data_json = Column(String, nullable=False) 
     issuer_did = Column(String, nullable=False)
     issued_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Position of this credential's bit in its issuer's status list.
+    status_list_index = Column(Integer, nullable=True)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
     
     owner = relationship("User", back_populates="credentials")
 
+    __table_args__ = (
+        UniqueConstraint("issuer_did", "status_list_index", name="uq_credentials_status_list_index"),
+    )
+
+class StatusList(Base):
+    # One revocation bitstring per issuer: bit N is set when the credential
+    # with status_list_index N has been revoked. See status_list.py.
+    __tablename__ = "status_lists"
+    id = Column(Integer, primary_key=True)
+    issuer_did = Column(String, unique=True, nullable=False)
+    bits = Column(LargeBinary, nullable=False)
+    next_index = Column(Integer, nullable=False, server_default=text("0"))
+    # Bumped on every change to `bits`; used as the ETag.
+    version = Column(Integer, nullable=False, server_default=text("0"))
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ProofVerification(Base):
+    # Persistent tier of proof_cache.ProofCache: the result of verifying one
+    # (proof, publicSignals) pair under one verification key.
+    __tablename__ = "proof_verifications"
+    cache_key = Column(String, primary_key=True) # SHA-256, see ProofCache.key_for
+    key_fingerprint = Column(String, index=True, nullable=False)
+    is_valid = Column(Boolean, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class Anchor(Base):
+    # One on-chain transaction covering a batch of verification results.
+    __tablename__ = "anchors"
+    id = Column(Integer, primary_key=True)
+    merkle_root = Column(String, nullable=False)
+    leaf_count = Column(Integer, nullable=False)
+    # Null until the root has been submitted.
+    tx_hash = Column(String, nullable=True)
+    explorer_url = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    anchored_at = Column(DateTime(timezone=True), nullable=True)
+
+class Policy(Base):
+    # Lookup table for the policy a request checks (e.g. "isOver18"), so each
+    # request row stores a 2-byte id instead of the name.
+    __tablename__ = "policies"
+    id = Column(SmallInteger, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+
 class VerificationRequest(Base):
+    # Range-partitioned by month of created_at (see archival.py), so the
+    # table's primary key is (id, created_at); the ORM still identifies rows by id.
     __tablename__ = "verification_requests"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     verifier_id = Column(Integer, ForeignKey("verifiers.id"))
     user_id = Column(Integer, ForeignKey("users.id"))
     
-    policy_to_check = Column(String, nullable=False) # e.g., "isOver18"
-    status = Column(String, default="pending") # pending, completed, failed
-    result = Column(String, nullable=True) # "Yes", "No", or null
+    policy_id = Column(SmallInteger, ForeignKey("policies.id"), nullable=False)
+    # The policy's name, e.g. "isOver18" (read-only; write policy_id).
+    policy_to_check = column_property(
+        select(Policy.name).where(Policy.id == policy_id).correlate_except(Policy).scalar_subquery()
+    )
+    status = Column(SmallIntEnum(RequestStatus), nullable=False, default=RequestStatus.pending, server_default=text(str(enum_code(RequestStatus.pending))))
+    result = Column(SmallIntEnum(VerificationResult), nullable=True)
+    etherscan_url = Column(String, nullable=True)
+    # Proof submitted by the wallet, as JSON {"proof": ..., "publicSignals": ...},
+    # waiting for the dispatcher in dispatcher.py to send it to verifier-svc.
+    proof = Column(String, nullable=True)
+    # A dispatcher owns the request until its lease runs out.
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    dispatch_attempts = Column(Integer, nullable=False, server_default=text("0"))
+    # Set by anchoring.py once the result is in an anchored Merkle tree;
+    # merkle_proof is the JSON list of sibling hashes up to the anchor's root.
+    anchor_id = Column(Integer, ForeignKey("anchors.id"), nullable=True)
+    merkle_proof = Column(String, nullable=True)
     
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     verifier = relationship("Verifier", back_populates="requests_made")
-    user = relationship("User", back_populates="verification_requests")
\ No newline at end of file
+    user = relationship("User", back_populates="verification_requests")
+    anchor = relationship("Anchor")
+
+    __table_args__ = (
+        # Serves crud.get_requests_for_user (a user's pending requests only).
+        Index("ix_verification_requests_user_id_pending", user_id, postgresql_where=text(f"status = {enum_code(RequestStatus.pending)}")),
+        # Serves crud.get_requests_by_verifier (history, newest first).
+        Index("ix_verification_requests_verifier_id_created_at", verifier_id, created_at.desc()),
+        # Serves dispatcher.VerificationDispatcher.claim (proofs waiting to be checked).
+        Index(
+            "ix_verification_requests_dispatch", lease_expires_at,
+            postgresql_where=text(f"status = {enum_code(RequestStatus.pending)} AND proof IS NOT NULL"),
+        ),
+        # Serves anchoring.Anchorer.seal_batch (final results not yet anchored).
+        Index(
+            "ix_verification_requests_unanchored", id,
+            postgresql_where=text(
+                f"anchor_id IS NULL AND status IN ({enum_code(RequestStatus.completed)}, {enum_code(RequestStatus.failed)})"
+            ),
+        ),
+        CheckConstraint(f"status BETWEEN {enum_code_range(RequestStatus)}", name="ck_verification_requests_status"),
+        CheckConstraint(f"result BETWEEN {enum_code_range(VerificationResult)}", name="ck_verification_requests_result"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+    __mapper_args__ = {"primary_key": [id]}
+
+class WebhookOutbox(Base):
+    # Webhook events are written here in the same transaction as the change
+    # that caused them, then delivered by the dispatcher in webhooks.py.
+    __tablename__ = "webhook_outbox"
+    id = Column(Integer, primary_key=True)
+    verifier_id = Column(Integer, ForeignKey("verifiers.id"), nullable=False)
+    # No foreign key: verification_requests is partitioned and its old partitions get archived.
+    request_id = Column(Integer, nullable=False)
+    event_type = Column(String, nullable=False)
+    payload = Column(String, nullable=False) # JSON body of the event
+    attempts = Column(Integer, nullable=False, server_default=text("0"))
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_error = Column(String, nullable=True)
+    delivered_at = Column(DateTime(timezone=True), nullable=True)
+    failed_at = Column(DateTime(timezone=True), nullable=True) # gave up after WEBHOOK_MAX_ATTEMPTS
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # The dispatcher only ever scans undelivered events that are due.
+        Index("ix_webhook_outbox_due", next_attempt_at, postgresql_where=text("delivered_at IS NULL AND failed_at IS NULL")),
+    )
+# IDs for the live event streams (events.py), taken as events are published.
+verification_event_seq = Sequence("verification_event_seq", metadata=Base.metadata)
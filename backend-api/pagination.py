@@ -0,0 +1,53 @@
+# backend-api/pagination.py
+import base64
+import datetime
+import json
+import os
+from typing import List, Optional, Tuple
+
+# --- Keyset Pagination ---
+# Pages are ordered newest first by (created_at, id). The cursor is an opaque,
+# URL-safe token holding the sort key of the last row of the previous page,
+# so each page is a single index range scan no matter how deep the client is.
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+
+Cursor = Tuple[datetime.datetime, int]
+
+
+def encode_cursor(created_at: datetime.datetime, row_id: int) -> str:
+    payload = json.dumps({"c": created_at.isoformat(), "i": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+# Row IDs are INTEGER columns; a larger one would fail in the database.
+MAX_ROW_ID = 2**31 - 1
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """
+    Raises ValueError for anything that isn't a cursor we issued. Issued
+    cursors always carry a UTC offset (created_at is timezone-aware), so a
+    naive timestamp is refused rather than compared against aware ones.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created_at, row_id = datetime.datetime.fromisoformat(payload["c"]), int(payload["i"])
+    except (ValueError, KeyError, TypeError, OverflowError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if created_at.utcoffset() is None or not 0 <= row_id <= MAX_ROW_ID:
+        raise ValueError("Invalid cursor")
+    return created_at, row_id
+
+
+def build_page(rows: List, limit: int) -> Tuple[List, Optional[str]]:
+    """
+    Takes up to `limit + 1` rows (the extra row only signals that there is
+    another page) and returns the page items and the next cursor.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    items = rows[:limit]
+    last = items[-1]
+    return items, encode_cursor(last.created_at, last.id)
@@ -0,0 +1,146 @@
+# backend-api/proof_cache.py
+"""
+Caches proof verification results by content. Verifying a PLONK proof is the
+most expensive step we run, and wallets often resubmit the same proof after a
+timeout, so identical (proof, publicSignals) pairs are only ever verified once
+per verification key.
+
+Lookups go through an in-process LRU, then the `proof_verifications` table.
+Concurrent lookups of the same key in one process share a single
+verification; the sharing is per process only, so workers in other
+processes that miss at the same moment each verify the proof (and the first
+row stored wins). Each outcome is counted in `proof_cache_lookups_total`,
+which the dispatcher serves on DISPATCH_METRICS_PORT. The key includes a fingerprint of verification_key.json, so
+replacing the key makes every old entry unreachable (and they are purged).
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from collections import Counter
+from typing import Awaitable, Callable, Dict, Optional
+
+import prometheus_client
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+
+import models
+from cache import MISSING, TTLCache
+from database import AsyncSessionLocal
+
+logger = logging.getLogger("proof_cache")
+
+# --- Proof Cache Settings ---
+# The same file verifier-svc loads its off-chain verification key from.
+VERIFICATION_KEY_PATH = os.getenv("VERIFICATION_KEY_PATH", "../verifier-svc/keys/verification_key.json")
+PROOF_CACHE_SIZE = int(os.getenv("PROOF_CACHE_SIZE", "10000"))
+PROOF_CACHE_TTL = float(os.getenv("PROOF_CACHE_TTL", "3600"))
+
+LOOKUPS = prometheus_client.Counter(
+    "proof_cache_lookups_total", "Proof cache lookups by outcome.", ["outcome"]
+)
+OUTCOMES = ("memory_hits", "table_hits", "coalesced", "misses")
+for _outcome in OUTCOMES:
+    LOOKUPS.labels(_outcome)
+
+
+def canonical_json(value) -> bytes:
+    """
+    Serializes equal JSON values to identical bytes (sorted keys, no spaces).
+    """
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+class ProofCache:
+    def __init__(self, session_factory=AsyncSessionLocal, key_path: str = VERIFICATION_KEY_PATH):
+        self.session_factory = session_factory
+        self.key_path = key_path
+        self.memory = TTLCache(PROOF_CACHE_SIZE, PROOF_CACHE_TTL)
+        # Per instance, one key per OUTCOMES entry; LOOKUPS has the process totals.
+        self.stats = Counter()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._key_mtime: Optional[int] = None
+        self._fingerprint: Optional[str] = None
+        self._purge_pending = False
+
+    def fingerprint(self) -> str:
+        """
+        SHA-256 of the canonicalized verification key, recomputed whenever
+        the file's mtime changes.
+        """
+        mtime = os.stat(self.key_path).st_mtime_ns
+        if mtime != self._key_mtime:
+            with open(self.key_path, "rb") as f:
+                fingerprint = hashlib.sha256(canonical_json(json.load(f))).hexdigest()
+            if self._fingerprint is not None and fingerprint != self._fingerprint:
+                logger.info("Verification key changed; dropping cached proof results")
+                self.memory.clear()
+                self._purge_pending = True
+            self._key_mtime, self._fingerprint = mtime, fingerprint
+        return self._fingerprint
+
+    def key_for(self, fingerprint: str, proof: dict, public_signals: list) -> str:
+        digest = hashlib.sha256(fingerprint.encode())
+        digest.update(b"\x00" + canonical_json(proof))
+        digest.update(b"\x00" + canonical_json(public_signals))
+        return digest.hexdigest()
+
+    async def _lookup(self, key: str, fingerprint: str) -> Optional[bool]:
+        table = models.ProofVerification
+        async with self.session_factory() as db:
+            if self._purge_pending:
+                self._purge_pending = False
+                await db.execute(delete(table).where(table.key_fingerprint != fingerprint))
+                await db.commit()
+            return (await db.execute(select(table.is_valid).where(table.cache_key == key))).scalar()
+
+    async def _store(self, key: str, fingerprint: str, is_valid: bool):
+        table = models.ProofVerification
+        async with self.session_factory() as db:
+            await db.execute(
+                insert(table).values(cache_key=key, key_fingerprint=fingerprint, is_valid=is_valid)
+                .on_conflict_do_nothing(index_elements=[table.cache_key])
+            )
+            await db.commit()
+
+    def _record(self, outcome: str):
+        self.stats[outcome] += 1
+        LOOKUPS.labels(outcome).inc()
+
+    async def verify(self, proof: dict, public_signals: list, verify: Callable[[], Awaitable[bool]]) -> bool:
+        """
+        Returns the cached result for this proof, or awaits `verify()` and
+        caches what it returns. Exceptions from `verify()` are not cached.
+        """
+        fingerprint = self.fingerprint()
+        key = self.key_for(fingerprint, proof, public_signals)
+        cached = self.memory.get(key)
+        if cached is not MISSING:
+            self._record("memory_hits")
+            return cached
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self._record("coalesced")
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            is_valid = await self._lookup(key, fingerprint)
+            if is_valid is None:
+                self._record("misses")
+                is_valid = await verify()
+                await self._store(key, fingerprint, is_valid)
+            else:
+                self._record("table_hits")
+            self.memory.set(key, is_valid)
+            future.set_result(is_valid)
+            return is_valid
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Mark it retrieved so a failure nobody else waited on isn't logged twice.
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
@@ -0,0 +1,241 @@
+# backend-api/ratelimit.py
+"""
+Admission control for the API-key routes:
+
+- a token bucket per verifier (sustained rate + burst),
+- a cap on each verifier's requests in flight,
+- global load shedding while the DB pool is slow to hand out connections.
+
+Limits come from the verifier's row (falling back to the defaults below).
+State lives in this process by default; set RATE_LIMIT_BACKEND=redis to
+share it between workers (needs the `redis` package).
+"""
+import math
+import os
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+# --- Rate Limit Settings ---
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+# Used for verifiers whose row leaves the limit unset. 0 turns a limit off.
+DEFAULT_RATE_PER_SECOND = float(os.getenv("DEFAULT_RATE_PER_SECOND", "20"))
+DEFAULT_RATE_BURST = int(os.getenv("DEFAULT_RATE_BURST", "40"))
+DEFAULT_MAX_CONCURRENT = int(os.getenv("DEFAULT_MAX_CONCURRENT", "10"))
+# Shed load once waiting for a pooled DB connection takes this long on
+# average (seconds, smoothed, decaying with the half-life below).
+SHED_POOL_WAIT_SECONDS = float(os.getenv("SHED_POOL_WAIT_SECONDS", "0.5"))
+SHED_HALF_LIFE_SECONDS = float(os.getenv("SHED_HALF_LIFE_SECONDS", "2"))
+# Redis backend: an in-flight slot left behind by a crashed worker is freed
+# after this long. Keep it above your longest request (exports stream for a while).
+RATE_LIMIT_IN_FLIGHT_TTL_SECONDS = float(os.getenv("RATE_LIMIT_IN_FLIGHT_TTL_SECONDS", "600"))
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after: float, detail: str):
+        super().__init__(detail)
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.detail = detail
+
+
+def limits_for(verifier) -> Tuple[float, int, int]:
+    """
+    (rate per second, burst, max concurrent) for a verifier principal.
+    """
+    rate = verifier.rate_limit_per_second if verifier.rate_limit_per_second is not None else DEFAULT_RATE_PER_SECOND
+    burst = verifier.rate_limit_burst if verifier.rate_limit_burst is not None else DEFAULT_RATE_BURST
+    concurrent = verifier.max_concurrent_requests if verifier.max_concurrent_requests is not None else DEFAULT_MAX_CONCURRENT
+    return rate, max(burst, 1), concurrent
+
+
+class InMemoryLimiter:
+    def __init__(self):
+        # verifier_id -> (tokens, refilled_at)
+        self._buckets: Dict[int, Tuple[float, float]] = {}
+        self._in_flight: Dict[int, int] = {}
+
+    async def take(self, verifier_id: int, rate: float, burst: int) -> float:
+        """
+        Takes one token. Returns 0 on success, or how many seconds until a
+        token will be available.
+        """
+        now = time.monotonic()
+        tokens, refilled_at = self._buckets.get(verifier_id, (burst, now))
+        tokens = min(burst, tokens + (now - refilled_at) * rate)
+        if tokens < 1:
+            self._buckets[verifier_id] = (tokens, now)
+            return (1 - tokens) / rate
+        self._buckets[verifier_id] = (tokens - 1, now)
+        return 0
+
+    async def enter(self, verifier_id: int, limit: int) -> Optional[object]:
+        """
+        Takes an in-flight slot. Returns a token for `leave`, or None if the
+        verifier is at its limit.
+        """
+        count = self._in_flight.get(verifier_id, 0)
+        if count >= limit:
+            return None
+        self._in_flight[verifier_id] = count + 1
+        return True
+
+    async def leave(self, verifier_id: int, slot):
+        count = self._in_flight.get(verifier_id, 0) - 1
+        if count > 0:
+            self._in_flight[verifier_id] = count
+        else:
+            self._in_flight.pop(verifier_id, None)
+
+
+class RedisLimiter:
+    """
+    The same limits shared by every API process through Redis. Each check is
+    one round trip (a Lua script or INCR).
+    """
+
+    # KEYS[1] bucket; ARGV: rate, burst, now. Returns the wait in ms (0 = ok).
+    TAKE_SCRIPT = """
+    local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+    local tokens = tonumber(state[1]) or burst
+    local at = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + (now - at) * rate)
+    local wait = 0
+    if tokens < 1 then
+        wait = math.ceil((1 - tokens) / rate * 1000)
+    else
+        tokens = tokens - 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'at', now)
+    redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+    return wait
+    """
+    # KEYS[1] in-flight set (member per request, scored by when it lapses);
+    # ARGV: limit, now, lapses_at, member. Returns 1 if the slot was taken.
+    ENTER_SCRIPT = """
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[2])
+    if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[1]) then
+        return 0
+    end
+    redis.call('ZADD', KEYS[1], ARGV[3], ARGV[4])
+    redis.call('PEXPIREAT', KEYS[1], math.ceil(tonumber(ARGV[3]) * 1000))
+    return 1
+    """
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self._take = self.client.register_script(self.TAKE_SCRIPT)
+        self._enter = self.client.register_script(self.ENTER_SCRIPT)
+
+    async def take(self, verifier_id: int, rate: float, burst: int) -> float:
+        wait_ms = await self._take(keys=[f"ratelimit:bucket:{verifier_id}"], args=[rate, burst, time.time()])
+        return int(wait_ms) / 1000
+
+    async def enter(self, verifier_id: int, limit: int) -> Optional[str]:
+        """
+        Each request holds its own member of the verifier's in-flight set,
+        so `leave` removes exactly that one. (A shared counter with a TTL
+        drifted: a request outliving the TTL decremented a fresh key.) A
+        crashed worker's members lapse after RATE_LIMIT_IN_FLIGHT_TTL_SECONDS.
+        """
+        slot = uuid.uuid4().hex
+        now = time.time()
+        taken = await self._enter(
+            keys=[f"ratelimit:inflight:{verifier_id}"], args=[limit, now, now + RATE_LIMIT_IN_FLIGHT_TTL_SECONDS, slot]
+        )
+        return slot if int(taken) else None
+
+    async def leave(self, verifier_id: int, slot: str):
+        await self.client.zrem(f"ratelimit:inflight:{verifier_id}", slot)
+
+
+class LoadShedder:
+    """
+    Tracks how long requests wait for a DB connection (an exponentially
+    decaying average) and turns new work away while it is above the
+    threshold, or while the pool has no connection left to hand out, instead
+    of letting it queue for the pool. Both checks are in-memory reads.
+    """
+
+    def __init__(self, threshold: float = SHED_POOL_WAIT_SECONDS, half_life: float = SHED_HALF_LIFE_SECONDS):
+        self.threshold = threshold
+        self.half_life = half_life
+        self._average = 0.0
+        self._updated_at = time.monotonic()
+        # Set by watch_pool; until then only the average is used.
+        self._pool_exhausted = lambda: False
+
+    def watch_pool(self, pool, capacity: int):
+        """
+        Also sheds while all `capacity` connections of `pool` are checked out.
+        """
+        self._pool_exhausted = lambda: capacity > 0 and pool.checkedout() >= capacity
+
+    def pool_wait(self) -> float:
+        elapsed = time.monotonic() - self._updated_at
+        return self._average * 0.5 ** (elapsed / self.half_life)
+
+    def record(self, wait: float):
+        self._average = (self.pool_wait() + wait) / 2
+        self._updated_at = time.monotonic()
+
+    def overloaded(self) -> bool:
+        return self.threshold > 0 and (self.pool_wait() > self.threshold or self._pool_exhausted())
+
+
+class LoadSheddingMiddleware:
+    """
+    Answers 503 with Retry-After to every request while `shedder` reports
+    overload, before any route or dependency runs. Pure ASGI. Paths in
+    `exempt` (health, readiness, metrics) always get through, so an
+    overloaded instance can still be observed.
+    """
+
+    def __init__(self, app, exempt=()):
+        self.app = app
+        self.exempt = frozenset(exempt)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt or not shedder.overloaded():
+            return await self.app(scope, receive, send)
+        response = JSONResponse({"detail": "Server is busy, please retry shortly"}, status_code=503, headers={"Retry-After": "1"})
+        await response(scope, receive, send)
+
+
+def _create_limiter():
+    if RATE_LIMIT_BACKEND == "redis":
+        return RedisLimiter(RATE_LIMIT_REDIS_URL)
+    return InMemoryLimiter()
+
+
+limiter = _create_limiter()
+shedder = LoadShedder()
+
+
+async def admit(verifier):
+    """
+    Applies the verifier's rate limit and concurrency cap. Raises
+    RateLimited if the call must be refused; otherwise returns the
+    concurrency slot taken (give it back with `release`), or None if the
+    verifier has no cap.
+    """
+    rate, burst, concurrent = limits_for(verifier)
+    if rate > 0:
+        wait = await limiter.take(verifier.id, rate, burst)
+        if wait:
+            raise RateLimited(wait, "Rate limit exceeded")
+    if concurrent > 0:
+        slot = await limiter.enter(verifier.id, concurrent)
+        if slot is None:
+            raise RateLimited(1, "Too many concurrent requests")
+        return slot
+    return None
+
+
+async def release(verifier, slot):
+    await limiter.leave(verifier.id, slot)
@@ -0,0 +1,146 @@
+# backend-api/readiness.py
+"""
+Startup prewarming and the readiness check behind GET /ready.
+
+A fresh process pays for opening DB connections, forking the bcrypt worker
+processes and building the token signers on its first requests. `prewarm`
+does all of that during the lifespan startup instead, and /ready stays 503
+until it has succeeded and the database answers, so an orchestrator only
+routes traffic to warm instances. It is also 503 while the event broker's
+LISTEN connection is down and reconnecting.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Optional
+
+from sqlalchemy import text
+
+import events
+import hashing
+import issuer
+import replicas
+import security
+from database import DB_POOL_SIZE, get_async_engine
+
+logger = logging.getLogger("api.readiness")
+
+# Taken as close to process start as the app gets (main imports this first).
+PROCESS_STARTED = time.monotonic()
+
+# --- Readiness Settings ---
+# Connections opened and validated at startup (at most DB_POOL_SIZE are kept).
+DB_PREWARM_CONNECTIONS = int(os.getenv("DB_PREWARM_CONNECTIONS", "5"))
+PREWARM_HASHING = os.getenv("PREWARM_HASHING", "true").lower() in ("1", "true", "yes")
+READY_DB_TIMEOUT = float(os.getenv("READY_DB_TIMEOUT", "2"))
+
+
+class _State:
+    warmed = False
+    startup_seconds: Optional[float] = None
+    first_request_seconds: Optional[float] = None
+    last_error: Optional[str] = None
+
+
+state = _State()
+_prewarm_lock = asyncio.Lock()
+
+
+async def _prewarm_pool(count: int):
+    engine = get_async_engine()
+    connections = await asyncio.gather(*(engine.connect() for _ in range(count)))
+    try:
+        await asyncio.gather(*(connection.execute(text("SELECT 1")) for connection in connections))
+    finally:
+        await asyncio.gather(*(connection.close() for connection in connections))
+
+
+async def _prewarm_hashing():
+    # One job per worker so every process is forked and has bcrypt loaded.
+    await asyncio.gather(*(hashing.hash_password("prewarm") for _ in range(hashing.HASH_WORKERS)))
+
+
+def _prewarm_tokens():
+    token = security.create_access_token({"sub": "prewarm", "type": "user"})
+    security.verify_access_token(token)
+    issuer.get_signer().sign({"sub": 0})
+
+
+async def prewarm() -> bool:
+    """
+    Opens and validates pooled connections and warms the hashing and token
+    code paths. Never raises: a failure is logged and leaves the instance
+    unready, and /ready tries again.
+    """
+    async with _prewarm_lock:
+        if state.warmed:
+            return True
+        started = time.perf_counter()
+        try:
+            count = min(DB_PREWARM_CONNECTIONS, DB_POOL_SIZE)
+            if count > 0:
+                await _prewarm_pool(count)
+            if PREWARM_HASHING:
+                await _prewarm_hashing()
+            _prewarm_tokens()
+        except Exception as exc:
+            state.last_error = f"{type(exc).__name__}: {exc}"
+            logger.exception("Prewarming failed; the instance stays unready")
+            return False
+        state.warmed = True
+        state.last_error = None
+        state.startup_seconds = time.monotonic() - PROCESS_STARTED
+        logger.info("Prewarmed in %.0f ms (ready %.2f s after start)", (time.perf_counter() - started) * 1000, state.startup_seconds)
+        return True
+
+
+# Probes don't count as traffic for time-to-first-request.
+PROBE_ROUTES = {"/health", "/ready", "/metrics"}
+
+
+def record_request(route: str):
+    """
+    Called when a response completes; remembers when the first real
+    (non-probe) request was served.
+    """
+    if state.first_request_seconds is None and route not in PROBE_ROUTES:
+        state.first_request_seconds = time.monotonic() - PROCESS_STARTED
+
+
+async def _ping() -> float:
+    async with get_async_engine().connect() as connection:
+        started = time.perf_counter()
+        await connection.execute(text("SELECT 1"))
+        return time.perf_counter() - started
+
+
+async def check_database() -> dict:
+    """
+    Round trip of a trivial query on a pooled connection, bounded by
+    READY_DB_TIMEOUT (including the wait for the connection).
+    """
+    try:
+        round_trip = await asyncio.wait_for(_ping(), timeout=READY_DB_TIMEOUT)
+    except Exception as exc:
+        return {"reachable": False, "error": f"{type(exc).__name__}: {exc}"}
+    return {"reachable": True, "latency_ms": round(round_trip * 1000, 2)}
+
+
+async def report() -> dict:
+    database = await check_database()
+    if database["reachable"] and not state.warmed:
+        await prewarm()
+    # A process whose LISTEN connection is down would serve streams that never update.
+    listener = events.broker.status()
+    return {
+        "status": "ready" if database["reachable"] and state.warmed and listener["listening"] else "unready",
+        "database": database,
+        "events": listener,
+        # Informational: reads fall back to the primary, so replicas don't gate readiness.
+        "replicas": replicas.router.status(),
+        "warmed": state.warmed,
+        "startup_seconds": state.startup_seconds,
+        "time_to_first_request_seconds": state.first_request_seconds,
+        "error": state.last_error,
+    }
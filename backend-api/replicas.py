@@ -0,0 +1,309 @@
+# backend-api/replicas.py
+"""
+Read-replica routing for the read-only routes.
+
+`get_read_db` gives a route a session on a read replica when one is
+reachable and caught up, and a session on the primary otherwise:
+
+- A monitor measures each replica's replay lag every
+  REPLICA_LAG_CHECK_SECONDS. A replica more than REPLICA_MAX_LAG_SECONDS
+  behind, or one that can't be reached, gets no reads until it recovers.
+- An account that has just written is pinned to the primary for
+  READ_YOUR_WRITES_SECONDS, so its next reads see its own writes. The
+  account is the user or verifier a request's credential resolves to
+  (bearer token claims, or an API key's cached principal), whichever
+  header carried it; anonymous requests fall back to the client address.
+  `ReadYourWritesMiddleware` records the writes, and routes that change
+  another account's data pin it too (`pin_account`). Pins live in this
+  process by default; READ_YOUR_WRITES_BACKEND=redis shares them between
+  workers (needs the `redis` package). The window should cover the
+  replica lag you allow.
+
+With DATABASE_REPLICA_URLS unset, every read goes to the primary. The
+X-DB-Route response header names the database that served a read.
+"""
+import asyncio
+import itertools
+import logging
+import os
+import time
+from typing import Iterable, List, Optional
+
+from fastapi import Request, Response
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from starlette.datastructures import Headers
+
+import metrics
+import security
+from cache import MISSING, TTLCache, api_key_cache
+from database import AsyncSessionLocal, get_replica_engines, make_async_sessionmaker
+
+logger = logging.getLogger("api.replicas")
+
+# --- Replica Routing Settings ---
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_LAG_CHECK_SECONDS = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", "1"))
+REPLICA_CHECK_TIMEOUT = float(os.getenv("REPLICA_CHECK_TIMEOUT", "2"))
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))
+READ_YOUR_WRITES_PRINCIPALS = int(os.getenv("READ_YOUR_WRITES_PRINCIPALS", "100000"))
+READ_YOUR_WRITES_BACKEND = os.getenv("READ_YOUR_WRITES_BACKEND", "memory")
+READ_YOUR_WRITES_REDIS_URL = os.getenv("READ_YOUR_WRITES_REDIS_URL", "redis://localhost:6379/0")
+# Must return a single number: the replica's lag in seconds. The default
+# counts a fully replayed replica as current even when the primary is idle,
+# and a database that isn't in recovery (a plain local copy) as lag 0. For
+# other setups, such as a heartbeat table, or to simulate lag while testing
+# with two local databases, replace the query.
+REPLICA_LAG_QUERY = os.getenv("REPLICA_LAG_QUERY") or """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+# Accounts a request wrote for besides its caller; see pin_account.
+PINNED_ACCOUNTS_SCOPE_KEY = "read_your_writes.accounts"
+# An API key this process hasn't resolved yet: its account is unknown, so
+# the read goes to the primary (which also caches the principal).
+UNRESOLVED = object()
+
+
+class Replica:
+    def __init__(self, name: str, engine):
+        self.name = name
+        self.engine = engine
+        self.sessionmaker = make_async_sessionmaker(engine)
+        # None until the first successful check, and while unreachable.
+        self.lag: Optional[float] = None
+        self.checked_at: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def usable(self) -> bool:
+        return self.lag is not None and self.lag <= REPLICA_MAX_LAG_SECONDS
+
+    def mark_unreachable(self, exc: BaseException):
+        if self.lag is not None:
+            logger.warning("Replica %s is unreachable, reading from the primary: %s", self.name, exc)
+        self.lag = None
+        self.error = f"{type(exc).__name__}: {exc}"
+        metrics.DB_REPLICA_LAG.labels(self.name).set(float("nan"))
+
+
+class InMemoryPins:
+    def __init__(self):
+        # account -> True while it must read from the primary
+        self._pinned = TTLCache(READ_YOUR_WRITES_PRINCIPALS, READ_YOUR_WRITES_SECONDS)
+
+    async def pin(self, accounts: Iterable[str]):
+        for account in accounts:
+            self._pinned.set(account, True)
+
+    async def is_pinned(self, account: str) -> bool:
+        return self._pinned.get(account) is not MISSING
+
+
+class RedisPins:
+    """
+    The same pins shared by every API process: one key per account, expiring
+    with the window. A read costs one EXISTS.
+    """
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+
+    async def pin(self, accounts: Iterable[str]):
+        async with self.client.pipeline(transaction=False) as pipe:
+            for account in accounts:
+                pipe.set(f"readyourwrites:{account}", 1, px=int(READ_YOUR_WRITES_SECONDS * 1000))
+            await pipe.execute()
+
+    async def is_pinned(self, account: str) -> bool:
+        return bool(await self.client.exists(f"readyourwrites:{account}"))
+
+
+def _create_pins():
+    if READ_YOUR_WRITES_BACKEND == "redis":
+        return RedisPins(READ_YOUR_WRITES_REDIS_URL)
+    return InMemoryPins()
+
+
+class ReadRouter:
+    def __init__(self):
+        self.replicas: List[Replica] = []
+        self._next = itertools.count()
+        self._pins = _create_pins()
+        self._monitor = None
+
+    async def start(self):
+        self.replicas = [Replica(f"replica-{index}", engine) for index, engine in enumerate(get_replica_engines())]
+        if not self.replicas:
+            return
+        for replica in self.replicas:
+            metrics.instrument_queries(replica.engine)
+        await self.check()
+        self._monitor = asyncio.create_task(self._monitor_forever())
+
+    async def stop(self):
+        if self._monitor is not None:
+            self._monitor.cancel()
+            try:
+                await self._monitor
+            except asyncio.CancelledError:
+                pass
+            self._monitor = None
+
+    async def _check(self, replica: Replica):
+        try:
+            async with replica.engine.connect() as connection:
+                lag = float((await connection.execute(text(REPLICA_LAG_QUERY))).scalar_one())
+        except Exception as exc:
+            replica.mark_unreachable(exc)
+            return
+        if replica.usable and lag > REPLICA_MAX_LAG_SECONDS:
+            logger.warning("Replica %s is %.1f s behind, reading from the primary", replica.name, lag)
+        replica.lag = lag
+        replica.error = None
+        replica.checked_at = time.time()
+        metrics.DB_REPLICA_LAG.labels(replica.name).set(lag)
+
+    async def check(self):
+        async def bounded(replica):
+            try:
+                await asyncio.wait_for(self._check(replica), timeout=REPLICA_CHECK_TIMEOUT)
+            except asyncio.TimeoutError as exc:
+                replica.mark_unreachable(exc)
+
+        await asyncio.gather(*(bounded(replica) for replica in self.replicas))
+
+    async def _monitor_forever(self):
+        while True:
+            await asyncio.sleep(REPLICA_LAG_CHECK_SECONDS)
+            await self.check()
+
+    async def note_write(self, accounts: Iterable[str]):
+        accounts = set(accounts)
+        if accounts and self.replicas:
+            await self._pins.pin(accounts)
+
+    async def choose(self, account) -> Optional[Replica]:
+        """
+        A usable replica (round robin) for the account, or None to read from
+        the primary.
+        """
+        if not self.replicas or account is UNRESOLVED:
+            return None
+        if account is not None and await self._pins.is_pinned(account):
+            return None
+        usable = [replica for replica in self.replicas if replica.usable]
+        if not usable:
+            return None
+        return usable[next(self._next) % len(usable)]
+
+    def status(self) -> List[dict]:
+        return [
+            {"name": replica.name, "usable": replica.usable, "lag_seconds": replica.lag, "checked_at": replica.checked_at, "error": replica.error}
+            for replica in self.replicas
+        ]
+
+
+router = ReadRouter()
+
+
+def user_account(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def verifier_account(verifier_id: int) -> str:
+    return f"verifier:{verifier_id}"
+
+
+def account_of(headers, client):
+    """
+    The account a request acts as, for read-your-writes pinning: the same
+    for an API key and a bearer token of one verifier. UNRESOLVED for an API
+    key that isn't cached here, None if there is nothing to go on.
+    """
+    api_key = headers.get("api-key")
+    if api_key:
+        principal = api_key_cache.get(security.hash_api_key(api_key))
+        if principal is MISSING:
+            return UNRESOLVED
+        return verifier_account(principal.id) if principal is not None else None
+    authorization = headers.get("authorization")
+    if authorization:
+        scheme, _, token = authorization.partition(" ")
+        claims = security.decode_access_token(token) if scheme.lower() == "bearer" else None
+        if claims and claims.get("type") == "user" and "uid" in claims:
+            return user_account(claims["uid"])
+        if claims and claims.get("type") == "verifier" and "vid" in claims:
+            return verifier_account(claims["vid"])
+        return None
+    return f"addr:{client[0]}" if client else None
+
+
+def pin_account(request: Request, account: str):
+    """
+    Pins another account along with the caller if this write succeeds, for
+    routes that change data someone else reads (e.g. a status callback).
+    """
+    request.scope.setdefault(PINNED_ACCOUNTS_SCOPE_KEY, set()).add(account)
+
+
+async def get_read_db(request: Request, response: Response):
+    """
+    A session for a read-only route: on a replica when one is usable, else
+    on the primary. A replica that fails to connect falls back at once.
+    """
+    replica = await router.choose(account_of(request.headers, request.client))
+    if replica is not None:
+        db = replica.sessionmaker(info={"replica": replica.name})
+        try:
+            await db.connection()
+        except (DBAPIError, OSError) as exc:
+            await db.close()
+            replica.mark_unreachable(exc)
+        else:
+            response.headers["X-DB-Route"] = replica.name
+            metrics.DB_READ_SESSIONS.labels(replica.name).inc()
+            try:
+                yield db
+            finally:
+                await db.close()
+            return
+    response.headers["X-DB-Route"] = "primary"
+    metrics.DB_READ_SESSIONS.labels("primary").inc()
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+class ReadYourWritesMiddleware:
+    """
+    Pins the account of every successful write request (and any accounts
+    the route added with `pin_account`) to the primary. Pure ASGI; it notes
+    the write as the response starts, so the pin is in place before the
+    client can send its next request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            return await self.app(scope, receive, send)
+
+        async def send_and_note(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                accounts = set(scope.get(PINNED_ACCOUNTS_SCOPE_KEY, ()))
+                # Resolved after the route ran, so an API key is in the cache by now.
+                caller = account_of(Headers(scope=scope), scope.get("client"))
+                if caller is not None and caller is not UNRESOLVED:
+                    accounts.add(caller)
+                await router.note_write(accounts)
+            await send(message)
+
+        await self.app(scope, receive, send_and_note)
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, EmailStr, ConfigDict
+from pydantic import BaseModel, EmailStr, ConfigDict, Field, HttpUrl
 from typing import Optional, List
 import datetime
+import enum
 
 # --- Pydantic V2 Configuration ---
 # We create a base class that uses the new `from_attributes` config.
@@ -10,6 +11,39 @@ class AppBaseModel(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+# =================================================================
+# === Enumerations ================================================
+# =================================================================
+# Stored as SMALLINT codes (see models.ENUM_CODES); the API and events keep
+# using the string values. A new member needs a code there too.
+
+class StrEnum(str, enum.Enum):
+    def __str__(self):
+        return self.value
+
+class RequestStatus(StrEnum):
+    pending = "pending"
+    completed = "completed"
+    failed = "failed"
+    # Left pending past the archive retention window (see archival.py); not a result.
+    expired = "expired"
+
+class VerificationResult(StrEnum):
+    no = "No"
+    yes = "Yes"
+
+FINAL_STATUSES = (RequestStatus.completed, RequestStatus.failed)
+
+# The only status changes a request may make: a pending request gets exactly
+# one final outcome, after which it never changes again.
+ALLOWED_TRANSITIONS = {
+    RequestStatus.pending: {RequestStatus.completed, RequestStatus.failed},
+}
+
+# Policy names live in the `policies` lookup table; this only checks their shape.
+POLICY_NAME_PATTERN = r"^[A-Za-z][A-Za-z0-9_]{0,63}$"
+
+
 # =================================================================
 # === Forward Declarations for Nested Schemas =====================
 # =================================================================
@@ -19,8 +53,8 @@ class AppBaseModel(BaseModel):
 class VerificationRequestBase(AppBaseModel):
     id: int
     policy_to_check: str
-    status: str
-    result: Optional[str] = None
+    status: RequestStatus
+    result: Optional[VerificationResult] = None
     etherscan_url: Optional[str] = None
     created_at: datetime.datetime
 
@@ -53,16 +87,64 @@ class VerifierCreate(BaseModel):
     password: str
 
 class Verifier(VerifierBase):
-    # This schema represents a full Verifier object, including their API key and requests.
-    api_key: str
+    # This schema represents a full Verifier object, including their requests.
+    # Only the API key prefix is shown; the key itself is never stored.
+    api_key_prefix: str
     is_active: bool
     verification_requests: List[VerificationRequestBase] = []
 
+class VerifierWithApiKey(Verifier):
+    # Returned only when a key is created or rotated.
+    api_key: str
+
+class VerifierPrincipal(AppBaseModel):
+    # The slim, cacheable identity resolved from an API key.
+    id: int
+    company_name: str
+    is_active: bool
+    # Admission limits; None means the ratelimit.py default.
+    rate_limit_per_second: Optional[float] = None
+    rate_limit_burst: Optional[int] = None
+    max_concurrent_requests: Optional[int] = None
+
+
+class VerifierActive(BaseModel):
+    # Set by the issuer's admin to suspend or reinstate a verifier.
+    is_active: bool
+
+
+class WebhookConfig(BaseModel):
+    # Set `url` to null to turn webhooks off.
+    url: Optional[HttpUrl] = None
+
+class WebhookSettings(AppBaseModel):
+    # The secret is used to sign deliveries (see webhooks.sign).
+    webhook_url: Optional[str] = None
+    webhook_secret: Optional[str] = None
+
+
+# --- Slim Profiles ---
+# Used by the lookup endpoints, which are called on every login and must not
+# drag the principal's whole request history along with them.
+class UserProfile(UserBase):
+    pass
+
+class VerifierProfile(VerifierBase):
+    api_key_prefix: str
+    is_active: bool
+
 
 # --- Verification Request Schemas ---
 class VerificationRequestCreate(BaseModel):
     user_id: int
-    policy: str
+    policy: str = Field(..., pattern=POLICY_NAME_PATTERN)
+
+# Batches are inserted with one multi-row INSERT, so they are capped well below
+# Postgres' 32767 bind-parameter limit (4 parameters per row).
+MAX_BATCH_SIZE = 5000
+
+class VerificationRequestBatchCreate(BaseModel):
+    items: List[VerificationRequestCreate] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
 
 class VerificationRequest(VerificationRequestBase):
     # This is the standard request object.
@@ -75,6 +157,61 @@ class VerificationRequestWithRelations(VerificationRequest):
     user: UserBase
     verifier: VerifierBase
 
+class VerificationStatusUpdate(BaseModel):
+    id: int
+    status: RequestStatus
+    result: Optional[VerificationResult] = None
+    etherscan_url: Optional[str] = None
+
+class VerificationStatusBatchUpdate(BaseModel):
+    items: List[VerificationStatusUpdate] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+class InclusionProof(BaseModel):
+    # Recompute anchoring.hash_leaf(leaf), fold in `proof` step by step and
+    # compare with `merkle_root`, which was submitted in `tx_hash`.
+    request_id: int
+    leaf: dict
+    leaf_hash: str
+    proof: List[dict]
+    merkle_root: str
+    leaf_count: int
+    tx_hash: Optional[str] = None
+    explorer_url: Optional[str] = None
+    anchored_at: Optional[datetime.datetime] = None
+
+class ProofSubmission(BaseModel):
+    # Same body verifier-svc's /verify expects; stored as-is for the dispatcher.
+    proof: dict
+    publicSignals: List[str]
+
+class VerificationStatusBatchResult(BaseModel):
+    # `unchanged` rows already had the submitted values (e.g. a retried
+    # callback) and were not written again. `rejected` rows were already
+    # final with a different outcome (see ALLOWED_TRANSITIONS).
+    updated: List[int]
+    unchanged: List[int]
+    rejected: List[int] = []
+    missing: List[int]
+
+class VerificationRequestBatchItemResult(AppBaseModel):
+    # One entry per submitted item, in the same order. Exactly one of
+    # `request` or `error` is set.
+    index: int
+    user_id: int
+    request: Optional[VerificationRequest] = None
+    error: Optional[str] = None
+
+class VerificationRequestBatchResult(AppBaseModel):
+    created: int
+    failed: int
+    results: List[VerificationRequestBatchItemResult]
+
+class VerificationRequestPage(AppBaseModel):
+    # One page of requests plus an opaque cursor for the next one
+    # (None when this is the last page).
+    items: List[VerificationRequestWithRelations]
+    next_cursor: Optional[str] = None
+
 
 # =================================================================
 # === Other Schemas ===============================================
@@ -90,11 +227,41 @@ class VerifiableCredential(BaseModel):
     subject_id: int
     claim_data: dict
     signature: str
+    # Index of this credential's revocation bit in the issuer's status list.
+    status_list_index: Optional[int] = None
+
+class CredentialIssueBatch(BaseModel):
+    items: List[CredentialIssueRequest] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+class CredentialIssueBatchItemResult(BaseModel):
+    # One entry per submitted item, in order. Exactly one of
+    # `credential` or `error` is set.
+    index: int
+    user_id: int
+    credential_id: Optional[int] = None
+    credential: Optional[VerifiableCredential] = None
+    error: Optional[str] = None
+
+class CredentialIssueBatchResult(BaseModel):
+    issued: int
+    failed: int
+    elapsed_ms: float
+    credentials_per_second: Optional[float] = None
+    results: List[CredentialIssueBatchItemResult]
 
 # --- Token Schemas (for Login) ---
 class Token(BaseModel):
     access_token: str
     token_type: str
 
+# With `?profile=true` the login endpoints also return who logged in, so the
+# client doesn't have to look it up again.
+class UserToken(Token):
+    user: Optional[UserProfile] = None
+
+class VerifierToken(Token):
+    # Only the key prefix: the API key itself is never stored (see VerifierWithApiKey).
+    verifier: Optional[VerifierProfile] = None
+
 class TokenData(BaseModel):
     email: Optional[str] = None
\ No newline at end of file
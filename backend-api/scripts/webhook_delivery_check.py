@@ -0,0 +1,115 @@
+# backend-api/scripts/webhook_delivery_check.py
+"""
+Checks webhook delivery end to end against the local stub receiver
+(webhook_stub_server.py), without a database:
+
+    python scripts/webhook_delivery_check.py
+
+Starts the stub on a free loopback port, sends a batch through
+WebhookDispatcher.deliver and checks that it arrives signed (the stub
+recomputes the signature), in outbox ID order, and is marked delivered; that
+a receiver with another secret sees an invalid signature; that the same
+loopback URL is refused when it isn't in the allowlist, also by the
+transport when the up-front check is skipped (as if DNS changed in
+between); and that idle per-verifier slots are dropped. Exits 1 on failure.
+"""
+import asyncio
+import datetime
+import json
+import os
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import webhooks
+from webhook_stub_server import make_handler
+
+SECRET = "whsec-check"
+
+
+class RecordingDispatcher(webhooks.WebhookDispatcher):
+    """
+    Records outcomes instead of writing them to the outbox.
+    """
+
+    def __init__(self):
+        super().__init__(session_factory=None)
+        self.delivered, self.failed = [], []
+
+    async def _mark_delivered(self, ids):
+        self.delivered.extend(ids)
+
+    async def _mark_failed(self, ids, error):
+        self.failed.append((ids, error))
+
+
+def start_stub(secret: str, received: list) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(secret, 0.0, received))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def rows(ids, url=None, secret=None):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return [
+        SimpleNamespace(
+            id=i, verifier_id=1, webhook_url=url, webhook_secret=secret,
+            event_type="request.updated", created_at=now, payload=json.dumps({"request_id": i}),
+        )
+        for i in ids
+    ]
+
+
+async def main() -> bool:
+    ok = True
+
+    def check(label: str, passed: bool):
+        nonlocal ok
+        ok = ok and passed
+        print(f"{'ok  ' if passed else 'FAIL'} {label}")
+
+    received = []
+    server = start_stub(SECRET, received)
+    url = f"http://127.0.0.1:{server.server_address[1]}/hook"
+    webhooks.WEBHOOK_ALLOWED_HOSTS = ["127.0.0.1"]
+    try:
+        dispatcher = RecordingDispatcher()
+        # Claimed out of order, as RETURNING may hand them back.
+        for verifier_id, batch_url, secret, batch in webhooks.batch_rows(rows([7, 3, 5], url, SECRET)):
+            await dispatcher.deliver(verifier_id, batch_url, secret, batch)
+        check("delivery arrives with a valid signature", received[-1:] == [([3, 5, 7], "valid")])
+        check("delivery is marked delivered", dispatcher.delivered == [3, 5, 7] and not dispatcher.failed)
+
+        await dispatcher.deliver(1, url, "another-secret", rows([8]))
+        check("a different secret fails the receiver's check", received[-1:] == [([8], "INVALID")])
+
+        webhooks.WEBHOOK_ALLOWED_HOSTS = []
+        before = len(received)
+        await dispatcher.deliver(1, url, SECRET, rows([9]))
+        check("loopback URL is refused without an allowlist entry", len(received) == before and dispatcher.failed[-1][0] == [9])
+
+        async def passes(url, allowed=None):
+            pass
+
+        # A fresh client: the first one keeps a connection from the allowed deliveries.
+        fresh = RecordingDispatcher()
+        check_destination, webhooks.check_destination = webhooks.check_destination, passes
+        try:
+            await fresh.deliver(1, url, SECRET, rows([10]))
+        finally:
+            webhooks.check_destination = check_destination
+            await fresh.client.aclose()
+        check("the transport refuses the address at connect time", len(received) == before and fresh.failed[-1][0] == [10])
+        check("idle verifier slots are dropped", dispatcher._verifier_slots == {} and fresh._verifier_slots == {})
+        await dispatcher.client.aclose()
+    finally:
+        server.shutdown()
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
@@ -0,0 +1,71 @@
+# backend-api/scripts/webhook_stub_server.py
+"""
+A local stand-in for a verifier's webhook endpoint, for trying out the
+dispatcher in webhooks.py end to end.
+
+    python scripts/webhook_stub_server.py --port 9000 --secret <webhook_secret>
+
+Point a verifier at it with PUT /verifiers/webhook {"url": "http://localhost:9000/hook"}
+(with WEBHOOK_ALLOWED_HOSTS=localhost, since loopback hosts are refused otherwise).
+scripts/webhook_delivery_check.py runs the signature check against it unattended.
+Each delivery is printed with its signature check; --fail-rate makes a share
+of deliveries answer 500 to exercise retries and backoff.
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SIGNATURE_HEADER = "X-ZKKYC-Signature"  # same as webhooks.SIGNATURE_HEADER
+
+
+def signature_ok(secret: str, header: str, body: bytes, tolerance: int = 300) -> bool:
+    try:
+        parts = dict(part.split("=", 1) for part in header.split(","))
+        timestamp = int(parts["t"])
+    except (ValueError, KeyError):
+        return False
+    if abs(time.time() - timestamp) > tolerance:
+        return False
+    expected = hmac.new(secret.encode(), f"{timestamp}.".encode() + body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, parts.get("v1", ""))
+
+
+def make_handler(secret, fail_rate, received=None):
+    """
+    `received`, if given, collects (event ids, signature verdict) per delivery.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like a real endpoint
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            events = json.loads(body).get("events", [])
+            checked = "unchecked"
+            if secret:
+                checked = "valid" if signature_ok(secret, self.headers.get(SIGNATURE_HEADER, ""), body) else "INVALID"
+            failing = random.random() < fail_rate
+            if received is not None:
+                received.append(([e["id"] for e in events], checked))
+            print(f"{len(events)} event(s), ids={[e['id'] for e in events]}, signature={checked}, reply={'500' if failing else '204'}")
+            self.send_response(500 if failing else 204)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--secret", default=None)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    print(f"Webhook stub listening on http://localhost:{args.port}/")
+    ThreadingHTTPServer(("", args.port), make_handler(args.secret, args.fail_rate)).serve_forever()
@@ -1,26 +1,159 @@
 # backend-api/security.py
+import os
+import hashlib
+import secrets
+import time
+from functools import lru_cache
+from typing import Dict, Optional
 from passlib.context import CryptContext
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
 
+from cache import MISSING, TTLCache
+
 # --- Hashing (already exists) ---
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Cost factor for new hashes. Hashes below it are flagged by `needs_update`
+# and get rehashed the next time the user logs in.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS, bcrypt__min_rounds=BCRYPT_ROUNDS)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str):
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
-# --- JWT Token Creation (NEW) ---
-# These should be in your .env file in a real app
-SECRET_KEY = "holathisis123hola@$"
+# --- API Keys ---
+# API keys are random, high-entropy secrets, so a plain SHA-256 is enough to
+# store and look them up without keeping the raw key anywhere.
+API_KEY_PREFIX_LENGTH = 8
+
+def generate_api_key() -> str:
+    return secrets.token_urlsafe(32)
+
+def hash_api_key(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+# --- JWT Access Tokens ---
+# Signing keys as "kid:secret,kid:secret". New tokens are signed with
+# JWT_ACTIVE_KID (default: the first key) and name it in their `kid` header;
+# every listed key is accepted. To rotate, add the new key, make it active,
+# and remove the old one once ACCESS_TOKEN_EXPIRE_MINUTES have passed.
+# SECRET_KEY alone is the same as JWT_SIGNING_KEYS="default:<SECRET_KEY>".
+JWT_SIGNING_KEYS = os.getenv("JWT_SIGNING_KEYS", "")
+JWT_ACTIVE_KID = os.getenv("JWT_ACTIVE_KID")
+SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
+# Tokens whose signature has been checked, by SHA-256 of the token, each kept
+# until it expires. 0 checks every token in full.
+VERIFIED_TOKEN_CACHE_SIZE = int(os.getenv("VERIFIED_TOKEN_CACHE_SIZE", "10000"))
+
+
+class SigningKeys:
+    def __init__(self, keys: Dict[str, str], active_kid: str):
+        if active_kid not in keys:
+            raise ValueError(f"JWT_ACTIVE_KID {active_kid!r} is not one of the JWT_SIGNING_KEYS")
+        self.keys = keys
+        self.active_kid = active_kid
+
+    @property
+    def active_secret(self) -> str:
+        return self.keys[self.active_kid]
+
+
+@lru_cache(maxsize=1)
+def get_signing_keys() -> SigningKeys:
+    """
+    The key set, read from the environment once per process (main.py loads
+    it at startup so a bad configuration fails there).
+    """
+    keys = {}
+    for entry in filter(None, (part.strip() for part in JWT_SIGNING_KEYS.split(","))):
+        kid, sep, secret = entry.partition(":")
+        if not sep or not kid or not secret:
+            raise ValueError("JWT_SIGNING_KEYS must look like 'kid:secret,kid:secret'")
+        keys[kid] = secret
+    if not keys and SECRET_KEY:
+        keys["default"] = SECRET_KEY
+    if not keys:
+        raise ValueError("Set SECRET_KEY or JWT_SIGNING_KEYS to sign access tokens.")
+    return SigningKeys(keys, JWT_ACTIVE_KID or next(iter(keys)))
+
+
+verified_tokens = TTLCache(VERIFIED_TOKEN_CACHE_SIZE, 0)
 
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
\ No newline at end of file
+    signing_keys = get_signing_keys()
+    encoded_jwt = jwt.encode(to_encode, signing_keys.active_secret, algorithm=ALGORITHM, headers={"kid": signing_keys.active_kid})
+    return encoded_jwt
+
+def verify_access_token(token: str) -> Optional[dict]:
+    """
+    Checks the token's signature and expiry with the key its `kid` names
+    (the active key if it names none). Returns its claims, or None if it is
+    malformed, forged, expired or signed with an unknown key.
+    """
+    signing_keys = get_signing_keys()
+    try:
+        kid = jwt.get_unverified_header(token).get("kid") or signing_keys.active_kid
+        secret = signing_keys.keys.get(kid)
+        if secret is None:
+            return None
+        return jwt.decode(token, secret, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+
+def decode_access_token(token: str) -> Optional[dict]:
+    """
+    `verify_access_token` behind the verified-token cache. Only valid tokens
+    are cached, and only until their `exp`.
+    """
+    digest = hashlib.sha256(token.encode()).digest()
+    claims = verified_tokens.get(digest)
+    if claims is not MISSING:
+        return claims
+    claims = verify_access_token(token)
+    if claims is not None:
+        verified_tokens.set(digest, claims, ttl=claims["exp"] - time.time())
+    return claims
+
+# --- Credential Issuer ---
+# Verifiable Credentials are signed JWTs with their own key (required, and
+# separate from the token keys): an HMAC secret or a PEM private key for
+# RS256/ES256. Their header names it as ISSUER_DID#ISSUER_KEY_ID, so a
+# holder can tell which key to check even after the issuer adds another.
+ISSUER_DID = os.getenv("ISSUER_DID", "did:example:zkkyc-issuer")
+ISSUER_SIGNING_KEY = os.getenv("ISSUER_SIGNING_KEY")
+ISSUER_ALGORITHM = os.getenv("ISSUER_ALGORITHM", ALGORITHM)
+ISSUER_KEY_ID = os.getenv("ISSUER_KEY_ID", "key-1")
+# Shared secret for the issuer's admin routes (issuance, revocation), sent as the
+# `issuer-admin-key` header. Unset, those routes refuse every caller.
+ISSUER_ADMIN_KEY = os.getenv("ISSUER_ADMIN_KEY")
+
+def is_issuer_admin_key(candidate: str) -> bool:
+    return bool(ISSUER_ADMIN_KEY) and secrets.compare_digest(candidate.encode(), ISSUER_ADMIN_KEY.encode())
+
+# Shared secret the verifier service sends as the `verifier-service-key`
+# header on its status callbacks. Unset, those routes refuse every caller.
+VERIFIER_SERVICE_KEY = os.getenv("VERIFIER_SERVICE_KEY")
+
+def is_verifier_service_key(candidate: str) -> bool:
+    return bool(VERIFIER_SERVICE_KEY) and secrets.compare_digest(candidate.encode(), VERIFIER_SERVICE_KEY.encode())
+
+def get_issuer_signing_key() -> str:
+    """
+    The credential signing key. Credentials outlive access tokens by years, so
+    they never share the (rotating) token keys; main.py checks this at startup.
+    """
+    if not ISSUER_SIGNING_KEY:
+        raise ValueError("Set ISSUER_SIGNING_KEY to sign credentials.")
+    if ISSUER_SIGNING_KEY in get_signing_keys().keys.values():
+        raise ValueError("ISSUER_SIGNING_KEY must differ from the access token keys.")
+    return ISSUER_SIGNING_KEY
\ No newline at end of file
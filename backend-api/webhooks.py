@@ -0,0 +1,347 @@
+# backend-api/webhooks.py
+"""
+Delivers webhook events from the `webhook_outbox` table to each verifier's
+`webhook_url`. Run it next to the API (any number of copies):
+
+    python webhooks.py
+
+URLs whose host resolves to a loopback, private (RFC 1918 / unique local),
+link-local or otherwise non-public address are refused, both when a
+verifier sets one and on each delivery, unless WEBHOOK_ALLOWED_HOSTS
+lists the host or a network holding the address. Deliveries connect to
+the address that passed the check (see VettedNetworkBackend), so a host
+can't be re-pointed at an internal address between check and connect.
+"""
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import json
+import logging
+import os
+import socket
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Sequence
+
+import httpcore
+import httpx
+from sqlalchemy import case, func, literal_column, select, update
+
+import models
+from database import AsyncSessionLocal
+
+logger = logging.getLogger("webhooks")
+
+# --- Dispatcher Settings ---
+WEBHOOK_POLL_INTERVAL = float(os.getenv("WEBHOOK_POLL_INTERVAL", "1.0"))
+# Events claimed per poll, and how many of one verifier's events go in one POST.
+WEBHOOK_CLAIM_SIZE = int(os.getenv("WEBHOOK_CLAIM_SIZE", "500"))
+WEBHOOK_MAX_EVENTS_PER_POST = int(os.getenv("WEBHOOK_MAX_EVENTS_PER_POST", "100"))
+# Concurrent POSTs to any one verifier, so one slow endpoint can't hog the worker.
+WEBHOOK_PER_VERIFIER_CONCURRENCY = int(os.getenv("WEBHOOK_PER_VERIFIER_CONCURRENCY", "2"))
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "100"))
+WEBHOOK_TIMEOUT = float(os.getenv("WEBHOOK_TIMEOUT", "10"))
+# Retry delay is BASE * 2^attempts seconds (with jitter), capped at MAX.
+WEBHOOK_BACKOFF_BASE = float(os.getenv("WEBHOOK_BACKOFF_BASE", "2"))
+WEBHOOK_BACKOFF_MAX = float(os.getenv("WEBHOOK_BACKOFF_MAX", "3600"))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "12"))
+# A claimed event is hidden from other workers for this long. If a worker
+# dies mid-delivery, the event becomes due again when the lease runs out.
+WEBHOOK_LEASE_SECONDS = float(os.getenv("WEBHOOK_LEASE_SECONDS", "300"))
+
+# Comma-separated host names and IP networks (e.g. "hooks.internal,10.1.0.0/16")
+# that may receive webhooks even though they resolve to non-public addresses.
+WEBHOOK_ALLOWED_HOSTS = [host.strip() for host in os.getenv("WEBHOOK_ALLOWED_HOSTS", "").split(",") if host.strip()]
+
+SIGNATURE_HEADER = "X-ZKKYC-Signature"
+
+
+class DestinationRejected(Exception):
+    pass
+
+
+def _is_public(address) -> bool:
+    if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped is not None:
+        address = address.ipv4_mapped
+    return not (
+        address.is_loopback or address.is_private or address.is_link_local
+        or address.is_multicast or address.is_reserved or address.is_unspecified
+    )
+
+
+def _allowed(host: str, address, allowed: Sequence[str]) -> bool:
+    for entry in allowed:
+        if entry.lower() == host.lower():
+            return True
+        try:
+            if address in ipaddress.ip_network(entry, strict=False):
+                return True
+        except ValueError:
+            continue
+    return False
+
+
+async def resolve_destination(host: str, port: int, allowed: Optional[Sequence[str]] = None) -> str:
+    """
+    Resolves `host` and returns the address to connect to. Raises
+    DestinationRejected if any of its addresses is non-public and not
+    allowed (see WEBHOOK_ALLOWED_HOSTS).
+    """
+    allowed = WEBHOOK_ALLOWED_HOSTS if allowed is None else allowed
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as exc:
+        raise DestinationRejected(f"Cannot resolve {host}: {exc}")
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%", 1)[0])
+        if not _is_public(address) and not _allowed(host, address, allowed):
+            raise DestinationRejected(f"{host} resolves to non-public address {address}")
+    return infos[0][4][0]
+
+
+async def check_destination(url: str, allowed: Optional[Sequence[str]] = None):
+    """
+    Raises DestinationRejected unless the URL is http(s) and its host passes
+    `resolve_destination`.
+    """
+    parsed = httpx.URL(url)
+    if parsed.scheme not in ("http", "https") or not parsed.host:
+        raise DestinationRejected(f"{url} is not an http(s) URL")
+    await resolve_destination(parsed.host, parsed.port or (443 if parsed.scheme == "https" else 80), allowed)
+
+
+class VettedNetworkBackend(httpcore.AsyncNetworkBackend):
+    """
+    Opens delivery connections to the address `resolve_destination` vetted,
+    in the same step as the check. Letting httpx resolve the host again
+    would allow DNS rebinding: a public answer for the check, then a
+    private one for the connection. TLS still uses the URL's host name for
+    SNI and certificate checks, and the Host header is unchanged.
+    """
+
+    def __init__(self, allowed: Optional[Sequence[str]] = None):
+        self.allowed = allowed
+        self._backend = httpcore.AnyIOBackend()
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        address = await resolve_destination(host, port, self.allowed)
+        return await self._backend.connect_tcp(address, port, timeout=timeout, local_address=local_address, socket_options=socket_options)
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        raise DestinationRejected("Webhooks can't be delivered over a Unix socket")
+
+    async def sleep(self, seconds: float):
+        await self._backend.sleep(seconds)
+
+
+def delivery_transport(allowed: Optional[Sequence[str]] = None) -> httpx.AsyncHTTPTransport:
+    """
+    An httpx transport whose connections go through VettedNetworkBackend.
+    Passing a transport also keeps httpx from using proxies from the
+    environment, which would resolve the host themselves.
+    """
+    transport = httpx.AsyncHTTPTransport()
+    # httpx has no public hook for the network backend; swap in a pool built with ours.
+    transport._pool = httpcore.AsyncConnectionPool(
+        ssl_context=httpx.create_ssl_context(),
+        max_connections=WEBHOOK_MAX_CONNECTIONS,
+        max_keepalive_connections=WEBHOOK_MAX_CONNECTIONS,
+        keepalive_expiry=5.0,
+        network_backend=VettedNetworkBackend(allowed),
+    )
+    return transport
+
+
+def sign(secret: str, timestamp: int, body: bytes) -> str:
+    """
+    Signature header value: `t=<unix time>,v1=<hex HMAC-SHA256 of "<t>.<body>">`.
+    Receivers should recompute it and reject stale timestamps.
+    """
+    digest = hmac.new(secret.encode(), f"{timestamp}.".encode() + body, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={digest}"
+
+
+def _seconds(expr):
+    return expr * literal_column("interval '1 second'")
+
+
+def batch_rows(rows: List):
+    """
+    Groups claimed rows per verifier into POST-sized batches, each in outbox
+    ID order (RETURNING gives them back in no particular order). Yields
+    (verifier_id, url, secret, rows).
+    """
+    by_verifier = defaultdict(list)
+    for row in rows:
+        by_verifier[(row.verifier_id, row.webhook_url, row.webhook_secret)].append(row)
+    for (verifier_id, url, secret), verifier_rows in by_verifier.items():
+        verifier_rows.sort(key=lambda row: row.id)
+        for start in range(0, len(verifier_rows), WEBHOOK_MAX_EVENTS_PER_POST):
+            yield verifier_id, url, secret, verifier_rows[start:start + WEBHOOK_MAX_EVENTS_PER_POST]
+
+
+class _VerifierSlot:
+    def __init__(self):
+        self.semaphore = asyncio.Semaphore(WEBHOOK_PER_VERIFIER_CONCURRENCY)
+        self.users = 0
+
+
+class WebhookDispatcher:
+    """
+    Claims due outbox events, coalesces them per verifier into batched POSTs
+    over a pooled keep-alive client, and records the outcome. Delivery is
+    at-least-once: receivers should dedupe on the event `id`.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal, client: Optional[httpx.AsyncClient] = None):
+        self.session_factory = session_factory
+        self.client = client or httpx.AsyncClient(timeout=WEBHOOK_TIMEOUT, transport=delivery_transport())
+        # Only verifiers with deliveries running or waiting have a slot.
+        self._verifier_slots: Dict[int, _VerifierSlot] = {}
+        self._in_flight = set()
+
+    @asynccontextmanager
+    async def _verifier_slot(self, verifier_id: int):
+        """
+        Holds one of the verifier's WEBHOOK_PER_VERIFIER_CONCURRENCY slots.
+        The last user removes the entry, so the dict doesn't grow with every
+        verifier ever delivered to.
+        """
+        slot = self._verifier_slots.get(verifier_id)
+        if slot is None:
+            slot = self._verifier_slots[verifier_id] = _VerifierSlot()
+        slot.users += 1
+        try:
+            async with slot.semaphore:
+                yield
+        finally:
+            slot.users -= 1
+            if slot.users == 0:
+                del self._verifier_slots[verifier_id]
+
+    async def claim(self) -> List:
+        outbox = models.WebhookOutbox
+        due = (
+            select(outbox.id)
+            .filter(outbox.delivered_at.is_(None), outbox.failed_at.is_(None), outbox.next_attempt_at <= func.now())
+            .order_by(outbox.next_attempt_at)
+            .limit(WEBHOOK_CLAIM_SIZE)
+            .with_for_update(skip_locked=True)
+        )
+        async with self.session_factory() as db:
+            result = await db.execute(
+                update(outbox)
+                .where(outbox.id.in_(due.scalar_subquery()))
+                .where(models.Verifier.id == outbox.verifier_id)
+                .values(next_attempt_at=func.now() + _seconds(WEBHOOK_LEASE_SECONDS))
+                .returning(
+                    outbox.id, outbox.verifier_id, outbox.event_type, outbox.payload, outbox.created_at,
+                    models.Verifier.webhook_url, models.Verifier.webhook_secret,
+                )
+            )
+            rows = result.all()
+            await db.commit()
+        return rows
+
+    async def _mark_delivered(self, ids: List[int]):
+        outbox = models.WebhookOutbox
+        async with self.session_factory() as db:
+            await db.execute(update(outbox).where(outbox.id.in_(ids)).values(delivered_at=func.now(), last_error=None))
+            await db.commit()
+
+    async def _mark_failed(self, ids: List[int], error: str):
+        outbox = models.WebhookOutbox
+        delay = func.least(WEBHOOK_BACKOFF_MAX, WEBHOOK_BACKOFF_BASE * func.power(2, outbox.attempts) * (0.5 + func.random()))
+        async with self.session_factory() as db:
+            await db.execute(
+                update(outbox).where(outbox.id.in_(ids)).values(
+                    attempts=outbox.attempts + 1,
+                    last_error=error[:500],
+                    next_attempt_at=func.now() + _seconds(delay),
+                    failed_at=case((outbox.attempts + 1 >= WEBHOOK_MAX_ATTEMPTS, func.now()), else_=None),
+                )
+            )
+            await db.commit()
+
+    async def deliver(self, verifier_id: int, url: Optional[str], secret: Optional[str], rows: List):
+        ids = [row.id for row in rows]
+        if not url:
+            # The webhook was removed after these events were queued.
+            await self._mark_failed(ids, "webhook_url is not set")
+            return
+        # Checked on every delivery (the host's DNS may have changed since it
+        # was set); the transport re-checks whatever address it connects to.
+        try:
+            await check_destination(url)
+        except DestinationRejected as exc:
+            logger.warning("Webhook delivery to verifier %s refused: %s", verifier_id, exc)
+            await self._mark_failed(ids, str(exc))
+            return
+        body = json.dumps({
+            "events": [
+                {"id": row.id, "type": row.event_type, "created_at": row.created_at.isoformat(), "data": json.loads(row.payload)}
+                for row in rows
+            ]
+        }, separators=(",", ":")).encode()
+        headers = {"Content-Type": "application/json"}
+        if secret:
+            headers[SIGNATURE_HEADER] = sign(secret, int(time.time()), body)
+        async with self._verifier_slot(verifier_id):
+            try:
+                response = await self.client.post(url, content=body, headers=headers)
+                error = None if 200 <= response.status_code < 300 else f"HTTP {response.status_code}"
+            except DestinationRejected as exc:
+                error = str(exc)
+            except httpx.HTTPError as exc:
+                error = f"{type(exc).__name__}: {exc}"
+        if error is None:
+            await self._mark_delivered(ids)
+        else:
+            logger.warning("Webhook delivery to verifier %s failed (%d events): %s", verifier_id, len(ids), error)
+            await self._mark_failed(ids, error)
+
+    async def run_once(self) -> int:
+        """
+        Claims one round of events and starts their deliveries in the
+        background. Returns the number of events claimed.
+        """
+        if len(self._in_flight) >= WEBHOOK_MAX_CONNECTIONS:
+            return 0
+        rows = await self.claim()
+        for verifier_id, url, secret, batch in batch_rows(rows):
+            task = asyncio.create_task(self.deliver(verifier_id, url, secret, batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+        return len(rows)
+
+    async def drain(self):
+        """
+        Waits for the deliveries already started.
+        """
+        while self._in_flight:
+            await asyncio.gather(*list(self._in_flight), return_exceptions=True)
+
+    async def run_forever(self, stop: Optional[asyncio.Event] = None):
+        stop = stop or asyncio.Event()
+        try:
+            while not stop.is_set():
+                try:
+                    claimed = await self.run_once()
+                except Exception:
+                    logger.exception("Claiming webhook events failed")
+                    claimed = 0
+                if claimed < WEBHOOK_CLAIM_SIZE:
+                    try:
+                        await asyncio.wait_for(stop.wait(), timeout=WEBHOOK_POLL_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            await self.drain()
+            await self.client.aclose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(WebhookDispatcher().run_forever())
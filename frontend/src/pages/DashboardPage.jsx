@@ -8,11 +8,14 @@ const API_URL = 'http://localhost:8000';
 function DashboardPage() {
   const [verifier, setVerifier] = useState(null);
   const [requestHistory, setRequestHistory] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [userEmail, setUserEmail] = useState('');
   const [foundUserId, setFoundUserId] = useState('');
   const [findUserStatus, setFindUserStatus] = useState('');
   const [newRequestPolicy, setNewRequestPolicy] = useState('isOver18');
   const [requestStatus, setRequestStatus] = useState('');
+  const [rotatePassword, setRotatePassword] = useState('');
+  const [rotateStatus, setRotateStatus] = useState('');
   const navigate = useNavigate();
 
   useEffect(() => {
@@ -26,18 +29,39 @@ function DashboardPage() {
     }
   }, [navigate]);
 
-  const fetchRequestHistory = async (apiKey) => {
+  // Pass a cursor to append the next page; without one the history is reloaded
+  const fetchRequestHistory = async (apiKey, cursor = null) => {
     if (!apiKey) return;
     try {
       const response = await axios.get(`${API_URL}/verification/requests/verifier`, {
-        headers: { 'api-key': apiKey }
+        headers: { 'api-key': apiKey },
+        params: cursor ? { cursor } : {}
       });
-      setRequestHistory(response.data);
+      setRequestHistory(previous => cursor ? [...previous, ...response.data.items] : response.data.items);
+      setNextCursor(response.data.next_cursor);
     } catch (error) {
       console.error("Failed to fetch request history:", error);
     }
   };
 
+  const handleRotateKey = async (event) => {
+    event.preventDefault();
+    setRotateStatus('');
+    try {
+      const rotateForm = new FormData();
+      rotateForm.append('username', verifier.company_name);
+      rotateForm.append('password', rotatePassword);
+      const response = await axios.post(`${API_URL}/verifiers/api-key/rotate`, rotateForm);
+      const updatedVerifier = { ...verifier, ...response.data };
+      localStorage.setItem('verifier', JSON.stringify(updatedVerifier));
+      setVerifier(updatedVerifier);
+      setRotatePassword('');
+      fetchRequestHistory(updatedVerifier.api_key);
+    } catch (error) {
+      setRotateStatus(`Error: ${error.response?.data?.detail || "Could not generate a new key."}`);
+    }
+  };
+
   const handleSignOut = () => {
     localStorage.removeItem('verifier');
     setVerifier(null);
@@ -97,12 +121,34 @@ function DashboardPage() {
         
         <div className="lg:col-span-1 space-y-6">
           <Card title="Your API Key">
-            <div className="p-3 bg-gray-100 rounded font-mono text-sm break-all shadow-inner">
-              {verifier.api_key}
-            </div>
-            <button onClick={() => navigator.clipboard.writeText(verifier.api_key)} className="mt-3 text-sm font-medium text-indigo-600 hover:text-indigo-800">
-              Copy to Clipboard
-            </button>
+            {verifier.api_key ? (
+              <>
+                <div className="p-3 bg-gray-100 rounded font-mono text-sm break-all shadow-inner">
+                  {verifier.api_key}
+                </div>
+                <p className="mt-2 text-xs text-gray-500">Save this key now. It will not be shown again after you sign out.</p>
+                <button onClick={() => navigator.clipboard.writeText(verifier.api_key)} className="mt-3 text-sm font-medium text-indigo-600 hover:text-indigo-800">
+                  Copy to Clipboard
+                </button>
+              </>
+            ) : (
+              <form onSubmit={handleRotateKey} className="space-y-3">
+                <div className="p-3 bg-gray-100 rounded font-mono text-sm break-all shadow-inner">
+                  {verifier.api_key_prefix}…
+                </div>
+                <p className="text-xs text-gray-500">Your key is stored hashed and cannot be shown again. Confirm your password to generate a new one (the old key will stop working).</p>
+                <input
+                  type="password"
+                  placeholder="Password"
+                  value={rotatePassword}
+                  onChange={(e) => setRotatePassword(e.target.value)}
+                  className="block w-full px-3 py-2 border border-gray-300 rounded-md shadow-sm bg-white"
+                  required
+                />
+                <button type="submit" className="text-sm font-medium text-indigo-600 hover:text-indigo-800">Generate New Key</button>
+                {rotateStatus && <p className="text-sm text-red-500">{rotateStatus}</p>}
+              </form>
+            )}
           </Card>
 
           <Card title="New KYC Request">
@@ -186,6 +232,11 @@ function DashboardPage() {
                 </tbody>
               </table>
             </div>
+            {nextCursor && (
+              <button onClick={() => fetchRequestHistory(verifier.api_key, nextCursor)} className="mt-4 text-sm font-medium text-indigo-600 hover:text-indigo-800">
+                Load More
+              </button>
+            )}
           </Card>
         </div>
       </div>
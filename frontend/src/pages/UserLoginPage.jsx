@@ -29,10 +29,10 @@ function UserLoginPage() {
       loginForm.append('username', email);
       loginForm.append('password', password);
       
-      await axios.post(`${API_URL}/users/token`, loginForm);
-      
-      const userDetailsResponse = await axios.get(`${API_URL}/users/by-email/?email=${email}`);
-      localStorage.setItem('user', JSON.stringify(userDetailsResponse.data));
+      // One call: the token endpoint returns the user's profile along with the token
+      const response = await axios.post(`${API_URL}/users/token?profile=true`, loginForm);
+      // The wallet sends the token with every request for the user's own data
+      localStorage.setItem('user', JSON.stringify({ ...response.data.user, access_token: response.data.access_token }));
       navigate('/wallet');
     } catch (err) {
       setError(err.response?.data?.detail || "Login failed.");
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import Card from '../components/Card';
 import RequestCard from '../components/RequestCard';
@@ -6,7 +6,6 @@ import * as snarkjs from 'snarkjs';
 import axios from 'axios';
 
 const API_URL = 'http://localhost:8000';
-const VERIFIER_API_URL = 'http://localhost:8081';
 
 function UserWalletPage() {
   const [user, setUser] = useState(null);
@@ -14,6 +13,8 @@ function UserWalletPage() {
   const [proofingStatus, setProofingStatus] = useState('');
   const [verificationResult, setVerificationResult] = useState(null);
   const [isVerifying, setIsVerifying] = useState(false);
+  // The request whose proof we submitted; its 'updated' event carries the outcome.
+  const awaitingRequestId = useRef(null);
   const navigate = useNavigate();
 
   useEffect(() => {
@@ -21,23 +22,64 @@ function UserWalletPage() {
     if (storedUserData) {
       const parsedUser = JSON.parse(storedUserData);
       setUser(parsedUser);
-      fetchPendingRequests(parsedUser.id);
+      fetchPendingRequests(parsedUser.id, parsedUser.access_token);
     } else {
       navigate('/user-login');
     }
   }, [navigate]);
 
-  const fetchPendingRequests = async (userId) => {
+  // Live updates: the API pushes new and updated requests over Server-Sent Events,
+  // so the list stays current without polling. EventSource reconnects on its own
+  // and sends Last-Event-ID, letting the server replay anything we missed.
+  useEffect(() => {
+    if (!user) return;
+    // EventSource can't set an Authorization header, so the token goes in the query string
+    const source = new EventSource(`${API_URL}/verification/requests/user/${user.id}/events?access_token=${encodeURIComponent(user.access_token)}`);
+    source.addEventListener('created', (event) => {
+      const request = JSON.parse(event.data);
+      setPendingRequests(previous => previous.some(r => r.id === request.id) ? previous : [request, ...previous]);
+    });
+    source.addEventListener('updated', (event) => {
+      const request = JSON.parse(event.data);
+      if (request.status !== 'pending') {
+        setPendingRequests(previous => previous.filter(r => r.id !== request.id));
+      }
+      if (request.id === awaitingRequestId.current && request.status !== 'pending') {
+        awaitingRequestId.current = null;
+        const isValid = request.status === 'completed' && request.result === 'Yes';
+        setProofingStatus(`4. Request #${request.id} is ${request.status}. 🎉`);
+        setVerificationResult({
+          isValid,
+          message: isValid
+            ? 'Proof verified! The result will be anchored on chain with the next batch.'
+            : 'The verifier service rejected the proof.',
+        });
+        setIsVerifying(false);
+      }
+    });
+    source.addEventListener('snapshot', (event) => setPendingRequests(JSON.parse(event.data)));
+    return () => source.close();
+  }, [user?.id]);
+
+  const fetchPendingRequests = async (userId, accessToken) => {
     if (!userId) return;
     try {
-      const response = await axios.get(`${API_URL}/verification/requests/user/${userId}`);
-      setPendingRequests(response.data);
+      const response = await axios.get(`${API_URL}/verification/requests/user/${userId}`, {
+        headers: { Authorization: `Bearer ${accessToken}` },
+      });
+      setPendingRequests(response.data.items);
     } catch (error) {
+      if (error.response?.status === 401) {
+        // Expired or missing token: sign in again
+        localStorage.removeItem('user');
+        navigate('/user-login');
+        return;
+      }
       console.error("Failed to fetch pending requests:", error);
     }
   };
 
-  const performVerification = async (isOnChain, request) => {
+  const performVerification = async (request) => {
     setIsVerifying(true);
     setProofingStatus(`1. Starting verification for Request #${request.id}...`);
     setVerificationResult(null);
@@ -48,32 +90,24 @@ function UserWalletPage() {
       const { proof, publicSignals } = await snarkjs.plonk.fullProve(inputs, '/zk/isOver18.wasm', '/zk/isOver18.zkey');
       setProofingStatus('2. Proof generated successfully! ✅');
 
-      const endpoint = isOnChain ? '/verify-on-chain' : '/verify';
-      const statusMsg = isOnChain ? '3. Sending transaction to blockchain...' : '3. Sending proof for OFF-CHAIN verification...';
-      setProofingStatus(statusMsg);
-
-      const verifyResponse = await axios.post(`${VERIFIER_API_URL}${endpoint}`, { proof, publicSignals });
-      setVerificationResult(verifyResponse.data);
-      
-      if (verifyResponse.data.isValid) {
-        setProofingStatus('4. Verification successful! Updating status in database...');
-        await axios.put(`${API_URL}/verification/request/${request.id}`, {
-            status: 'completed',
-            result: 'Yes',
-            etherscan_url: verifyResponse.data.explorerUrl || null
-        });
-        setProofingStatus('5. Status updated! Request has been completed. 🎉');
-        // Refresh the list of pending requests, which will make this one disappear
-        fetchPendingRequests(user.id);
-      } else {
-        setProofingStatus(`4. Verification Failed: ${verifyResponse.data.message}`);
+      // The API queues the proof; its workers check it off-chain and anchor the
+      // result on chain in a batch, so no transaction is sent per proof.
+      setProofingStatus('3. Submitting proof for verification...');
+      awaitingRequestId.current = request.id;
+      await axios.post(`${API_URL}/verification/request/${request.id}/proof`, { proof, publicSignals }, {
+        headers: { Authorization: `Bearer ${user.access_token}` },
+      });
+      // Unless the outcome already arrived while the POST was in flight
+      if (awaitingRequestId.current === request.id) {
+        setProofingStatus('3. Proof submitted. Waiting for the verifier service...');
       }
+      // The 'updated' event from the server reports the outcome and ends this step
     } catch (error) {
       console.error(`Error during verification:`, error);
-      const message = error.response?.data?.message || error.message;
+      awaitingRequestId.current = null;
+      const message = error.response?.data?.detail || error.message;
       setProofingStatus(`Failed: ${message}`);
       setVerificationResult({ isValid: false, message });
-    } finally {
       setIsVerifying(false);
     }
   };
@@ -104,7 +138,7 @@ function UserWalletPage() {
                   key={request.id}
                   verifierName={request.verifier.company_name}
                   policy={request.policy_to_check}
-                  onApprove={() => performVerification(true, request)}
+                  onApprove={() => performVerification(request)}
                   onDeny={() => alert('Deny functionality not implemented.')}
                   disabled={isVerifying}
                 />
@@ -129,7 +163,6 @@ function UserWalletPage() {
             {verificationResult && !isVerifying && (
                <div className={`mt-4 p-4 rounded-lg font-bold text-center ${verificationResult.isValid ? 'bg-green-100 text-green-800' : 'bg-red-100 text-red-800'}`}>
                 <p>{verificationResult.message}</p>
-                {verificationResult.explorerUrl && (<a href={verificationResult.explorerUrl} target="_blank" rel="noopener noreferrer" className="text-sm font-normal text-blue-600 hover:underline mt-2 block">View Transaction on Etherscan</a>)}
               </div>
             )}
           </Card>
@@ -30,13 +30,12 @@ function VerifierLoginPage() {
       loginForm.append('username', companyName);
       loginForm.append('password', password);
       
-      // Step 1: Call the token endpoint to verify the password
-      await axios.post(`${API_URL}/verifiers/token`, loginForm);
-
-      // Step 2: If successful, fetch the full verifier object to get the API key
-      const verifierDetailsResponse = await axios.get(`${API_URL}/verifiers/by-name/?name=${companyName}`);
+      // One call: the token endpoint checks the password and returns the verifier's profile
+      const response = await axios.post(`${API_URL}/verifiers/token?profile=true`, loginForm);
       
-      localStorage.setItem('verifier', JSON.stringify(verifierDetailsResponse.data));
+      // The API key itself is never returned again, only right after sign-up
+      const verifierData = { ...response.data.verifier, api_key: location.state?.apiKey };
+      localStorage.setItem('verifier', JSON.stringify(verifierData));
       navigate('/'); // Redirect to dashboard
 
     } catch (err) {
@@ -16,8 +16,9 @@ function VerifierSignUpPage() {
   const handleSubmit = async (event) => {
     event.preventDefault();
     try {
-      await axios.post(`${API_URL}/verifiers/`, { company_name: companyName, password });
-      navigate('/login', { state: { message: "Account created successfully! Please sign in." } });
+      const response = await axios.post(`${API_URL}/verifiers/`, { company_name: companyName, password });
+      // The API key is only returned once, so carry it over to the login page
+      navigate('/login', { state: { message: "Account created successfully! Please sign in.", apiKey: response.data.api_key } });
     } catch (err) {
       setError(err.response?.data?.detail || "Registration failed.");
     }
@@ -1,6 +1,7 @@
 const express = require('express');
 const snarkjs = require('snarkjs');
 const fs = require('fs');
+const crypto = require('crypto');
 const cors = require('cors');
 const { ethers } = require("ethers");
 require('dotenv').config();
@@ -25,21 +26,34 @@ try {
 const SEPOLIA_RPC_URL = process.env.SEPOLIA_RPC_URL;
 const SERVER_WALLET_PRIVATE_KEY = process.env.SERVER_WALLET_PRIVATE_KEY;
 const CONTRACT_ADDRESS = process.env.CONTRACT_ADDRESS;
+// --- Merkle Root Anchoring ---
+// backend-api's anchor-worker posts one Merkle root per batch of results to
+// /anchor-root; each root goes on chain as the data of a single transaction
+// to ANCHOR_ADDRESS (the server wallet itself by default).
+const ANCHOR_API_TOKEN = process.env.ANCHOR_API_TOKEN;
+const ANCHOR_ADDRESS = process.env.ANCHOR_ADDRESS;
+const EXPLORER_TX_URL = process.env.EXPLORER_TX_URL || "https://sepolia.etherscan.io/tx/";
 let verifierContract, wallet;
 
-if (SEPOLIA_RPC_URL && SERVER_WALLET_PRIVATE_KEY && CONTRACT_ADDRESS) {
-    try {
-        const verifierABI = JSON.parse(fs.readFileSync("./keys/VerifierABI.json"));
-        const provider = new ethers.JsonRpcProvider(SEPOLIA_RPC_URL);
-        wallet = new ethers.Wallet(SERVER_WALLET_PRIVATE_KEY, provider);
-        verifierContract = new ethers.Contract(CONTRACT_ADDRESS, verifierABI, wallet);
-        console.log(`On-chain verification configured. Connected to Sepolia. Server wallet address: ${wallet.address}`);
-    } catch (e) {
-        console.log("WARNING: Could not configure on-chain verifier. Check ABI file.", e);
-        verifierContract = null;
+if (SEPOLIA_RPC_URL && SERVER_WALLET_PRIVATE_KEY) {
+    const provider = new ethers.JsonRpcProvider(SEPOLIA_RPC_URL);
+    wallet = new ethers.Wallet(SERVER_WALLET_PRIVATE_KEY, provider);
+    console.log(`Connected to Sepolia. Server wallet address: ${wallet.address}`);
+    if (CONTRACT_ADDRESS) {
+        try {
+            const verifierABI = JSON.parse(fs.readFileSync("./keys/VerifierABI.json"));
+            verifierContract = new ethers.Contract(CONTRACT_ADDRESS, verifierABI, wallet);
+            console.log("On-chain verification configured.");
+        } catch (e) {
+            console.log("WARNING: Could not configure on-chain verifier. Check ABI file.", e);
+            verifierContract = null;
+        }
     }
 } else {
-    console.log("WARNING: Missing .env variables for on-chain verification.");
+    console.log("WARNING: Missing .env variables for on-chain anchoring and verification.");
+}
+if (!ANCHOR_API_TOKEN) {
+    console.log("WARNING: ANCHOR_API_TOKEN is not set; /anchor-root refuses every caller.");
 }
 
 // =================================================================
@@ -67,6 +81,37 @@ app.post('/verify', async (req, res) => {
     }
 });
 
+app.post('/anchor-root', async (req, res) => {
+    // Spends gas, so only the anchor-worker (holding ANCHOR_API_TOKEN) may call it.
+    const token = (req.get('authorization') || '').replace(/^Bearer /, '');
+    const expected = Buffer.from(ANCHOR_API_TOKEN || '');
+    const given = Buffer.from(token);
+    if (!ANCHOR_API_TOKEN || given.length !== expected.length || !crypto.timingSafeEqual(given, expected)) {
+        return res.status(401).json({ message: "Invalid anchor token." });
+    }
+    if (!wallet) {
+        return res.status(500).json({ message: "On-chain anchoring is not configured on the server." });
+    }
+    const { root } = req.body;
+    if (typeof root !== 'string' || !/^[0-9a-f]{64}$/.test(root)) {
+        return res.status(400).json({ message: "root must be a 64-character lowercase hex SHA-256 digest." });
+    }
+    try {
+        const tx = await wallet.sendTransaction({ to: ANCHOR_ADDRESS || wallet.address, value: 0, data: `0x${root}` });
+        console.log(`Anchoring root ${root} in ${tx.hash}. Waiting for confirmation...`);
+        const receipt = await tx.wait();
+        if (receipt.status === 0) {
+            throw new Error("Anchor transaction reverted.");
+        }
+        res.status(200).json({ txHash: tx.hash, explorerUrl: `${EXPLORER_TX_URL}${tx.hash}`, blockNumber: receipt.blockNumber });
+    } catch (error) {
+        console.error("Anchoring error:", error);
+        res.status(502).json({ message: "Submitting the root failed.", error: error.message });
+    }
+});
+
+// Verifies one proof in its own transaction. The wallet no longer uses this:
+// results are anchored in batches through /anchor-root instead.
 app.post('/verify-on-chain', async (req, res) => {
     if (!verifierContract) {
          return res.status(500).json({ isValid: false, message: "On-chain verification is not configured on the server." });
@@ -105,7 +150,7 @@ app.post('/verify-on-chain', async (req, res) => {
             isValid: true,
             message: "Proof successfully verified on-chain!",
             txHash: tx.hash,
-            explorerUrl: `https://sepolia.etherscan.io/tx/${tx.hash}`
+            explorerUrl: `${EXPLORER_TX_URL}${tx.hash}`
         });
     } catch (error) {
         console.error("On-chain verification error:", error);